@@ -1,12 +1,61 @@
-import os
+from time import perf_counter
+
+# when the game was launched, for the --startup-profile report
+LAUNCHED = perf_counter()
+
 import sys
 import random
-from time import sleep
+import argparse
 import pygame
 from pygame.sprite import Sprite, Group
 
+from assets import asset_manager
+from atlas import load_atlas
+from collision import SpatialHash
+from profiler import FrameProfiler, NullProfiler, StartupTimer
+from render import DirtyRenderer
+from scores import Leaderboard
+from systems import System, SystemScheduler
+
+
+# the obstacles of a wave and the clouds, in the order they are added
+OBSTACLE_IMAGES = ["bird.png", "emerald.png", "bird1.png", "box.png"]
+CLOUD_IMAGES = ["cloud1.png", "cloud2.png"]
+
+# every image the game shows, decoded in the background at startup
+GAME_IMAGES = (
+    [("images/ship", "ship.png"), ("images/ship", "heart.png")]
+    + [("images/obstacles", filename) for filename in OBSTACLE_IMAGES]
+    + [("images/cloud", filename) for filename in CLOUD_IMAGES]
+)
+
 
 # Game Classes
+class GameRandom(random.Random):
+    """random.Random that counts how often its state changed.
+
+    The numbers are the same as random.Random's; the count lets savestate.py
+    reuse the packed state until the next draw.
+    """
+    changes = 0
+
+    def seed(self, *args, **kwargs):
+        super().seed(*args, **kwargs)
+        self.changes += 1
+
+    def setstate(self, state):
+        super().setstate(state)
+        self.changes += 1
+
+    def random(self):
+        self.changes += 1
+        return super().random()
+
+    def getrandbits(self, k):
+        self.changes += 1
+        return super().getrandbits(k)
+
+
 class Settings:
     """A class to handle the game settings."""
     def __init__(self):
@@ -15,6 +64,16 @@ class Settings:
         self.screen_height = 600
         self.bg_color = (103, 178, 255)
 
+        # display: with display_scaled the game draws at screen_width x
+        # screen_height and SDL stretches the picture over the window
+        # (pygame.SCALED); vsync waits for the display's refresh to flip; and
+        # display_buffer asks for a "double" buffered or "hardware" surface, or
+        # None for pygame's default. set_render_scale() lowers the resolution.
+        self.render_scale = 1.0
+        self.display_scaled = False
+        self.vsync = False
+        self.display_buffer = None
+
         # ship
         self.ship_speed = 7
         self.ship_lives = 3
@@ -24,15 +83,102 @@ class Settings:
         self.bullet_width = 20
         self.bullet_height = 7
         self.bullet_color = (255, 60, 60)
+        self.bullets_allowed = 100
 
         # obstacles
         self.obs_speed = 6
+        # obstacles come round between these heights, this far past the right
+        # edge of the screen
+        self.obstacle_lanes = (250, 450)
+        self.obstacle_spawn = (2000, 3000)
+        # a waves.WaveSpawner streaming obstacles from a level file, or None for
+        # the endless waves of four obstacles at random places
+        self.waves = None
+
+        # collision broadphase grid over the play field, hits are found from the
+        # bounding "rect"s or, once the rects overlap, the image "mask"s
+        self.collision_cell_size = 100
+        self.collision_precision = "rect"
+        self.broadphase = SpatialHash(self.screen_width, self.screen_height,
+                                      self.collision_cell_size, self.collision_precision)
+
+        # keep headless bullets and obstacles as "sprites" or NumPy "arrays"
+        self.entity_backend = "sprites"
 
         # game settings
         self.game_speed = 10
 
+        # clouds drift between these heights and come round this far past the
+        # right edge of the screen
+        self.cloud_heights = (20, 50)
+        self.cloud_spawn = (1000, 2000)
+
+        # how far the score and the hearts are from the top corners
+        self.score_margin = 20
+        self.hearts_margin = 10
+
+        # game logic runs at a fixed tick_rate per second while frames are drawn
+        # up to fps_limit per second (0 for no limit), in between ticks
+        self.tick_rate = 60
+        self.fps_limit = 60
+        # most ticks run to catch up in one frame before the rest is dropped
+        self.max_ticks_per_frame = 5
+
+        # redraw the "full" screen every frame or only the "dirty" rects that changed
+        self.render_mode = "full"
+
+        # run the ticks on a worker thread while the main thread draws the last
+        # one, see pipeline.py
+        self.pipelined = False
+
+        # time each phase of a frame when set to a profiler.FrameProfiler
+        self.profiler = NullProfiler()
+
+        # the systems every tick and frame run, in order (see systems.py); turn
+        # some off for headless runs with self.systems.disable("render")
+        self.systems = game_systems()
+
         # scoring
         self.points = 10
+        # a scores.Leaderboard to record every finished game in, or None
+        self.leaderboard = None
+
+        # how long the game holds still after the ship is hit, in seconds
+        self.hit_pause = 0.3
+
+        # random numbers for obstacle and cloud placement, seed it for repeatable runs
+        self.rng = GameRandom()
+
+    def set_render_scale(self, scale):
+        """Draw the game at scale times its current resolution.
+
+        The play field, the positions above, the speeds and the bullets scale
+        with it, and open_display() scales the images and fonts to match, so
+        the game looks and plays the same, only with fewer pixels to draw.
+        Turn on display_scaled to have SDL stretch it over a larger window.
+        """
+        factor = scale / self.render_scale
+        self.render_scale = scale
+
+        def scaled(*values):
+            return tuple(round(value * factor) for value in values)
+
+        self.screen_width, self.screen_height = scaled(self.screen_width, self.screen_height)
+        self.bullet_width, self.bullet_height = scaled(self.bullet_width, self.bullet_height)
+        self.obstacle_lanes = scaled(*self.obstacle_lanes)
+        self.obstacle_spawn = scaled(*self.obstacle_spawn)
+        self.cloud_heights = scaled(*self.cloud_heights)
+        self.cloud_spawn = scaled(*self.cloud_spawn)
+        self.score_margin, self.hearts_margin = scaled(self.score_margin, self.hearts_margin)
+
+        self.ship_speed *= factor
+        self.bullet_speed *= factor
+        self.obs_speed *= factor
+        self.game_speed *= factor
+
+        self.collision_cell_size, = scaled(self.collision_cell_size)
+        self.broadphase = SpatialHash(self.screen_width, self.screen_height,
+                                      self.collision_cell_size, self.collision_precision)
 
 
 class Ship(Sprite):
@@ -41,7 +187,8 @@ class Ship(Sprite):
         super().__init__()
         self.screen = screen
         self.settings = settings
-        self.image = pygame.image.load(os.path.join("images/ship", "ship.png"))
+        self.image = asset_manager.image("images/ship", "ship.png")
+        self.mask = asset_manager.mask("images/ship", "ship.png")
         self.rect = self.image.get_rect()
         self.screen_rect = screen.get_rect()
         self.rect.centery = self.screen_rect.centery
@@ -51,6 +198,11 @@ class Ship(Sprite):
         self.move_up = False
 
         self.center = float(self.rect.centery)
+        self.prev_y = self.rect.centery
+
+    def save_position(self):
+        """Remember where the ship was at the start of the tick."""
+        self.prev_y = self.rect.centery
 
     def update(self):
         if self.move_down and (self.rect.bottom < self.screen_rect.bottom):
@@ -62,55 +214,134 @@ class Ship(Sprite):
 
     def reset_ship_pos(self):
         self.center = self.screen_rect.centery
+        self.rect.centery = self.center
+        self.prev_y = self.rect.centery
 
-    def draw(self):
-        self.screen.blit(self.image, self.rect)
+    def rect_at(self, alpha=1.0):
+        """Return where to draw the ship, alpha of the way through the tick."""
+        rect = self.rect.copy()
+        rect.centery = self.prev_y + (self.rect.centery - self.prev_y) * alpha
+        return rect
+
+    def draw(self, alpha=1.0):
+        self.screen.blit(self.image, self.rect_at(alpha))
 
 
 class Bullet(Sprite):
     """Create bullets for the ship."""
-    def __init__(self, settings, screen, ship):
+    def __init__(self, settings, screen, ship=None):
         super().__init__()
         self.screen = screen
         self.rect = pygame.Rect(0, 0, settings.bullet_width, settings.bullet_height)
-        self.rect.centery = ship.rect.centery
-        self.rect.centerx = ship.rect.centerx
+        self.mask = asset_manager.solid_mask(self.rect.size)
         self.x = float(self.rect.x)
         self.color = settings.bullet_color
         self.speed = settings.bullet_speed
 
+        if ship is not None:
+            self.reset(ship)
+
+    def reset(self, ship):
+        """Place the bullet at the ship's position, ready to fire."""
+        self.rect.centery = ship.rect.centery
+        self.rect.centerx = ship.rect.centerx
+        self.x = float(self.rect.x)
+        self.prev_x = self.x
+
+    def save_position(self):
+        """Remember where the bullet was at the start of the tick."""
+        self.prev_x = self.x
+
     def update(self):
         self.x += self.speed
         self.rect.x = self.x
 
-    def draw(self):
-        pygame.draw.rect(self.screen, self.color, self.rect)
+    def rect_at(self, alpha=1.0):
+        """Return where to draw the bullet, alpha of the way through the tick."""
+        rect = self.rect.copy()
+        rect.x = self.prev_x + (self.x - self.prev_x) * alpha
+        return rect
+
+    def draw(self, alpha=1.0):
+        pygame.draw.rect(self.screen, self.color, self.rect_at(alpha))
+
+
+class BulletPool(Group):
+    """A sprite group that recycles a fixed number of bullets."""
+    def __init__(self, settings, screen):
+        super().__init__()
+        self.capacity = settings.bullets_allowed
+
+        # every bullet is built up front and reused after it leaves the group.
+        self.free = [Bullet(settings, screen) for _ in range(self.capacity)]
+
+    @property
+    def live_count(self):
+        return len(self)
+
+    @property
+    def free_count(self):
+        return len(self.free)
+
+    def fire(self, ship):
+        """Fire a bullet from the ship, or return None if all are in flight."""
+        if not self.free:
+            return None
+        bullet = self.free.pop()
+        bullet.reset(ship)
+        self.add(bullet)
+        return bullet
+
+    def remove_internal(self, sprite):
+        # called for remove(), empty() and kill(), so every way out recycles.
+        super().remove_internal(sprite)
+        if len(self.free) + len(self) < self.capacity:
+            self.free.append(sprite)
 
 
 class Obstacles(Sprite):
     """Add obstacles to the game and handle them."""
-    def __init__(self, settings, screen, filename):
+    def __init__(self, settings, screen, filename, x=None, y=None, speed=None):
         super().__init__()
         self.settings = settings
         self.screen = screen
-        self.x = settings.screen_width + random.randint(2000, 3000)
-        self.y = random.randint(250, 450)
-        self.image = pygame.image.load(os.path.join("images/obstacles", filename))
+        self.rng = settings.rng
+        # start somewhere random off screen unless told where
+        if x is None:
+            x = settings.screen_width + self.rng.randint(*settings.obstacle_spawn)
+        if y is None:
+            y = self.rng.randint(*settings.obstacle_lanes)
+        self.x = x
+        self.y = y
+        self.filename = filename
+        self.image = asset_manager.image("images/obstacles", filename)
+        self.mask = asset_manager.mask("images/obstacles", filename)
         self.rect = self.image.get_rect()
         self.rect.x = self.x
         self.rect.y = self.y
         self.width = self.image.get_width()
-        self.speed = settings.obs_speed
+        self.speed = speed if speed is not None else settings.obs_speed
+        self.prev_x = self.x
+
+    def save_position(self):
+        """Remember where the obstacle was at the start of the tick."""
+        self.prev_x = self.x
 
     def update(self):
         self.x -= self.speed
         self.rect.x = self.x
         if self.x < -self.width:
-            self.x = self.settings.screen_width + random.randint(2000, 3000)
-            self.y = random.randint(250, 450)
+            self.x = self.settings.screen_width + self.rng.randint(*self.settings.obstacle_spawn)
+            self.y = self.rng.randint(*self.settings.obstacle_lanes)
+            self.prev_x = self.x
 
-    def draw(self):
-        self.screen.blit(self.image, (self.x, self.y))
+    def rect_at(self, alpha=1.0):
+        """Return where to draw the obstacle, alpha of the way through the tick."""
+        x = self.prev_x + (self.x - self.prev_x) * alpha
+        return self.image.get_rect(topleft=(x, self.y))
+
+    def draw(self, alpha=1.0):
+        self.screen.blit(self.image, self.rect_at(alpha))
 
 
 class Clouds:
@@ -118,20 +349,33 @@ class Clouds:
     def __init__(self, settings, screen, filename):
         self.settings = settings
         self.screen = screen
-        self.x = settings.screen_width + random.randint(1000, 2000)
-        self.y = random.randint(20, 50)
-        self.image = pygame.image.load(os.path.join("images/cloud", filename))
+        self.rng = settings.rng
+        self.x = settings.screen_width + self.rng.randint(*settings.cloud_spawn)
+        self.y = self.rng.randint(*settings.cloud_heights)
+        self.filename = filename
+        self.image = asset_manager.image("images/cloud", filename)
         self.width = self.image.get_width()
         self.speed = settings.game_speed
+        self.prev_x = self.x
+
+    def save_position(self):
+        """Remember where the cloud was at the start of the tick."""
+        self.prev_x = self.x
 
     def update(self):
         self.x -= self.settings.game_speed
         if self.x < -self.width:
-            self.x = self.settings.screen_width + random.randint(1000, 2000)
-            self.y = random.randint(20, 50)
+            self.x = self.settings.screen_width + self.rng.randint(*self.settings.cloud_spawn)
+            self.y = self.rng.randint(*self.settings.cloud_heights)
+            self.prev_x = self.x
 
-    def draw(self):
-        self.screen.blit(self.image, (self.x, self.y))
+    def rect_at(self, alpha=1.0):
+        """Return where to draw the cloud, alpha of the way through the tick."""
+        x = self.prev_x + (self.x - self.prev_x) * alpha
+        return self.image.get_rect(topleft=(x, self.y))
+
+    def draw(self, alpha=1.0):
+        self.screen.blit(self.image, self.rect_at(alpha))
 
 
 class GameStats:
@@ -149,6 +393,13 @@ class GameStats:
         self.ships_left = self.settings.ship_lives
         self.score = 0
 
+        # ticks left in the pause after the ship was hit.
+        self.respawn_ticks = 0
+
+    @property
+    def respawning(self):
+        return self.respawn_ticks > 0
+
 
 class Button:
     """A class to handle the play button in the game."""
@@ -162,7 +413,7 @@ class Button:
         self.height = 50
         self.button_color = (0, 30, 100)
         self.text_color = (255, 255, 255)
-        self.font = pygame.font.SysFont(None, 48)
+        self.font = asset_manager.font(48)
 
         # build the button's rect object and center it.
         self.rect = pygame.Rect(0, 0, self.width, self.height)
@@ -173,7 +424,7 @@ class Button:
 
     def prep_msg(self, msg):
         """Turn msg into a rendered image and center text on the button."""
-        self.msg_image = self.font.render(msg, True, self.text_color, self.button_color)
+        self.msg_image = asset_manager.text(msg, 48, self.text_color, self.button_color)
         self.msg_image_rect = self.msg_image.get_rect()
         self.msg_image_rect.center = self.rect.center
 
@@ -194,7 +445,10 @@ class Scoreboard:
 
         # font settings for scoring information.
         self.text_color = (30, 30, 30)
-        self.font = pygame.font.SysFont(None, 48)
+        self.font = asset_manager.font(48)
+
+        # screen areas the score and hearts covered when last drawn.
+        self.last_rects = []
 
         # prepare the initial score image.
         self.prep_score()
@@ -204,90 +458,298 @@ class Scoreboard:
     def prep_score(self):
         """Turn the score into a rendered image."""
         score_str = str(self.stats.score)
-        self.score_image = self.font.render(score_str, True, self.text_color,
-                                            self.settings.bg_color)
+        self.score_image = asset_manager.text(score_str, 48, self.text_color,
+                                              self.settings.bg_color)
 
         # display the score at the top right of the screen.
         self.score_rect = self.score_image.get_rect()
-        self.score_rect.right = self.screen_rect.right - 20
-        self.score_rect.top = 20
+        self.score_rect.right = self.screen_rect.right - self.settings.score_margin
+        self.score_rect.top = self.settings.score_margin
+        self.dirty = True
 
     def prep_ships(self, filename):
         """Show how many ships are left."""
         self.ships = Group()
 
-        ship_image = pygame.image.load(os.path.join("images/ship", filename))
+        ship_image = asset_manager.image("images/ship", filename)
 
         for ship_number in range(self.stats.ships_left):
             ship = Ship(self.settings, self.screen)
-            ship.rect.x = 10 + ship_number * ship.rect.width
-            ship.rect.y = 10
+            ship.rect.x = self.settings.hearts_margin + ship_number * ship.rect.width
+            ship.rect.y = self.settings.hearts_margin
             ship.image = ship_image
             self.ships.add(ship)
+        self.dirty = True
+
+    def rects(self):
+        """Return the screen areas of the score and hearts."""
+        return [self.score_rect] + [ship.rect for ship in self.ships]
 
     def draw(self):
         """Draw score to the screen."""
         self.screen.blit(self.score_image, self.score_rect)
         self.ships.draw(self.screen)
+        self.last_rects = [rect.copy() for rect in self.rects()]
+        self.dirty = False
 
 
-# Game Functions
-def run_game():
-    """Handle all game events."""
-    settings = Settings()
+class HighScores:
+    """Show the Leaderboard's best scores next to the play button."""
+    def __init__(self, settings, screen, leaderboard, button):
+        self.screen = screen
+        self.settings = settings
+        self.leaderboard = leaderboard
+        self.button = button
+        self.text_color = (30, 30, 30)
+
+        # the scores the lines were rendered from, and each line's image and rect.
+        self.shown = None
+        self.lines = []
+
+    def prep_scores(self):
+        """Turn the best scores into rendered lines to the right of the button."""
+        scores = self.leaderboard.top()
+        lines = ["High scores"] if scores else []
+        lines += [f"{place}. {score}" for place, score in enumerate(scores, 1)]
+        images = [asset_manager.text(line, 32, self.text_color, self.settings.bg_color)
+                  for line in lines]
+
+        x = self.button.rect.right + self.settings.score_margin
+        y = max(0, self.button.rect.centery - sum(image.get_height() for image in images) // 2)
+        self.lines = []
+        for image in images:
+            self.lines.append((image, image.get_rect(topleft=(x, y))))
+            y += image.get_height()
+        self.shown = scores
+
+    def rects(self):
+        return [rect for _, rect in self.lines]
+
+    def draw(self):
+        if self.leaderboard.top() != self.shown:
+            self.prep_scores()
+        for image, rect in self.lines:
+            self.screen.blit(image, rect)
+
+
+class FixedTimestep:
+    """Turn frame times into a fixed number of game ticks."""
+    def __init__(self, settings):
+        self.settings = settings
+        self.tick_ms = 1000 / settings.tick_rate
+
+        # game time in milliseconds that has passed but not been simulated yet.
+        self.lag = 0.0
 
-    pygame.init()
-    screen = pygame.display.set_mode((settings.screen_width, settings.screen_height))
-    pygame.display.set_caption("Air Shooter")
+    def advance(self, frame_ms):
+        """Add a frame's time and return how many ticks to run for it."""
+        self.lag += frame_ms
+        ticks = min(int(self.lag // self.tick_ms), self.settings.max_ticks_per_frame)
+
+        # too far behind to catch up, so drop the whole ticks that are left.
+        self.lag = (self.lag - ticks * self.tick_ms) % self.tick_ms
+        return ticks
+
+    @property
+    def alpha(self):
+        """How far the current frame is between the last tick and the next."""
+        return self.lag / self.tick_ms
+
+
+class World:
+    """Everything the systems of a tick and a frame work on."""
+    def __init__(self, settings, screen, ship, bullets, obstacles, clouds, stats, sb,
+                 play_button=None, renderer=None, recorder=None, high_scores=None):
+        self.settings = settings
+        self.screen = screen
+        self.ship = ship
+        self.bullets = bullets
+        self.obstacles = obstacles
+        self.clouds = clouds
+        self.stats = stats
+        self.sb = sb
+        self.play_button = play_button
+        self.renderer = renderer
+        self.recorder = recorder
+        self.high_scores = high_scores
+
+        # Inputs for the input system to apply this tick, or None to keep the keys
+        self.inputs = None
+        # how far between the last two ticks the frame is drawn
+        self.alpha = 1.0
+
+        # what the collisions system found, for the scoring system
+        self.hits = {}
+        self.ship_hit = None
+
+    def begin_tick(self):
+        """Get ready for the systems that move the world; False if it holds still."""
+        if not self.stats.game_active:
+            return False
+        self.settings.broadphase.begin_frame()
+        save_positions(self.ship, self.bullets, self.obstacles, self.clouds)
+        self.hits = {}
+        self.ship_hit = None
+
+        if self.stats.respawning:
+            # hold the world still for a moment after the ship was hit
+            self.stats.respawn_ticks -= 1
+            return False
+        return True
+
+
+# Game Functions
+def display_flags(settings):
+    """Return the pygame.display.set_mode() flags the display settings ask for."""
+    flags = 0
+    if settings.display_scaled or settings.vsync:
+        # SDL only waits for the refresh through the renderer SCALED brings in
+        flags |= pygame.SCALED
+    if settings.display_buffer == "double":
+        flags |= pygame.DOUBLEBUF
+    elif settings.display_buffer == "hardware":
+        flags |= pygame.HWSURFACE | pygame.DOUBLEBUF
+    elif settings.display_buffer is not None:
+        raise ValueError(f"display_buffer must be 'double', 'hardware' or None, "
+                         f"not {settings.display_buffer!r}")
+    return flags
+
+
+def open_display(settings, caption="Air Shooter"):
+    """Open the game window the way Settings asks and return its surface."""
+    asset_manager.set_scale(settings.render_scale)
+    screen = pygame.display.set_mode((settings.screen_width, settings.screen_height),
+                                     display_flags(settings), vsync=int(settings.vsync))
+    pygame.display.set_caption(caption)
+    return screen
+
+
+def run_game(settings=None, recorder=None, replay=None, startup_profile=False):
+    """Handle all game events.
+
+    Pass a replay.Recorder to write the session to a replay file, or a
+    replay.Replay to play one back in place of the keyboard and mouse.
+    With startup_profile the time each startup phase took is printed.
+    """
+    if settings is None:
+        settings = Settings()
+    timer = StartupTimer(LAUNCHED)
+    timer.mark("imports")
+
+    # bring up only the modules the game uses, not every one pygame.init() would
+    pygame.display.init()
+    pygame.font.init()
+    timer.mark("pygame init")
+
+    # take the images from the packed atlas when it is up to date (python atlas.py),
+    # else decode them while the window opens and the Start screen shows
+    atlas = load_atlas()
+    if atlas is not None:
+        asset_manager.use_atlas(atlas)
+    else:
+        asset_manager.preload(GAME_IMAGES)
+
+    screen = open_display(settings)
     clock = pygame.time.Clock()
+    timer.mark("display")
+
+    play_button = Button(screen, "Start")
+    high_scores = None
+    if settings.leaderboard is not None:
+        high_scores = HighScores(settings, screen, settings.leaderboard, play_button)
+    screen.fill(settings.bg_color)
+    play_button.draw()
+    if high_scores is not None:
+        high_scores.draw()
+    pygame.display.flip()
+    timer.mark("first frame")
+
+    asset_manager.wait()
+    timer.mark("assets")
 
     ship = Ship(settings, screen)
     stats = GameStats(settings)
     sb = Scoreboard(settings, screen, stats)
-    bullets = Group()
-    obstacles = Group(
-        Obstacles(settings, screen, "bird.png"),
-        Obstacles(settings, screen, "emerald.png"),
-        Obstacles(settings, screen, "bird1.png"),
-        Obstacles(settings, screen, "box.png")
-    )
-
-    clouds = [
-        Clouds(settings, screen, "cloud1.png"),
-        Clouds(settings, screen, "cloud2.png")
-    ]
+    bullets = BulletPool(settings, screen)
+    obstacles = Group()
+    add_new_obstacles(settings, screen, obstacles)
 
-    play_button = Button(screen, "Start")
+    clouds = [Clouds(settings, screen, filename) for filename in CLOUD_IMAGES]
 
-    # event loop
-    running = True
-
-    while running:
-        clock.tick(60)  # limit game to 60 fps
+    renderer = None
+    if settings.render_mode == "dirty":
+        renderer = DirtyRenderer(settings, screen)
 
-        key_mouse_events(settings, screen, ship, bullets, obstacles, stats, play_button, sb)
-        update_screen(settings, screen, ship, bullets, obstacles, clouds, stats, sb, play_button)
+    world = World(settings, screen, ship, bullets, obstacles, clouds, stats, sb, play_button,
+                  renderer, recorder, high_scores)
+    systems = settings.systems
 
-        if stats.game_active:
-            ship.update()
-            update_bullets(settings, screen, bullets, obstacles, stats, sb)
-            obstacles.update()
-            update_obstacles(settings, screen, ship, obstacles, bullets, stats, sb)
-            bullets.update()
+    timestep = FixedTimestep(settings)
+    timer.mark("game objects")
+    if startup_profile:
+        timer.report()
 
-            for cloud in clouds:
-                cloud.update()
+    profiler = settings.profiler
 
+    # event loop
+    running = True
 
-def key_mouse_events(settings, screen, ship, bullets, obstacles, stats, play_button, sb):
+    replay_inputs = iter(replay) if replay is not None else None
+
+    try:
+        if settings.pipelined:
+            # pipeline imports the game module itself, like replay in main()
+            from pipeline import run_pipelined
+            run_pipelined(world, clock, timestep, replay_inputs)
+            return
+
+        while running:
+            with profiler.phase("wait"):
+                frame_ms = clock.tick(settings.fps_limit)
+            ticks = timestep.advance(frame_ms)
+
+            with profiler.phase("events"):
+                if replay_inputs is not None:
+                    check_quit_events()
+                else:
+                    key_mouse_events(settings, screen, ship, bullets, obstacles, stats,
+                                     play_button, sb, recorder)
+
+            # run the game logic at a fixed rate, however long the frame took
+            was_active = stats.game_active
+            for _ in range(ticks):
+                if replay_inputs is not None:
+                    world.inputs = next(replay_inputs, None)
+                    if world.inputs is None:
+                        # the replay is over
+                        return
+                systems.tick(world)
+            if was_active and not stats.game_active:
+                pygame.mouse.set_visible(1)  # show mouse cursor
+
+            # draw the sprites between the last two ticks
+            world.alpha = timestep.alpha if stats.game_active else 1.0
+            systems.frame(world)
+
+            profiler.end_frame(bullets=len(bullets), obstacles=len(obstacles))
+    finally:
+        # write the profile however the game ends
+        profiler.dump()
+
+
+def key_mouse_events(settings, screen, ship, bullets, obstacles, stats, play_button, sb,
+                     recorder=None):
     """Function to handle all keypresses and mouse clicks."""
     for event in pygame.event.get():
         if event.type == pygame.QUIT:
             sys.exit()
         if event.type == pygame.MOUSEBUTTONDOWN:
             mouse_x, mouse_y = pygame.mouse.get_pos()
+            was_active = stats.game_active
             check_play_button(settings, screen, ship, bullets, obstacles,
                               stats, play_button, mouse_x, mouse_y, sb)
+            if recorder is not None and stats.game_active and not was_active:
+                recorder.click()
 
         # handle ship control
         ## keydown events
@@ -298,8 +760,9 @@ def key_mouse_events(settings, screen, ship, bullets, obstacles, stats, play_but
                 ship.move_up = True
             elif event.key == pygame.K_SPACE:
                 # fire bullets
-                bullet = Bullet(settings, screen, ship)
-                bullets.add(bullet)
+                bullets.fire(ship)
+                if recorder is not None:
+                    recorder.fire()
 
         ## keyup events
         if event.type == pygame.KEYUP:
@@ -309,82 +772,230 @@ def key_mouse_events(settings, screen, ship, bullets, obstacles, stats, play_but
                 ship.move_up = False
 
 
-def update_screen(settings, screen, ship, bullets, obstacles, clouds, stats, score, play_button):
+def check_quit_events():
+    """Handle only the window being closed, for when input comes from elsewhere."""
+    for event in pygame.event.get():
+        if event.type == pygame.QUIT:
+            sys.exit()
+
+
+def apply_inputs(settings, screen, ship, bullets, obstacles, stats, sb, inputs):
+    """Apply one tick of inputs (up, down, fire, click) to the game."""
+    ship.move_up = inputs.up
+    ship.move_down = inputs.down
+
+    if inputs.click and not stats.game_active:
+        start_game(settings, screen, ship, bullets, obstacles, stats, sb)
+
+    # fire holds the number of shots, or True for a single one
+    for _ in range(int(inputs.fire)):
+        bullets.fire(ship)
+
+
+def update_screen(settings, screen, ship, bullets, obstacles, clouds, stats, score, play_button,
+                  alpha=1.0, high_scores=None):
     """Function to handle game screen activity."""
-    screen.fill(settings.bg_color)
-    ship.draw()
+    profiler = settings.profiler
+    with profiler.phase("draw"):
+        screen.fill(settings.bg_color)
+        ship.draw(alpha)
 
-    for cloud in clouds:
-        cloud.draw()
+        for cloud in clouds:
+            cloud.draw(alpha)
 
-    for obstacle in obstacles.sprites():
-        obstacle.draw()
+        for obstacle in obstacles.sprites():
+            obstacle.draw(alpha)
 
-    for bullet in bullets.sprites():
-        bullet.draw()
+        for bullet in bullets.sprites():
+            bullet.draw(alpha)
 
-    score.draw()
+        score.draw()
 
-    if not stats.game_active:
-        play_button.draw()
+        if not stats.game_active:
+            play_button.draw()
+            if high_scores is not None:
+                high_scores.draw()
 
-    pygame.display.flip()
+        profiler.draw_overlay(screen)
 
+    with profiler.phase("flip"):
+        pygame.display.flip()
 
-def update_bullets(settings, screen, bullets, obstacles, stats, sb):
-    """Function to handle bullets activity."""
-    bullets.update()
 
-    for bullet in bullets.copy():
-        if bullet.rect.left <= 0:
+def update_game(settings, screen, ship, bullets, obstacles, clouds, stats, sb):
+    """Advance the game world by one tick while the game is active."""
+    settings.systems.tick(World(settings, screen, ship, bullets, obstacles, clouds, stats, sb))
+
+
+def game_systems():
+    """Return the scheduler for the systems of a tick and a frame, in running order."""
+    return SystemScheduler([
+        System("input", tick_input, always=True),
+        System("ship", tick_ship),
+        System("bullets", tick_bullets),
+        System("obstacles", tick_obstacles),
+        System("collisions", tick_collisions),
+        System("clouds", tick_clouds),
+        System("scoring", tick_scoring),
+        System("render", render_frame, every_tick=False),
+    ])
+
+
+def tick_input(world):
+    """Apply the Inputs handed to the world for the tick, then record the tick's input."""
+    w = world
+    if w.inputs is not None:
+        was_active = w.stats.game_active
+        apply_inputs(w.settings, w.screen, w.ship, w.bullets, w.obstacles, w.stats, w.sb,
+                     w.inputs)
+        if w.recorder is not None:
+            # the pipelined loop hands its keys over as Inputs, see pipeline.py
+            if w.stats.game_active and not was_active:
+                w.recorder.click()
+            for _ in range(int(w.inputs.fire)):
+                w.recorder.fire()
+        w.inputs = None
+    if w.recorder is not None:
+        w.recorder.tick(w.ship)
+
+
+def tick_ship(world):
+    world.ship.update()
+
+
+def tick_bullets(world):
+    move_bullets(world.settings, world.bullets)
+
+
+def tick_obstacles(world):
+    move_obstacles(world.settings, world.screen, world.obstacles)
+
+
+def tick_collisions(world):
+    """Find the bullets and obstacles that touch and whether the ship was hit."""
+    broadphase = world.settings.broadphase
+    world.hits = broadphase.groupcollide(world.bullets, world.obstacles, True, True)
+    world.ship_hit = broadphase.spritecollideany(world.ship, world.obstacles)
+
+
+def tick_clouds(world):
+    for cloud in world.clouds:
+        cloud.update()
+
+
+def tick_scoring(world):
+    """Score this tick's hits, lose a ship if it was hit and refill cleared waves."""
+    w = world
+    score_hits(w.settings, w.stats, w.sb, w.hits)
+    if w.ship_hit:
+        lose_ship(w.settings, w.screen, w.ship, w.obstacles, w.bullets, w.stats, w.sb)
+    refill_obstacles(w.settings, w.screen, w.bullets, w.obstacles)
+
+
+def render_frame(world):
+    """Draw the sprites alpha of the way between the last two ticks."""
+    w = world
+    if w.renderer is not None:
+        w.renderer.update_screen(w.ship, w.bullets, w.obstacles, w.clouds, w.stats, w.sb,
+                                 w.play_button, w.alpha, w.high_scores)
+    else:
+        update_screen(w.settings, w.screen, w.ship, w.bullets, w.obstacles, w.clouds, w.stats,
+                      w.sb, w.play_button, w.alpha, w.high_scores)
+
+
+def save_positions(ship, bullets, obstacles, clouds):
+    """Remember where everything was at the start of the tick for interpolation."""
+    ship.save_position()
+    for bullet in bullets:
+        bullet.save_position()
+    for obstacle in obstacles:
+        obstacle.save_position()
+    for cloud in clouds:
+        cloud.save_position()
+
+
+def move_bullets(settings, bullets):
+    """Move the bullets and send the ones past the right edge back to the pool."""
+    bullets.update()
+    for bullet in bullets.sprites():
+        if bullet.rect.left >= settings.screen_width:
             bullets.remove(bullet)
 
-    # check for and get rid of bullet-obstacle collision
-    collisions = pygame.sprite.groupcollide(bullets, obstacles, True, True)
 
+def move_obstacles(settings, screen, obstacles):
+    """Bring in the level file's obstacles that are due and move every obstacle."""
+    if settings.waves is not None:
+        settings.waves.update(settings, screen, obstacles)
+    obstacles.update()
+
+
+def score_hits(settings, stats, sb, collisions):
     if collisions:
         stats.score += settings.points
         sb.prep_score()
 
-    if len(obstacles) == 0:
+
+def refill_obstacles(settings, screen, bullets, obstacles):
+    """Start a new wave once every obstacle was shot."""
+    if len(obstacles) == 0 and settings.waves is None:
         # remove existing bullets and add new obstacles
         bullets.empty()
         add_new_obstacles(settings, screen, obstacles)
 
 
-def update_obstacles(settings, screen, ship, obstacles, bullets, stats, sb):
-    """Update position of obstacles and check for ship-obstacle collision."""
-    obstacles.update()
-    if pygame.sprite.spritecollideany(ship, obstacles):
-        # respond to ship being being hit by obstacle
-        if stats.ships_left > 0:
-            # decrement ships left after being hit
-            stats.ships_left -= 1
+def lose_ship(settings, screen, ship, obstacles, bullets, stats, sb):
+    """Respond to the ship being hit by an obstacle."""
+    if stats.ships_left > 0:
+        # decrement ships left after being hit
+        stats.ships_left -= 1
 
-            # update scoreboard
-            sb.prep_ships("heart.png")
+        # update scoreboard
+        sb.prep_ships("heart.png")
 
-            # empty the list of bullets and obstacles
-            bullets.empty()
-            obstacles.empty()
+        # empty the list of bullets and obstacles
+        bullets.empty()
+        obstacles.empty()
 
-            # add new obstacles and reset ship's position
-            add_new_obstacles(settings, screen, obstacles)
-            ship.reset_ship_pos()
+        # add new obstacles and reset ship's position
+        add_new_obstacles(settings, screen, obstacles)
+        ship.reset_ship_pos()
 
-            # pause for effect
-            sleep(0.3)
-        else:
-            stats.game_active = False
-            pygame.mouse.set_visible(1)  # show mouse cursor
+        # pause for effect, the main loop keeps drawing and taking input
+        stats.respawn_ticks = round(settings.hit_pause * settings.tick_rate)
+    else:
+        stats.game_active = False
+        if settings.leaderboard is not None:
+            # only queued here, the leaderboard writes it on its own thread
+            settings.leaderboard.record(stats.score)
+
+
+def update_bullets(settings, screen, bullets, obstacles, stats, sb):
+    """Move the bullets one tick and score the ones that hit an obstacle.
+
+    The same as the bullets, collisions and scoring systems do for bullets.
+    """
+    move_bullets(settings, bullets)
+
+    # check for and get rid of bullet-obstacle collision
+    collisions = settings.broadphase.groupcollide(bullets, obstacles, True, True)
+    score_hits(settings, stats, sb, collisions)
+    refill_obstacles(settings, screen, bullets, obstacles)
+
+
+def update_obstacles(settings, screen, ship, obstacles, bullets, stats, sb):
+    """Move the obstacles one tick and check for ship-obstacle collision."""
+    move_obstacles(settings, screen, obstacles)
+    if settings.broadphase.spritecollideany(ship, obstacles):
+        lose_ship(settings, screen, ship, obstacles, bullets, stats, sb)
 
 
 def add_new_obstacles(settings, screen, obstacles):
     """Add new obstacles to game screen for every obstacle shot."""
-    obstacles.add(Obstacles(settings, screen, "bird.png"))
-    obstacles.add(Obstacles(settings, screen, "emerald.png"))
-    obstacles.add(Obstacles(settings, screen, "bird1.png"))
-    obstacles.add(Obstacles(settings, screen, "box.png"))
+    if settings.waves is not None:
+        # the level file brings the obstacles in as they come due
+        return
+    for filename in OBSTACLE_IMAGES:
+        obstacles.add(Obstacles(settings, screen, filename))
 
 
 def check_play_button(settings, screen, ship, bullets, obstacles,
@@ -394,24 +1005,98 @@ def check_play_button(settings, screen, ship, bullets, obstacles,
     button_clicked = play_button.rect.collidepoint(mouse_x, mouse_y)
     if button_clicked and not stats.game_active:
         pygame.mouse.set_visible(0)  # hide the mouse cursor
-        stats.reset_stats()  # reset game stats
-        stats.game_active = True
+        start_game(settings, screen, ship, bullets, obstacles, stats, sb)
 
-        # empty the list of bullets and obstacles
-        bullets.empty()
-        obstacles.empty()
 
-        # add new obstacles and reset ship's position
-        add_new_obstacles(settings, screen, obstacles)
-        ship.reset_ship_pos()
+def start_game(settings, screen, ship, bullets, obstacles, stats, sb):
+    """Reset the game world and start a new game."""
+    stats.reset_stats()  # reset game stats
+    stats.game_active = True
 
-        # reset the scoreboard images
-        sb.prep_score()
-        sb.prep_ships("heart.png")
+    # empty the list of bullets and obstacles
+    bullets.empty()
+    obstacles.empty()
+
+    # add new obstacles and reset ship's position
+    if settings.waves is not None:
+        settings.waves.restart()
+    add_new_obstacles(settings, screen, obstacles)
+    ship.reset_ship_pos()
+
+    # reset the scoreboard images
+    sb.prep_score()
+    sb.prep_ships("heart.png")
 
 
 def main():
-    run_game()
+    parser = argparse.ArgumentParser(description="Play Air Shooter.")
+    parser.add_argument("--record", metavar="FILE", help="record the session to a replay file")
+    parser.add_argument("--replay", metavar="FILE", help="play back a replay file")
+    parser.add_argument("--fast", action="store_true",
+                        help="with --replay, play headless as fast as possible")
+    parser.add_argument("--profile", metavar="FILE",
+                        help="show per-phase frame times and write them to a .json or .csv FILE")
+    parser.add_argument("--startup-profile", action="store_true",
+                        help="print how long each phase of startup took")
+    parser.add_argument("--scores", metavar="FILE", default="scores.db",
+                        help="keep the high scores in FILE (default scores.db)")
+    parser.add_argument("--waves", metavar="FILE", help="play the obstacle waves of a level file")
+    parser.add_argument("--pipelined", action="store_true",
+                        help="run the game logic on its own thread while frames are drawn")
+    parser.add_argument("--scale", metavar="FACTOR", type=float,
+                        help="draw at FACTOR times the resolution, scaled up by SDL")
+    parser.add_argument("--scaled", action="store_true",
+                        help="let SDL scale the game up to fit the display")
+    parser.add_argument("--vsync", action="store_true",
+                        help="flip in step with the display's refresh")
+    parser.add_argument("--display-buffer", choices=["double", "hardware"],
+                        help="ask for a double buffered or hardware display surface")
+    parser.add_argument("--stress", action="store_true",
+                        help="ramp up bullets and obstacles until frames get too slow and report")
+    parser.add_argument("--stress-target", metavar="MS", type=float, default=1000 / 60,
+                        help="with --stress, the frame time to stay under (default 16.7)")
+    args = parser.parse_args()
+
+    settings = Settings()
+    if args.waves:
+        # waves imports the game module itself, like replay below
+        from waves import WaveSpawner
+        settings.waves = WaveSpawner(args.waves)
+    if args.profile:
+        settings.profiler = FrameProfiler(args.profile)
+    settings.pipelined = args.pipelined
+    if args.scale:
+        settings.set_render_scale(args.scale)
+    settings.display_scaled = args.scaled or bool(args.scale)
+    settings.vsync = args.vsync
+    settings.display_buffer = args.display_buffer
+
+    # replay imports the game module itself, so load it only when asked for
+    if args.stress:
+        from stress import run_stress, print_report
+        print_report(run_stress(args.stress_target), args.stress_target)
+    elif args.replay and args.fast:
+        from replay import play_fast
+        state = play_fast(args.replay)
+        print(f"ticks: {state.tick}  score: {state.score}  ships left: {state.ships_left}")
+    elif args.replay:
+        from replay import Replay
+        with Replay(args.replay) as replay:
+            settings.rng.seed(replay.seed)
+            settings.tick_rate = replay.tick_rate
+            run_game(settings, replay=replay, startup_profile=args.startup_profile)
+    else:
+        # live games go on the leaderboard, replays were counted when played
+        with Leaderboard(args.scores) as leaderboard:
+            settings.leaderboard = leaderboard
+            if args.record:
+                from replay import Recorder
+                seed = random.randrange(2 ** 32)
+                settings.rng.seed(seed)
+                with Recorder(args.record, seed, settings) as recorder:
+                    run_game(settings, recorder=recorder, startup_profile=args.startup_profile)
+            else:
+                run_game(settings, startup_profile=args.startup_profile)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,195 @@
+import os
+import threading
+from collections import OrderedDict
+import pygame
+
+
+class AssetManager:
+    """Load every image and font once and share them between sprites.
+
+    Rendered text is kept too, in a least-recently-used cache of up to
+    text_cache_size strings, so the score and button labels are only
+    rendered the first time they are shown.
+
+    preload() decodes images on a background thread ahead of time; image()
+    waits for it and only converts them, which must happen on the main
+    thread.
+
+    Collision masks are built once per image, or per size for solid
+    rectangles, and cached next to the surfaces.
+
+    With set_scale() images and fonts come out that many times their normal
+    size, for games drawn at a lower resolution (Settings.set_render_scale).
+
+    After use_atlas() images packed into the atlas.Atlas are taken from it as
+    they are, and only the others are loaded from their files.
+    """
+    def __init__(self, text_cache_size=256):
+        self.images = {}
+        self.hits = 0
+        self.misses = 0
+
+        self.masks = {}
+        self.fonts = {}
+        self.texts = OrderedDict()
+        self.text_cache_size = text_cache_size
+        self.scale = 1.0
+        self.atlas = None
+
+        # images decoded by preload(), waiting to be converted.
+        self.preloaded = {}
+        self.loader = None
+
+    def image(self, directory, filename):
+        """Return the cached surface for directory/filename, loading it on first use."""
+        path = os.path.join(directory, filename)
+        image = self.images.get(path)
+        if image is not None:
+            self.hits += 1
+            return image
+
+        self.misses += 1
+        image = self.atlas.image(path) if self.atlas is not None else None
+        if image is not None:
+            image = self.scaled(image)
+            if not self.display_format(image):
+                image = self.convert(image)
+            self.images[path] = image
+            return image
+
+        self.wait()
+        image = self.preloaded.pop(path, None)
+        if image is None:
+            image = pygame.image.load(path)
+        image = self.convert(self.scaled(image))
+        self.images[path] = image
+        return image
+
+    def mask(self, directory, filename):
+        """Return the collision mask of directory/filename's opaque pixels."""
+        path = os.path.join(directory, filename)
+        mask = self.masks.get(path)
+        if mask is None:
+            mask = pygame.mask.from_surface(self.image(directory, filename))
+            self.masks[path] = mask
+        return mask
+
+    def solid_mask(self, size):
+        """Return a collision mask that fills a rect of size."""
+        mask = self.masks.get(size)
+        if mask is None:
+            mask = pygame.Mask(size, fill=True)
+            self.masks[size] = mask
+        return mask
+
+    def warm(self, paths):
+        """Load and convert the (directory, filename) images and their masks now.
+
+        Called on the main thread before another thread starts building
+        sprites, so that thread only ever reads the caches.
+        """
+        for directory, filename in paths:
+            self.mask(directory, filename)
+
+    def preload(self, paths):
+        """Start decoding the (directory, filename) images on a background thread."""
+        self.loader = threading.Thread(target=self.decode, args=(list(paths),), daemon=True)
+        self.loader.start()
+
+    def decode(self, paths):
+        for directory, filename in paths:
+            path = os.path.join(directory, filename)
+            if path not in self.images:
+                self.preloaded[path] = pygame.image.load(path)
+
+    def wait(self):
+        """Block until the images from preload() are decoded."""
+        if self.loader is not None:
+            self.loader.join()
+            self.loader = None
+
+    def font(self, size):
+        """Return the shared default font at size, creating it on first use."""
+        font = self.fonts.get(size)
+        if font is None:
+            # pygame's bundled font, SysFont() would scan the system fonts first.
+            font = pygame.font.Font(None, round(size * self.scale))
+            self.fonts[size] = font
+        return font
+
+    def text(self, text, size, color, background=None):
+        """Return text rendered in the default font, rendering each string once.
+
+        The surface is shared with every other caller, so draw it but never
+        draw onto it.
+        """
+        key = (text, size, color, background)
+        image = self.texts.get(key)
+        if image is not None:
+            self.hits += 1
+            self.texts.move_to_end(key)
+            return image
+
+        self.misses += 1
+        image = self.font(size).render(text, True, color, background)
+        self.texts[key] = image
+        if len(self.texts) > self.text_cache_size:
+            # forget the string that was shown longest ago.
+            self.texts.popitem(last=False)
+        return image
+
+    def set_scale(self, scale):
+        """Make images and fonts scale times their normal size from now on."""
+        if scale == self.scale:
+            return
+        self.scale = scale
+        # everything cached was made at the old size, the decoded images stay
+        self.images.clear()
+        self.masks.clear()
+        self.fonts.clear()
+        self.texts.clear()
+
+    def scaled(self, image):
+        if self.scale == 1.0:
+            return image
+        size = (round(image.get_width() * self.scale), round(image.get_height() * self.scale))
+        try:
+            return pygame.transform.smoothscale(image, size)
+        except ValueError:
+            # smoothscale only takes 24 and 32 bit images
+            return pygame.transform.scale(image, size)
+
+    def use_atlas(self, atlas):
+        """Take images from atlas from now on instead of decoding their files."""
+        self.atlas = atlas
+        self.images.clear()
+        self.masks.clear()
+
+    def display_format(self, image):
+        """True if image has the display's pixel layout, or there is no display."""
+        display = pygame.display.get_surface()
+        return display is None or display.get_masks()[:3] == image.get_masks()[:3]
+
+    def convert(self, image):
+        """Convert image to the display's pixel format so blits are fast."""
+        # converting needs a display mode, headless callers keep the raw image.
+        if pygame.display.get_surface() is None:
+            return image
+        if image.get_flags() & pygame.SRCALPHA:
+            return image.convert_alpha()
+        return image.convert()
+
+    def clear(self):
+        """Drop every cached image, font and text and reset the hit/miss counters."""
+        self.wait()
+        self.images.clear()
+        self.preloaded.clear()
+        self.masks.clear()
+        self.fonts.clear()
+        self.texts.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+# shared cache used by every sprite in the game.
+asset_manager = AssetManager()
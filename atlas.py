@@ -0,0 +1,186 @@
+"""Packed texture atlas of every game image.
+
+The build step packs the PNGs under images/ into one file of raw pixels,
+so the game never decodes a PNG:
+
+    python atlas.py
+
+writes images/atlas.bin, which holds
+
+    header      magic, version, sheet width and height, pixel format,
+                number of images and where the pixels start
+    index       x, y, width and height of each image on the sheet, the
+                modification time and size of its PNG, and its path,
+                e.g. images/ship/ship.png
+    pixels      the sheet, 4 bytes a pixel, one row after the other
+
+The pixels are 32-bit BGRA, the byte order of SDL's ARGB8888, which is what
+the display uses on practically every machine, so they are drawn as they
+are. At runtime Atlas memory-maps the file and wraps the pixels with
+pygame.image.frombuffer() without copying them, and each image is a
+subsurface of that sheet. Pages of the file are only read once an image
+is drawn, and they are shared with every other process that maps it.
+
+run_game() uses the atlas through load_atlas(), which passes over a file
+whose PNGs changed since it was built, so an edited image shows up even
+before the atlas is built again.
+"""
+import argparse
+import glob
+import mmap
+import os
+import struct
+
+import pygame
+
+
+ATLAS_PATH = os.path.join("images", "atlas.bin")
+MAGIC = b"ASAT"
+VERSION = 2
+FORMAT = "BGRA"
+HEADER = struct.Struct("<4sBHH4sII")
+ENTRY = struct.Struct("<HHHHqIH")
+# pixels start on a page boundary, so mapping them never reads the index
+PAGE = 4096
+
+
+def pack(sizes, width):
+    """Place rects of sizes on shelves width wide; return their (x, y) and the height.
+
+    Taller images go first, each shelf is as tall as its first image.
+    """
+    order = sorted(range(len(sizes)), key=lambda index: -sizes[index][1])
+    positions = [None] * len(sizes)
+    x = y = shelf = 0
+    for index in order:
+        w, h = sizes[index]
+        if x + w > width:
+            x, y, shelf = 0, y + shelf, 0
+        positions[index] = (x, y)
+        x += w
+        shelf = max(shelf, h)
+    return positions, y + shelf
+
+
+def build_atlas(paths, output=ATLAS_PATH, width=1024):
+    """Pack the images at paths into an atlas file at output and return its index."""
+    images = [pygame.image.load(path) for path in paths]
+    sizes = [image.get_size() for image in images]
+    width = max([width] + [w for w, _ in sizes])
+    positions, height = pack(sizes, width)
+
+    pitch = width * 4
+    pixels = bytearray(pitch * height)
+    for image, (x, y), (w, h) in zip(images, positions, sizes):
+        data = pygame.image.tobytes(image, FORMAT)
+        for row in range(h):
+            start = (y + row) * pitch + x * 4
+            pixels[start:start + w * 4] = data[row * w * 4:(row + 1) * w * 4]
+
+    index = {}
+    entries = []
+    for path, (x, y), (w, h) in zip(paths, positions, sizes):
+        name = path.replace(os.sep, "/").encode()
+        source = os.stat(path)
+        entries.append(ENTRY.pack(x, y, w, h, source.st_mtime_ns, source.st_size, len(name))
+                       + name)
+        index[path.replace(os.sep, "/")] = (x, y, w, h)
+
+    index_size = HEADER.size + sum(len(entry) for entry in entries)
+    offset = -(-index_size // PAGE) * PAGE
+    with open(output, "wb") as file:
+        file.write(HEADER.pack(MAGIC, VERSION, width, height, FORMAT.encode(), len(paths),
+                               offset))
+        file.write(b"".join(entries))
+        file.write(bytes(offset - index_size))
+        file.write(pixels)
+    return index
+
+
+def image_paths(directory="images"):
+    """Every PNG one folder down from directory, in a stable order."""
+    return sorted(glob.glob(os.path.join(directory, "*", "*.png")))
+
+
+class Atlas:
+    """A memory-mapped atlas file, handing out its images as subsurfaces."""
+    def __init__(self, path=ATLAS_PATH):
+        with open(path, "rb") as file:
+            # copy-on-write, so drawing onto an image by mistake never reaches the file
+            self.map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_COPY)
+
+        magic, version, width, height, pixel_format, count, offset = \
+            HEADER.unpack_from(self.map)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not an Air Shooter atlas")
+
+        self.rects = {}
+        # modification time and size of each PNG when it was packed
+        self.sources = {}
+        position = HEADER.size
+        for _ in range(count):
+            x, y, w, h, mtime, size, length = ENTRY.unpack_from(self.map, position)
+            position += ENTRY.size
+            name = bytes(self.map[position:position + length]).decode()
+            position += length
+            self.rects[name] = pygame.Rect(x, y, w, h)
+            self.sources[name] = (mtime, size)
+
+        pixels = memoryview(self.map)[offset:offset + width * height * 4]
+        self.sheet = pygame.image.frombuffer(pixels, (width, height), pixel_format.decode())
+        self.images = {}
+
+    def __contains__(self, path):
+        return path.replace(os.sep, "/") in self.rects
+
+    def __len__(self):
+        return len(self.rects)
+
+    def stale(self):
+        """True if a packed PNG was changed or removed since the atlas was built."""
+        for name, packed in self.sources.items():
+            try:
+                source = os.stat(name)
+            except OSError:
+                return True
+            if (source.st_mtime_ns, source.st_size) != packed:
+                return True
+        return False
+
+    def image(self, path):
+        """Return the image packed from path, or None if the atlas lacks it."""
+        name = path.replace(os.sep, "/")
+        image = self.images.get(name)
+        if image is None:
+            rect = self.rects.get(name)
+            if rect is None:
+                return None
+            image = self.images[name] = self.sheet.subsurface(rect)
+        return image
+
+
+def load_atlas(path=ATLAS_PATH):
+    """Return the Atlas at path, or None if it is missing, out of date or an older format."""
+    if not os.path.exists(path):
+        return None
+    try:
+        atlas = Atlas(path)
+    except (ValueError, struct.error):
+        return None
+    return None if atlas.stale() else atlas
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pack the game's images into an atlas file.")
+    parser.add_argument("--images", default="images", help="folder of image folders to pack")
+    parser.add_argument("--output", default=ATLAS_PATH, help="atlas file to write")
+    args = parser.parse_args()
+
+    paths = image_paths(args.images)
+    index = build_atlas(paths, args.output)
+    print(f"packed {len(index)} images into {args.output} "
+          f"({os.path.getsize(args.output) // 1024} KiB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,332 @@
+"""Many games advanced together in batched NumPy arrays.
+
+BatchEngine holds num_games independent games as arrays with one entry
+per game: the ship's position, a fixed number of bullet and obstacle slots
+with alive masks, the clouds, the score, the ships left and the respawn
+pause. step() applies one tick of inputs to every game and advances them
+all with a handful of array operations, in the same order and with the
+same rules as the game's systems: the ship, the bullets with culling, the
+obstacles' movement and respawns, bullet and ship collisions, the clouds,
+and scoring with lost ships, game over and wave refills.
+
+Random placement comes from one generator shared by every game, drawn in
+game then slot order. Given a generator that hands out the same numbers,
+a single-game engine plays out exactly like Simulation. Obstacles from a
+level file (Settings.waves) are not covered.
+"""
+from air_shooter import CLOUD_IMAGES, OBSTACLE_IMAGES, Settings
+from assets import asset_manager
+from entity_store import np, require_numpy, round_rect
+
+
+class BatchEngine:
+    """Run num_games games side by side in arrays."""
+    def __init__(self, num_games, settings=None, seed=None, rng=None):
+        require_numpy("BatchEngine")
+
+        self.settings = settings = settings if settings is not None else Settings()
+        if settings.waves is not None:
+            raise ValueError("BatchEngine does not cover obstacles from a level file")
+        self.num_games = num_games
+        # anything with numpy's Generator.integers(low, high, size) will do.
+        self.rng = rng if rng is not None else np.random.default_rng(seed)
+
+        # the ship only moves up and down, so its x and size are shared.
+        ship = asset_manager.image("images/ship", "ship.png").get_rect()
+        ship.center = (settings.screen_width // 2 / 2, settings.screen_height // 2)
+        self.ship_x = ship.x
+        self.ship_width, self.ship_height = ship.size
+        self.ship_start = float(ship.centery)
+
+        self.bullet_offset_x = ship.width // 2 - settings.bullet_width // 2
+        self.bullet_offset_y = settings.bullet_height // 2
+
+        # obstacle slot i always holds OBSTACLE_IMAGES[i], in add_new_obstacles() order.
+        sizes = [asset_manager.image("images/obstacles", filename).get_size()
+                 for filename in OBSTACLE_IMAGES]
+        self.obstacle_width = np.array([size[0] for size in sizes])
+        self.obstacle_height = np.array([size[1] for size in sizes])
+        self.cloud_width = np.array([asset_manager.image("images/cloud", filename).get_width()
+                                     for filename in CLOUD_IMAGES])
+
+        games, bullets, obstacles = num_games, settings.bullets_allowed, len(OBSTACLE_IMAGES)
+
+        # player input held for the next tick.
+        self.move_up = np.zeros(games, dtype=bool)
+        self.move_down = np.zeros(games, dtype=bool)
+
+        self.ship_center = np.full(games, self.ship_start)
+        self.ship_y = np.full(games, ship.y, dtype=np.int64)
+
+        # bullets: exact x, rect position and firing order for resolving hits.
+        # These are stored slot by game, and fire() always takes the lowest
+        # free slot, so the slots in use are one block of rows at the top.
+        self.bullet_alive = np.zeros((bullets, games), dtype=bool)
+        self.bullet_x = np.zeros((bullets, games))
+        self.bullet_rect_x = np.zeros((bullets, games), dtype=np.int64)
+        self.bullet_rect_y = np.zeros((bullets, games), dtype=np.int64)
+        self.bullet_order = np.zeros((bullets, games), dtype=np.int64)
+        self.shots_fired = 0
+        # no game has a live bullet at or past this slot.
+        self.slots_used = 0
+
+        # obstacles: drawing position and collision rect, which like Obstacles
+        # keeps its old y after a respawn.
+        self.obstacle_alive = np.zeros((games, obstacles), dtype=bool)
+        self.obstacle_x = np.zeros((games, obstacles))
+        self.obstacle_y = np.zeros((games, obstacles), dtype=np.int64)
+        self.obstacle_rect_x = np.zeros((games, obstacles), dtype=np.int64)
+        self.obstacle_rect_y = np.zeros((games, obstacles), dtype=np.int64)
+
+        self.cloud_x = np.zeros((games, len(CLOUD_IMAGES)))
+        self.cloud_y = np.zeros((games, len(CLOUD_IMAGES)), dtype=np.int64)
+
+        self.score = np.zeros(games, dtype=np.int64)
+        self.ships_left = np.full(games, settings.ship_lives, dtype=np.int64)
+        self.respawn_ticks = np.zeros(games, dtype=np.int64)
+        self.active = np.zeros(games, dtype=bool)
+
+        # place the first wave and the clouds the way Simulation does.
+        every_game = np.ones(games, dtype=bool)
+        self.new_wave(every_game)
+        x, y = self.spawn(np.ones(self.cloud_x.shape, dtype=bool), settings.cloud_spawn,
+                          settings.cloud_heights)
+        self.cloud_x[:] = (settings.screen_width + x).reshape(self.cloud_x.shape)
+        self.cloud_y[:] = y.reshape(self.cloud_y.shape)
+
+    @property
+    def done(self):
+        """Mask of the games that are over (or not started)."""
+        return ~self.active
+
+    def spawn(self, mask, x_range, y_range):
+        """Draw an (x, y) offset pair for every True in mask, in game then slot order.
+
+        The ranges are (low, high) pairs from Settings, both ends included.
+        """
+        (low_x, high_x), (low_y, high_y) = x_range, y_range
+        draws = self.rng.integers([low_x, low_y], [high_x + 1, high_y + 1],
+                                  size=(int(np.count_nonzero(mask)), 2))
+        return draws[:, 0], draws[:, 1]
+
+    def new_wave(self, games):
+        """Fill every obstacle slot of the masked games, like add_new_obstacles()."""
+        mask = np.zeros(self.obstacle_alive.shape, dtype=bool)
+        mask[games] = True
+        x, y = self.spawn(mask, self.settings.obstacle_spawn, self.settings.obstacle_lanes)
+        x = self.settings.screen_width + x
+
+        self.obstacle_alive[games] = True
+        self.obstacle_x[mask] = x
+        self.obstacle_y[mask] = y
+        self.obstacle_rect_x[mask] = x
+        self.obstacle_rect_y[mask] = y
+
+    def reset_ship(self, games):
+        self.ship_center[games] = self.ship_start
+        self.ship_y[games] = round_rect(self.ship_center[games]) - self.ship_height // 2
+
+    def start_game(self, games):
+        """Reset the masked games and start them, like start_game()."""
+        self.ships_left[games] = self.settings.ship_lives
+        self.score[games] = 0
+        self.respawn_ticks[games] = 0
+        self.active[games] = True
+
+        self.bullet_alive[:self.slots_used, games] = False
+        self.obstacle_alive[games] = False
+        self.new_wave(games)
+        self.reset_ship(games)
+
+    def fire(self, shots):
+        """Fire shots[i] bullets from ship i, as long as it has free slots."""
+        for shot in range(int(shots.max(initial=0))):
+            # every slot from slots_used on is free, so look no further than that.
+            free = ~self.bullet_alive[:min(self.slots_used + 1, len(self.bullet_alive))]
+            games = np.flatnonzero((shots > shot) & free.any(axis=0))
+            if not len(games):
+                break
+            slots = free[:, games].argmax(axis=0)
+
+            self.bullet_alive[slots, games] = True
+            x = self.ship_x + self.bullet_offset_x
+            self.bullet_x[slots, games] = x
+            self.bullet_rect_x[slots, games] = x
+            self.bullet_rect_y[slots, games] = (round_rect(self.ship_center[games]) -
+                                                self.bullet_offset_y)
+            self.bullet_order[slots, games] = self.shots_fired
+            self.shots_fired += 1
+            self.slots_used = max(self.slots_used, slots.max() + 1)
+
+    def step(self, up=False, down=False, fire=0, click=False):
+        """Apply one tick of inputs to every game, advance them and return the score gained.
+
+        Each input is a scalar for every game or an array with one value
+        per game; fire is the number of shots, like Inputs.fire.
+        """
+        games = self.num_games
+        self.move_up[:] = np.broadcast_to(up, games)
+        self.move_down[:] = np.broadcast_to(down, games)
+
+        starting = np.broadcast_to(click, games) & ~self.active
+        if starting.any():
+            self.start_game(starting)
+        self.fire(np.broadcast_to(np.asarray(fire, dtype=np.int64), games))
+
+        score = self.score.copy()
+        self.update_game()
+        return self.score - score
+
+    def update_game(self):
+        """Advance every active game by one tick, like the game's systems."""
+        paused = self.active & (self.respawn_ticks > 0)
+        np.subtract(self.respawn_ticks, 1, out=self.respawn_ticks, where=paused)
+        running = self.active & ~paused
+
+        # drop the rows of slots that emptied since the last tick.
+        used = np.flatnonzero(self.bullet_alive[:self.slots_used].any(axis=1))
+        self.slots_used = used[-1] + 1 if len(used) else 0
+
+        # the systems of a tick, in Settings.systems order
+        self.move_ship(running)
+        self.move_bullets(running)
+        self.move_obstacles(running)
+        scored = self.collide_bullets(running)
+        hit = self.ship_hits(running)
+        self.move_clouds(running)
+
+        np.add(self.score, self.settings.points, out=self.score, where=scored)
+        self.lose_ships(hit)
+        self.refill_waves(running)
+
+    def move_ship(self, games):
+        """Move the ships, like Ship.update."""
+        speed = self.settings.ship_speed
+        down = games & self.move_down & (self.ship_y + self.ship_height <
+                                         self.settings.screen_height)
+        up = games & self.move_up & (self.ship_y > 0)
+        np.add(self.ship_center, speed, out=self.ship_center, where=down)
+        np.subtract(self.ship_center, speed, out=self.ship_center, where=up)
+        self.ship_y[:] = round_rect(self.ship_center) - self.ship_height // 2
+
+    def move_bullets(self, games):
+        """Move the bullets and recycle those off the right edge, like move_bullets()."""
+        used = self.slots_used
+        x = self.bullet_x[:used]
+        np.add(x, self.settings.bullet_speed, out=x, where=self.bullet_alive[:used] & games)
+        self.bullet_rect_x[:used] = round_rect(x)
+        self.bullet_alive[:used] &= ~(games & (self.bullet_rect_x[:used] >=
+                                               self.settings.screen_width))
+
+    def move_obstacles(self, games):
+        """Move the obstacles and respawn those past the left edge, like Obstacles.update."""
+        mask = self.obstacle_alive & games[:, None]
+        np.subtract(self.obstacle_x, self.settings.obs_speed, out=self.obstacle_x, where=mask)
+        np.copyto(self.obstacle_rect_x, round_rect(self.obstacle_x), where=mask)
+
+        gone = mask & (self.obstacle_x < -self.obstacle_width)
+        if gone.any():
+            x, y = self.spawn(gone, self.settings.obstacle_spawn, self.settings.obstacle_lanes)
+            self.obstacle_x[gone] = self.settings.screen_width + x
+            self.obstacle_y[gone] = y
+
+    def move_clouds(self, games):
+        """Move the clouds and respawn those past the left edge, like Clouds.update."""
+        np.subtract(self.cloud_x, self.settings.game_speed, out=self.cloud_x,
+                    where=games[:, None])
+        gone = games[:, None] & (self.cloud_x < -self.cloud_width)
+        if gone.any():
+            x, y = self.spawn(gone, self.settings.cloud_spawn, self.settings.cloud_heights)
+            self.cloud_x[gone] = self.settings.screen_width + x
+            self.cloud_y[gone] = y
+
+    def collide_bullets(self, games):
+        """Remove touching bullet/obstacle pairs and return the mask of games with a hit.
+
+        Like groupcollide(bullets, obstacles, True, True), each obstacle is
+        taken by the first bullet, in firing order, that overlaps it.
+        """
+        settings = self.settings
+        used = self.slots_used
+        bullets = self.bullet_alive[:used] & games
+
+        # only games where a bullet reached the nearest obstacle can have a hit.
+        lowest, highest = np.iinfo(np.int64).min, np.iinfo(np.int64).max
+        front = np.where(bullets, self.bullet_rect_x[:used], lowest).max(axis=0,
+                                                                         initial=lowest)
+        nearest = np.where(self.obstacle_alive, self.obstacle_rect_x, highest).min(axis=1)
+        near = np.flatnonzero(front + settings.bullet_width > nearest)
+        scored = np.zeros(self.num_games, dtype=bool)
+        if not len(near):
+            return scored
+
+        # games x slots x obstacles for the games that might have a hit.
+        bx = self.bullet_rect_x[:used, near].T[:, :, None]
+        by = self.bullet_rect_y[:used, near].T[:, :, None]
+        ox, oy = self.obstacle_rect_x[near, None, :], self.obstacle_rect_y[near, None, :]
+        hits = ((bx < ox + self.obstacle_width) & (ox < bx + settings.bullet_width) &
+                (by < oy + self.obstacle_height) & (oy < by + settings.bullet_height) &
+                bullets[:, near].T[:, :, None] & self.obstacle_alive[near, None, :])
+
+        obstacle_hit = hits.any(axis=1)
+        if obstacle_hit.any():
+            order = np.where(hits, self.bullet_order[:used, near].T[:, :, None], highest)
+            first = order.argmin(axis=1)
+            game, obstacle = np.nonzero(obstacle_hit)
+            self.bullet_alive[first[game, obstacle], near[game]] = False
+            self.obstacle_alive[near] &= ~obstacle_hit
+            scored[near] = obstacle_hit.any(axis=1)
+        return scored
+
+    def ship_hits(self, games):
+        """Return the mask of games whose ship touches an obstacle."""
+        ship_y = self.ship_y[:, None]
+        return (games[:, None] & self.obstacle_alive &
+                (self.ship_x < self.obstacle_rect_x + self.obstacle_width) &
+                (self.obstacle_rect_x < self.ship_x + self.ship_width) &
+                (ship_y < self.obstacle_rect_y + self.obstacle_height) &
+                (self.obstacle_rect_y < ship_y + self.ship_height)).any(axis=1)
+
+    def lose_ships(self, hit):
+        """Take a ship from the hit games or end them, like lose_ship()."""
+        if not hit.any():
+            return
+
+        lost = hit & (self.ships_left > 0)
+        self.ships_left[lost] -= 1
+        self.bullet_alive[:self.slots_used, lost] = False
+        self.obstacle_alive[lost] = False
+        self.new_wave(lost)
+        self.reset_ship(lost)
+        self.respawn_ticks[lost] = round(self.settings.hit_pause * self.settings.tick_rate)
+
+        self.active[hit & ~lost] = False
+
+    def refill_waves(self, games):
+        """Clear the bullets and start a new wave where every obstacle was shot."""
+        cleared = games & ~self.obstacle_alive.any(axis=1)
+        if cleared.any():
+            self.bullet_alive[:self.slots_used, cleared] = False
+            self.new_wave(cleared)
+
+    def run(self, ticks, **inputs):
+        """Step every game with the same inputs for a number of ticks."""
+        for _ in range(ticks):
+            self.step(**inputs)
+
+    def bullet_positions(self, game):
+        """Return game's bullets as (x, y) rect positions in firing order."""
+        slots = np.flatnonzero(self.bullet_alive[:, game])
+        slots = slots[np.argsort(self.bullet_order[slots, game])]
+        return tuple(zip(self.bullet_rect_x[slots, game].tolist(),
+                         self.bullet_rect_y[slots, game].tolist()))
+
+    def obstacle_positions(self, game):
+        """Return game's obstacles as (x, y, filename), like Simulation's State."""
+        return tuple((self.obstacle_x[game, slot].item(), self.obstacle_y[game, slot].item(),
+                      OBSTACLE_IMAGES[slot])
+                     for slot in np.flatnonzero(self.obstacle_alive[game]))
+
+    def cloud_positions(self, game):
+        return tuple((x, y, filename) for x, y, filename in zip(
+            self.cloud_x[game].tolist(), self.cloud_y[game].tolist(), CLOUD_IMAGES))
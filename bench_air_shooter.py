@@ -0,0 +1,228 @@
+"""Frame-time benchmarks for the functions the game runs every frame.
+
+Times update_screen(), update_bullets(), update_obstacles(),
+Scoreboard.prep_score() and one whole frame of the run_game() loop
+with 1 to 10,000 bullets and obstacles on screen, under SDL's dummy video
+driver so no window is needed. collide_rect and collide_mask time the
+bullet/obstacle collision test in each precision with every obstacle's
+rect touched by a bullet, the worst case for mask tests. For each case it reports the median and
+99th percentile time and the peak memory allocated by one call.
+
+    python bench_air_shooter.py --save-baseline baseline.json
+    python bench_air_shooter.py --baseline baseline.json
+
+With --baseline the run exits with status 1 if any median got slower than
+the saved one by more than --tolerance.
+"""
+import os
+import sys
+import json
+import argparse
+import statistics
+import tracemalloc
+from time import perf_counter
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame
+
+from air_shooter import (Settings, Ship, Bullet, BulletPool, Obstacles, Clouds, GameStats,
+                         Button, Scoreboard, CLOUD_IMAGES, OBSTACLE_IMAGES, key_mouse_events,
+                         update_bullets, update_game, update_obstacles, update_screen)
+from collision import SpatialHash
+
+
+COUNTS = [1, 10, 100, 1000, 10000]
+BENCHMARKS = ["update_screen", "update_bullets", "update_obstacles", "prep_score", "frame",
+              "collide_rect", "collide_mask"]
+
+
+class World:
+    """A game with count bullets and count obstacles laid out on screen."""
+    def __init__(self, screen, count, seed=0):
+        self.settings = settings = Settings()
+        settings.bullets_allowed = count
+        settings.rng.seed(seed)
+        self.screen = screen
+
+        self.ship = Ship(settings, screen)
+        self.stats = GameStats(settings)
+        self.stats.game_active = True
+        self.stats.score = 1234560
+        self.sb = Scoreboard(settings, screen, self.stats)
+        self.play_button = Button(screen, "Start")
+        self.clouds = [Clouds(settings, screen, filename) for filename in CLOUD_IMAGES]
+
+        # keep the ship at the top, bullets above the obstacle lanes and
+        # everything on screen, so nothing collides and the counts hold.
+        self.ship.center = 60
+        self.ship.rect.centery = 60
+        rng = settings.rng
+        self.bullets = BulletPool(settings, screen)
+        for _ in range(count):
+            bullet = self.bullets.fire(self.ship)
+            bullet.x = float(rng.randint(0, 800))
+            bullet.rect.y = rng.randint(100, 190)
+        self.obstacles = pygame.sprite.Group()
+        for index in range(count):
+            obstacle = Obstacles(settings, screen, OBSTACLE_IMAGES[index % len(OBSTACLE_IMAGES)])
+            obstacle.x = rng.randint(0, settings.screen_width)
+            obstacle.rect.x = obstacle.x
+            self.obstacles.add(obstacle)
+
+        # one bullet on the top left corner of every obstacle's rect, where
+        # the rects overlap but the images mostly do not.
+        self.touching = pygame.sprite.Group()
+        for obstacle in self.obstacles:
+            bullet = Bullet(settings, screen)
+            bullet.rect.topleft = obstacle.rect.topleft
+            self.touching.add(bullet)
+
+        self.saved = ([bullet.x for bullet in self.bullets],
+                      [(obstacle.x, obstacle.y) for obstacle in self.obstacles])
+
+    def reset(self):
+        """Put every sprite back where it started."""
+        bullet_xs, obstacle_positions = self.saved
+        for bullet, x in zip(self.bullets, bullet_xs):
+            bullet.x = x
+            bullet.rect.x = x
+        for obstacle, (x, y) in zip(self.obstacles, obstacle_positions):
+            obstacle.x = x
+            obstacle.y = y
+            obstacle.rect.topleft = (x, y)
+
+    def call(self, name):
+        """Return a function that runs one benchmark once."""
+        s = self
+        if name == "update_screen":
+            return lambda: update_screen(s.settings, s.screen, s.ship, s.bullets, s.obstacles,
+                                         s.clouds, s.stats, s.sb, s.play_button)
+        if name == "update_bullets":
+            return lambda: update_bullets(s.settings, s.screen, s.bullets, s.obstacles,
+                                          s.stats, s.sb)
+        if name == "update_obstacles":
+            return lambda: update_obstacles(s.settings, s.screen, s.ship, s.obstacles,
+                                            s.bullets, s.stats, s.sb)
+        if name == "prep_score":
+            return s.sb.prep_score
+        if name == "frame":
+            return self.frame
+        if name in ("collide_rect", "collide_mask"):
+            grid = SpatialHash(s.settings.screen_width, s.settings.screen_height,
+                               s.settings.collision_cell_size, precision=name[len("collide_"):])
+            return lambda: grid.groupcollide(s.touching, s.obstacles, False, False)
+        raise ValueError(f"unknown benchmark {name!r}")
+
+    def frame(self):
+        """One pass of the run_game() loop at one tick per frame."""
+        s = self
+        key_mouse_events(s.settings, s.screen, s.ship, s.bullets, s.obstacles, s.stats,
+                         s.play_button, s.sb)
+        update_game(s.settings, s.screen, s.ship, s.bullets, s.obstacles, s.clouds, s.stats,
+                    s.sb)
+        update_screen(s.settings, s.screen, s.ship, s.bullets, s.obstacles, s.clouds, s.stats,
+                      s.sb, s.play_button)
+
+
+def percentile(samples, fraction):
+    """Nearest-rank percentile of a list of samples."""
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, round(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+def measure(world, name, samples):
+    """Time one benchmark and return its median, p99 and peak allocation."""
+    func = world.call(name)
+    times = []
+    for _ in range(samples):
+        world.reset()
+        start = perf_counter()
+        func()
+        times.append((perf_counter() - start) * 1000)
+
+    # tracing slows every allocation down, so measure memory in its own pass.
+    world.reset()
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "median_ms": statistics.median(times),
+        "p99_ms": percentile(times, 0.99),
+        "alloc_kib": peak / 1024,
+    }
+
+
+def run_suite(counts=COUNTS, samples=30, benchmarks=BENCHMARKS):
+    """Run every benchmark at every entity count and return the results."""
+    pygame.display.init()
+    pygame.font.init()
+    settings = Settings()
+    screen = pygame.display.set_mode((settings.screen_width, settings.screen_height))
+
+    results = {}
+    for count in counts:
+        world = World(screen, count)
+        for name in benchmarks:
+            results[f"{name}/{count}"] = measure(world, name, samples)
+
+    pygame.display.quit()
+    return results
+
+
+def compare(results, baseline, tolerance=0.2, floor_ms=0.05):
+    """Return the cases whose median got slower than the baseline allows.
+
+    Differences under floor_ms are ignored, they are timer noise.
+    """
+    regressions = []
+    for case, result in results.items():
+        old = baseline.get(case)
+        if old is None:
+            continue
+        limit = max(old["median_ms"] * (1 + tolerance), old["median_ms"] + floor_ms)
+        if result["median_ms"] > limit:
+            regressions.append((case, old["median_ms"], result["median_ms"]))
+    return regressions
+
+
+def print_results(results):
+    print(f"{'case':<24}{'median ms':>12}{'p99 ms':>12}{'alloc KiB':>12}")
+    for case, result in results.items():
+        print(f"{case:<24}{result['median_ms']:>12.3f}{result['p99_ms']:>12.3f}"
+              f"{result['alloc_kib']:>12.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Air Shooter's per-frame functions.")
+    parser.add_argument("--counts", default=",".join(map(str, COUNTS)),
+                        help="comma separated bullet/obstacle counts")
+    parser.add_argument("--samples", type=int, default=30, help="timed calls per case")
+    parser.add_argument("--save-baseline", metavar="FILE", help="write the results to FILE")
+    parser.add_argument("--baseline", metavar="FILE", help="fail if slower than FILE")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="allowed slowdown against the baseline (0.2 is 20%%)")
+    args = parser.parse_args()
+
+    counts = [int(count) for count in args.counts.split(",")]
+    results = run_suite(counts, args.samples)
+    print_results(results)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as file:
+            json.dump(results, file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            regressions = compare(results, json.load(file), args.tolerance)
+        for case, old, new in regressions:
+            print(f"REGRESSION {case}: {old:.3f} ms -> {new:.3f} ms")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
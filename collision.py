@@ -0,0 +1,134 @@
+"""Spatial-hash broadphase for sprite collisions.
+
+SpatialHash splits the play field into a uniform grid of square cells and
+only runs the rect test (the narrowphase) between sprites that share a
+cell, so the cost grows with the number of nearby pairs instead of with
+len(bullets) * len(obstacles). Sprites outside the play field are kept in
+the nearest edge cells, which never misses a hit.
+
+With precision "mask" a pair whose rects overlap is only a hit if their
+collision masks (sprite.mask, see AssetManager.mask) share a pixel too, so
+the transparent padding around an image never counts. The rect test still
+runs first, so only the few pairs that are close pay for the pixel test.
+
+With only a handful of sprites, as in a normal game, building the grid costs
+more than it saves, so up to SMALL_PAIRS pairs are all tested directly.
+spritecollideany() never uses the grid, it tests one sprite against every
+rect of the group in a single Rect.collidelistall() call.
+"""
+
+
+# most pairs that are tested directly, without the grid.
+SMALL_PAIRS = 128
+
+
+class SpatialHash:
+    """Uniform grid broadphase with drop-in groupcollide and spritecollideany."""
+    def __init__(self, width, height, cell_size, precision="rect"):
+        self.cell_size = cell_size
+        self.precision = precision
+        self.cols = max(1, -(-width // cell_size))
+        self.rows = max(1, -(-height // cell_size))
+
+        # rect tests run since begin_frame() and during the previous frame.
+        self.narrowphase_tests = 0
+        self.last_frame_tests = 0
+        self.mask_tests = 0
+
+    def begin_frame(self):
+        """Start counting narrowphase tests for a new frame."""
+        self.last_frame_tests = self.narrowphase_tests
+        self.narrowphase_tests = 0
+
+    def span(self, rect):
+        """Return the first and last column and row that rect touches."""
+        size = self.cell_size
+        left = min(max(rect.left // size, 0), self.cols - 1)
+        right = min(max((rect.right - 1) // size, 0), self.cols - 1)
+        top = min(max(rect.top // size, 0), self.rows - 1)
+        bottom = min(max((rect.bottom - 1) // size, 0), self.rows - 1)
+        return left, right, top, bottom
+
+    def cells(self, rect):
+        """Return the ids of every cell rect touches."""
+        left, right, top, bottom = self.span(rect)
+        return [col * self.rows + row
+                for col in range(left, right + 1)
+                for row in range(top, bottom + 1)]
+
+    def build(self, group):
+        """Bucket every sprite in group into the cells it touches."""
+        grid = {}
+        for sprite in group:
+            for cell in self.cells(sprite.rect):
+                bucket = grid.get(cell)
+                if bucket is None:
+                    grid[cell] = [sprite]
+                else:
+                    bucket.append(sprite)
+        return grid
+
+    def nearby(self, grid, rect):
+        """Return the sprites sharing a cell with rect, each one once."""
+        found = {}
+        for cell in self.cells(rect):
+            for sprite in grid.get(cell, ()):
+                found[sprite] = None
+        return found
+
+    def groupcollide(self, groupa, groupb, dokilla, dokillb):
+        """Find sprites in groupa that touch sprites in groupb.
+
+        Works like pygame.sprite.groupcollide: returns a dict mapping each
+        sprite in groupa to the sprites in groupb it hit, and sprites killed
+        by an earlier hit are not hit again.
+        """
+        crashed = {}
+        if not groupa or not groupb:
+            return crashed
+
+        if len(groupa) * len(groupb) <= SMALL_PAIRS:
+            grid = None
+        else:
+            grid = self.build(groupb)
+        for sprite in groupa.sprites():
+            hits = []
+            nearby = groupb.sprites() if grid is None else self.nearby(grid, sprite.rect)
+            for other in nearby:
+                if dokillb and not groupb.has_internal(other):
+                    continue
+                self.narrowphase_tests += 1
+                if sprite.rect.colliderect(other.rect) and (self.precision == "rect" or
+                                                            self.masks_overlap(sprite, other)):
+                    hits.append(other)
+
+            if hits:
+                if dokillb:
+                    for other in hits:
+                        other.kill()
+                if dokilla:
+                    sprite.kill()
+                crashed[sprite] = hits
+        return crashed
+
+    def spritecollideany(self, sprite, group):
+        """Return the first sprite in group that touches sprite, or None.
+
+        One sprite against a group gains nothing from the grid, bucketing the
+        group costs more than the tests it saves, so every rect is tested at
+        once by Rect.collidelistall() and only the rects that overlap go on
+        to the mask test.
+        """
+        others = group.sprites()
+        self.narrowphase_tests += len(others)
+        for index in sprite.rect.collidelistall([other.rect for other in others]):
+            other = others[index]
+            if self.precision == "rect" or self.masks_overlap(sprite, other):
+                return other
+        return None
+
+    def masks_overlap(self, sprite, other):
+        """Return True if the masks of two sprites with overlapping rects share a pixel."""
+        self.mask_tests += 1
+        offset = (other.rect.x - sprite.rect.x, other.rect.y - sprite.rect.y)
+        return sprite.mask.overlap(other.mask, offset) is not None
@@ -0,0 +1,255 @@
+"""NumPy struct-of-arrays storage for bullets and obstacles.
+
+EntityStore keeps the position, size and speed of every bullet and
+obstacle in flat arrays instead of one Sprite per entity. Movement is one
+array add per tick and bullet/obstacle hits are found with a single
+broadcasted rectangle test, while the results follow the game's systems
+exactly: same scoring, same respawns and same calls on Settings.rng.
+"""
+import pygame
+
+# NumPy is optional: the NumPy backends (this one, batch_engine and env)
+# import it from here and call require_numpy() before they use it.
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+from air_shooter import OBSTACLE_IMAGES
+from assets import asset_manager
+
+
+def require_numpy(name):
+    if np is None:
+        raise ImportError(f"{name} needs numpy, install it with 'pip install numpy'")
+
+
+def round_rect(values):
+    """Round positions the way pygame.Rect does (half away from zero)."""
+    # astype() truncates toward zero, so adding half away from zero first rounds.
+    return (values + np.copysign(0.5, values)).astype(np.int64)
+
+
+def overlaps(ax, ay, aw, ah, bx, by, bw, bh):
+    """Return the len(a) x len(b) matrix of rect overlaps, like Rect.colliderect."""
+    return ((ax[:, None] < (bx + bw)[None, :]) & (bx[None, :] < (ax + aw)[:, None]) &
+            (ay[:, None] < (by + bh)[None, :]) & (by[None, :] < (ay + ah)[:, None]))
+
+
+class EntityStore:
+    """Hold bullets and obstacles as arrays and update them in bulk."""
+    def __init__(self, settings, screen):
+        require_numpy("EntityStore")
+        if settings.waves is not None:
+            raise ValueError("the arrays backend does not cover obstacles from a level file")
+
+        self.settings = settings
+        self.screen = screen
+        self.rng = settings.rng
+
+        # bullets: exact x plus the rounded rect used for collisions.
+        self.bullet_x = np.zeros(0)
+        self.bullet_rect_x = np.zeros(0, dtype=np.int64)
+        self.bullet_rect_y = np.zeros(0, dtype=np.int64)
+        self.bullet_width = np.zeros(0, dtype=np.int64)
+        self.bullet_height = np.zeros(0, dtype=np.int64)
+        self.bullet_speed = np.zeros(0)
+
+        # obstacles: drawing position, collision rect and image index.
+        self.obstacle_x = np.zeros(0)
+        self.obstacle_y = np.zeros(0, dtype=np.int64)
+        self.obstacle_rect_x = np.zeros(0, dtype=np.int64)
+        self.obstacle_rect_y = np.zeros(0, dtype=np.int64)
+        self.obstacle_width = np.zeros(0, dtype=np.int64)
+        self.obstacle_height = np.zeros(0, dtype=np.int64)
+        self.obstacle_speed = np.zeros(0)
+        self.obstacle_image = np.zeros(0, dtype=np.int64)
+
+        self.images = [asset_manager.image("images/obstacles", filename)
+                       for filename in OBSTACLE_IMAGES]
+
+    @property
+    def bullet_count(self):
+        return len(self.bullet_x)
+
+    @property
+    def obstacle_count(self):
+        return len(self.obstacle_x)
+
+    def add_bullet(self, ship):
+        """Fire a bullet from the ship, placed like Bullet.reset."""
+        if self.bullet_count >= self.settings.bullets_allowed:
+            return
+        rect = pygame.Rect(0, 0, self.settings.bullet_width, self.settings.bullet_height)
+        rect.centery = ship.rect.centery
+        rect.centerx = ship.rect.centerx
+
+        self.bullet_x = np.append(self.bullet_x, float(rect.x))
+        self.bullet_rect_x = np.append(self.bullet_rect_x, rect.x)
+        self.bullet_rect_y = np.append(self.bullet_rect_y, rect.y)
+        self.bullet_width = np.append(self.bullet_width, rect.width)
+        self.bullet_height = np.append(self.bullet_height, rect.height)
+        self.bullet_speed = np.append(self.bullet_speed, float(self.settings.bullet_speed))
+
+    def add_obstacle(self, filename):
+        """Add an obstacle off screen, placed like Obstacles.__init__."""
+        x = self.settings.screen_width + self.rng.randint(*self.settings.obstacle_spawn)
+        y = self.rng.randint(*self.settings.obstacle_lanes)
+        index = OBSTACLE_IMAGES.index(filename)
+        width, height = self.images[index].get_size()
+
+        self.obstacle_x = np.append(self.obstacle_x, float(x))
+        self.obstacle_y = np.append(self.obstacle_y, y)
+        self.obstacle_rect_x = np.append(self.obstacle_rect_x, x)
+        self.obstacle_rect_y = np.append(self.obstacle_rect_y, y)
+        self.obstacle_width = np.append(self.obstacle_width, width)
+        self.obstacle_height = np.append(self.obstacle_height, height)
+        self.obstacle_speed = np.append(self.obstacle_speed, float(self.settings.obs_speed))
+        self.obstacle_image = np.append(self.obstacle_image, index)
+
+    def add_new_obstacles(self):
+        """Add a fresh wave of obstacles, like add_new_obstacles()."""
+        for filename in OBSTACLE_IMAGES:
+            self.add_obstacle(filename)
+
+    def keep_bullets(self, mask):
+        """Drop every bullet where mask is False."""
+        self.bullet_x = self.bullet_x[mask]
+        self.bullet_rect_x = self.bullet_rect_x[mask]
+        self.bullet_rect_y = self.bullet_rect_y[mask]
+        self.bullet_width = self.bullet_width[mask]
+        self.bullet_height = self.bullet_height[mask]
+        self.bullet_speed = self.bullet_speed[mask]
+
+    def keep_obstacles(self, mask):
+        """Drop every obstacle where mask is False."""
+        self.obstacle_x = self.obstacle_x[mask]
+        self.obstacle_y = self.obstacle_y[mask]
+        self.obstacle_rect_x = self.obstacle_rect_x[mask]
+        self.obstacle_rect_y = self.obstacle_rect_y[mask]
+        self.obstacle_width = self.obstacle_width[mask]
+        self.obstacle_height = self.obstacle_height[mask]
+        self.obstacle_speed = self.obstacle_speed[mask]
+        self.obstacle_image = self.obstacle_image[mask]
+
+    def empty_bullets(self):
+        self.keep_bullets(np.zeros(self.bullet_count, dtype=bool))
+
+    def empty_obstacles(self):
+        self.keep_obstacles(np.zeros(self.obstacle_count, dtype=bool))
+
+    def move_bullets(self):
+        """Move every bullet, like Bullet.update."""
+        self.bullet_x += self.bullet_speed
+        self.bullet_rect_x = round_rect(self.bullet_x)
+
+    def move_obstacles(self):
+        """Move every obstacle and respawn those past the left edge, like Obstacles.update."""
+        self.obstacle_x -= self.obstacle_speed
+        self.obstacle_rect_x = round_rect(self.obstacle_x)
+
+        # respawns are rare, draw them from the rng in group order.
+        for index in np.flatnonzero(self.obstacle_x < -self.obstacle_width):
+            spawn = self.rng.randint(*self.settings.obstacle_spawn)
+            self.obstacle_x[index] = self.settings.screen_width + spawn
+            self.obstacle_y[index] = self.rng.randint(*self.settings.obstacle_lanes)
+
+    def collide_bullets(self):
+        """Remove bullet/obstacle pairs that touch and return True if any did.
+
+        Like groupcollide(bullets, obstacles, True, True), each obstacle is
+        taken by the first bullet, in firing order, that overlaps it.
+        """
+        if not self.bullet_count or not self.obstacle_count:
+            return False
+
+        hits = overlaps(self.bullet_rect_x, self.bullet_rect_y,
+                        self.bullet_width, self.bullet_height,
+                        self.obstacle_rect_x, self.obstacle_rect_y,
+                        self.obstacle_width, self.obstacle_height)
+        obstacle_hit = hits.any(axis=0)
+        if not obstacle_hit.any():
+            return False
+
+        bullet_hit = np.zeros(self.bullet_count, dtype=bool)
+        bullet_hit[hits.argmax(axis=0)[obstacle_hit]] = True
+        self.keep_bullets(~bullet_hit)
+        self.keep_obstacles(~obstacle_hit)
+        return True
+
+    def ship_collides(self, ship):
+        """Return True if the ship overlaps any obstacle, like spritecollideany."""
+        rect = ship.rect
+        return bool(np.any(
+            (rect.x < self.obstacle_rect_x + self.obstacle_width) &
+            (self.obstacle_rect_x < rect.right) &
+            (rect.y < self.obstacle_rect_y + self.obstacle_height) &
+            (self.obstacle_rect_y < rect.bottom)))
+
+    def lose_ship(self, ship, stats, sb):
+        """Respond to the ship being hit, like lose_ship()."""
+        if stats.ships_left > 0:
+            stats.ships_left -= 1
+            sb.prep_ships("heart.png")
+
+            self.empty_bullets()
+            self.empty_obstacles()
+            self.add_new_obstacles()
+            ship.reset_ship_pos()
+
+            stats.respawn_ticks = round(self.settings.hit_pause * self.settings.tick_rate)
+        else:
+            stats.game_active = False
+
+    def update_game(self, ship, clouds, stats, sb):
+        """Advance the world by one tick, system by system like Settings.systems."""
+        if stats.respawning:
+            stats.respawn_ticks -= 1
+            return
+
+        # ship, bullets and obstacles
+        ship.update()
+        self.move_bullets()
+        self.keep_bullets(self.bullet_rect_x < self.settings.screen_width)
+        self.move_obstacles()
+
+        # collisions
+        hit = self.collide_bullets()
+        ship_hit = self.ship_collides(ship)
+
+        for cloud in clouds:
+            cloud.update()
+
+        # scoring
+        if hit:
+            stats.score += self.settings.points
+            sb.prep_score()
+        if ship_hit:
+            self.lose_ship(ship, stats, sb)
+        if self.obstacle_count == 0:
+            # remove existing bullets and add new obstacles
+            self.empty_bullets()
+            self.add_new_obstacles()
+
+    def start_game(self):
+        """Clear the world and add the first wave, like start_game()."""
+        self.empty_bullets()
+        self.empty_obstacles()
+        self.add_new_obstacles()
+
+    def bullet_positions(self):
+        return tuple(zip(self.bullet_rect_x.tolist(), self.bullet_rect_y.tolist()))
+
+    def obstacle_positions(self):
+        return tuple((x, y, OBSTACLE_IMAGES[image]) for x, y, image in zip(
+            self.obstacle_x.tolist(), self.obstacle_y.tolist(), self.obstacle_image.tolist()))
+
+    def draw(self):
+        """Draw every obstacle and bullet onto the screen."""
+        for x, y, image in zip(self.obstacle_x.tolist(), self.obstacle_y.tolist(),
+                               self.obstacle_image.tolist()):
+            self.screen.blit(self.images[image], (x, y))
+
+        for rect in zip(self.bullet_rect_x.tolist(), self.bullet_rect_y.tolist(),
+                        self.bullet_width.tolist(), self.bullet_height.tolist()):
+            self.screen.fill(self.settings.bullet_color, rect)
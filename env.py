@@ -0,0 +1,197 @@
+"""Gym-style environment for training and evaluating bots.
+
+AirShooterEnv wraps a headless Simulation with the usual reset()/step()
+interface:
+
+    env = AirShooterEnv()
+    obs = env.reset(seed=1)
+    obs, reward, done, info = env.step(FIRE)
+
+Actions are the numbers in ACTIONS (or an Inputs tuple), the reward is the
+score gained during the step, so it follows Settings.points, and the
+episode is done when the game is over. Observations are a dict of NumPy
+arrays with a fixed shape, padded where there are fewer bullets or
+obstacles than there is room for.
+
+VectorEnv steps many environments at once in a pool of worker processes
+and returns the observations, rewards and done flags batched into arrays
+with one row per environment.
+"""
+import multiprocessing
+
+from air_shooter import OBSTACLE_IMAGES, Settings
+from entity_store import np, require_numpy
+from simulation import Inputs, Simulation
+
+
+# action number -> inputs for one tick.
+NOOP, UP, DOWN, FIRE, UP_FIRE, DOWN_FIRE = range(6)
+ACTIONS = [
+    Inputs(),
+    Inputs(up=True),
+    Inputs(down=True),
+    Inputs(fire=True),
+    Inputs(up=True, fire=True),
+    Inputs(down=True, fire=True),
+]
+
+
+def observe(state, settings):
+    """Turn a State into a dict of fixed-size arrays.
+
+    bullets holds (x, y) and obstacles (x, y, image index) rows, with the
+    rows past bullet_count and obstacle_count left at zero.
+    """
+    bullets = np.zeros((settings.bullets_allowed, 2), dtype=np.float32)
+    if state.bullets:
+        bullets[:len(state.bullets)] = state.bullets
+
+    obstacles = np.zeros((len(OBSTACLE_IMAGES), 3), dtype=np.float32)
+    for row, (x, y, filename) in enumerate(state.obstacles):
+        obstacles[row] = (x, y, OBSTACLE_IMAGES.index(filename))
+
+    return {
+        "ship_y": np.float32(state.ship[1]),
+        "bullets": bullets,
+        "bullet_count": np.int32(len(state.bullets)),
+        "obstacles": obstacles,
+        "obstacle_count": np.int32(len(state.obstacles)),
+        "score": np.int32(state.score),
+        "ships_left": np.int32(state.ships_left),
+    }
+
+
+class AirShooterEnv:
+    """One headless game behind reset() and step()."""
+    actions = ACTIONS
+
+    def __init__(self, settings=None):
+        require_numpy("AirShooterEnv")
+
+        self.settings = settings if settings is not None else Settings()
+        if self.settings.waves is not None:
+            # observations have room for one wave of the endless game's obstacles
+            raise ValueError("AirShooterEnv does not cover obstacles from a level file")
+        self.sim = None
+        self.state = None
+
+    def reset(self, seed=None):
+        """Start a new game and return its first observation."""
+        self.sim = Simulation(seed=seed, settings=self.settings)
+
+        # the game starts on the tick the play button is clicked.
+        self.state = self.sim.step(Inputs(click=True))
+        return observe(self.state, self.settings)
+
+    def step(self, action):
+        """Run one tick and return (obs, reward, done, info)."""
+        if self.sim is None:
+            raise RuntimeError("call reset() before step()")
+
+        inputs = action if isinstance(action, Inputs) else self.actions[action]
+        if not self.state.game_active:
+            # the game is over, hold still until the next reset().
+            return observe(self.state, self.settings), 0, True, self.info()
+
+        # clicks would start a new game, episodes only restart in reset().
+        score = self.state.score
+        self.state = self.sim.step(inputs._replace(click=False))
+        reward = self.state.score - score
+        return (observe(self.state, self.settings), reward, not self.state.game_active,
+                self.info())
+
+    def info(self):
+        return {"tick": self.state.tick, "score": self.state.score,
+                "ships_left": self.state.ships_left}
+
+
+def stack(observations):
+    """Batch a list of observation dicts into one dict of arrays."""
+    return {key: np.stack([obs[key] for obs in observations]) for key in observations[0]}
+
+
+def worker(connection, count, settings_factory):
+    """Run count environments in this process, answering commands on connection."""
+    envs = [AirShooterEnv(settings_factory()) for _ in range(count)]
+    while True:
+        command, args = connection.recv()
+        if command == "reset":
+            connection.send([env.reset(seed) for env, seed in zip(envs, args)])
+        elif command == "step":
+            connection.send([env.step(action) for env, action in zip(envs, args)])
+        elif command == "close":
+            connection.close()
+            return
+
+
+class VectorEnv:
+    """Step num_envs independent games spread over a pool of processes.
+
+    Each process owns a slice of the environments and steps them all for
+    one message, so a step costs one round trip per process rather than one
+    per game. settings_factory builds the Settings for every game and has
+    to be picklable, a class or module-level function.
+    """
+    def __init__(self, num_envs, processes=None, settings_factory=Settings):
+        require_numpy("VectorEnv")
+
+        self.num_envs = num_envs
+        processes = min(processes or multiprocessing.cpu_count(), num_envs)
+
+        # split the games as evenly as possible over the processes.
+        self.counts = [num_envs // processes + (index < num_envs % processes)
+                       for index in range(processes)]
+        self.connections = []
+        self.processes = []
+        for count in self.counts:
+            parent, child = multiprocessing.Pipe()
+            process = multiprocessing.Process(target=worker,
+                                              args=(child, count, settings_factory),
+                                              daemon=True)
+            process.start()
+            child.close()
+            self.connections.append(parent)
+            self.processes.append(process)
+
+    def split(self, values):
+        """Cut a list with one value per game into one list per process."""
+        parts = []
+        start = 0
+        for count in self.counts:
+            parts.append(values[start:start + count])
+            start += count
+        return parts
+
+    def gather(self, command, values):
+        for connection, part in zip(self.connections, self.split(list(values))):
+            connection.send((command, part))
+        results = []
+        for connection in self.connections:
+            results += connection.recv()
+        return results
+
+    def reset(self, seeds=None):
+        """Start every game, game i with seeds[i], and return the batched observations."""
+        if seeds is None:
+            seeds = [None] * self.num_envs
+        return stack(self.gather("reset", seeds))
+
+    def step(self, actions):
+        """Step every game with its action and return batched (obs, rewards, dones, infos)."""
+        results = self.gather("step", actions)
+        observations, rewards, dones, infos = zip(*results)
+        return (stack(observations), np.array(rewards, dtype=np.int64),
+                np.array(dones, dtype=bool), list(infos))
+
+    def close(self):
+        for connection in self.connections:
+            connection.send(("close", None))
+            connection.close()
+        for process in self.processes:
+            process.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,287 @@
+"""Pipelined game loop, with the simulation on a worker thread.
+
+run_game() normally does everything on one thread: the frame's events, its
+ticks and then the drawing and the flip. With Settings.pipelined (or
+`python air_shooter.py --pipelined`) the frame is split in two:
+
+    worker thread   the tick systems for this frame's ticks
+    main thread     events, then drawing and flipping the snapshot the
+                    worker finished in the frame before
+
+Blitting, filling and flipping release the GIL, so on a machine with more
+than one core the game logic runs while the frame is being drawn and
+presented. The main thread never touches a sprite: the worker hands it an
+immutable Frame through a DoubleBuffer, and it hands the worker each tick's
+Inputs, which the input system applies like a replay's. The picture is one
+frame behind the simulation.
+
+The profiler shows the systems' times as usual, though they now overlap
+the render phase, and the time the main thread waited for the worker as
+the sync phase. Frames are always redrawn in full, Settings.render_mode is
+not used here.
+"""
+import queue
+import sys
+import threading
+from collections import namedtuple
+from itertools import islice
+
+import pygame
+
+from air_shooter import GAME_IMAGES, GameStats, Scoreboard, check_quit_events
+from assets import asset_manager
+from simulation import Inputs, NullScoreboard
+
+
+# what the main thread draws of a tick: tuples of the positions at the
+# start and the end of the tick, so it can draw between them.
+#   ship        (x, previous center y, center y)
+#   bullets     (previous x, x, y) each
+#   obstacles   (previous x, x, y, filename) each
+#   clouds      (previous x, x, y, filename) each
+Frame = namedtuple("Frame", ["tick", "game_active", "score", "ships_left", "ship",
+                             "bullets", "obstacles", "clouds"])
+
+
+def take_frame(tick, world):
+    """Take a Frame snapshot of the world."""
+    ship = world.ship
+    return Frame(
+        tick=tick,
+        game_active=world.stats.game_active,
+        score=world.stats.score,
+        ships_left=world.stats.ships_left,
+        ship=(ship.rect.x, ship.prev_y, ship.rect.centery),
+        bullets=tuple((bullet.prev_x, bullet.x, bullet.rect.y) for bullet in world.bullets),
+        obstacles=tuple((obstacle.prev_x, obstacle.x, obstacle.y, obstacle.filename)
+                        for obstacle in world.obstacles),
+        clouds=tuple((cloud.prev_x, cloud.x, cloud.y, cloud.filename) for cloud in world.clouds),
+    )
+
+
+class DoubleBuffer:
+    """Two Frame slots, the back one written by the worker and the front one drawn.
+
+    publish() fills the back slot and swap() turns it into the front one, so
+    the main thread only ever sees finished snapshots.
+    """
+    def __init__(self, frame):
+        self.front = frame
+        self.back = None
+        self.lock = threading.Lock()
+
+    def publish(self, frame):
+        with self.lock:
+            self.back = frame
+
+    def swap(self):
+        """Make the newest published Frame the front one and return it."""
+        with self.lock:
+            if self.back is not None:
+                self.front, self.back = self.back, None
+            return self.front
+
+
+class SimulationThread:
+    """Run the world's tick systems on a worker thread, a frame's ticks at a time."""
+    def __init__(self, world, tick=0):
+        self.world = world
+        self.tick = tick
+        self.buffer = DoubleBuffer(take_frame(tick, world))
+        self.jobs = queue.Queue()
+        self.done = threading.Event()
+        self.done.set()
+        self.error = None
+        self.thread = threading.Thread(target=self.run, name="simulation", daemon=True)
+        self.thread.start()
+
+    def run(self):
+        world = self.world
+        systems = world.settings.systems
+        while True:
+            inputs = self.jobs.get()
+            if inputs is None:
+                return
+            try:
+                for tick_inputs in inputs:
+                    world.inputs = tick_inputs
+                    systems.tick(world)
+                    self.tick += 1
+                self.buffer.publish(take_frame(self.tick, world))
+            except BaseException as error:
+                self.error = error
+            finally:
+                self.done.set()
+
+    def submit(self, inputs):
+        """Start running one tick for each of the Inputs."""
+        self.done.clear()
+        self.jobs.put(list(inputs))
+
+    def finish(self):
+        """Wait for the submitted ticks and return the newest Frame."""
+        self.done.wait()
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+        return self.buffer.swap()
+
+    def stop(self):
+        self.jobs.put(None)
+        self.thread.join()
+
+
+class Controls:
+    """The keys held and the shots and clicks not yet handed to a tick."""
+    def __init__(self):
+        self.up = False
+        self.down = False
+        self.shots = 0
+        self.click = False
+
+    def handle_events(self, play_button, game_active):
+        """Read the window's events, like key_mouse_events() but into Inputs."""
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                sys.exit()
+            if event.type == pygame.MOUSEBUTTONDOWN:
+                if play_button.rect.collidepoint(pygame.mouse.get_pos()) and not game_active:
+                    pygame.mouse.set_visible(0)  # hide the mouse cursor
+                    self.click = True
+                    # starting the game empties the bullets
+                    self.shots = 0
+
+            if event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_DOWN:
+                    self.down = True
+                elif event.key == pygame.K_UP:
+                    self.up = True
+                elif event.key == pygame.K_SPACE:
+                    self.shots += 1
+
+            if event.type == pygame.KEYUP:
+                if event.key == pygame.K_DOWN:
+                    self.down = False
+                elif event.key == pygame.K_UP:
+                    self.up = False
+
+    def take(self, ticks):
+        """Return the Inputs of the next ticks; the first one gets the shots and click."""
+        if ticks == 0:
+            # keep them for the next frame that runs a tick
+            return []
+        first = Inputs(self.up, self.down, self.shots, self.click)
+        self.shots = 0
+        self.click = False
+        return [first] + [Inputs(self.up, self.down)] * (ticks - 1)
+
+
+def draw_frame(settings, screen, frame, alpha, sb, play_button, high_scores=None):
+    """Draw a Frame alpha of the way through its tick, then flip."""
+    profiler = settings.profiler
+    with profiler.phase("draw"):
+        screen.fill(settings.bg_color)
+
+        ship_x, prev_y, y = frame.ship
+        ship_image = asset_manager.image("images/ship", "ship.png")
+        ship_rect = ship_image.get_rect(x=ship_x)
+        ship_rect.centery = prev_y + (y - prev_y) * alpha
+        screen.blit(ship_image, ship_rect)
+
+        for prev_x, x, y, filename in frame.clouds:
+            image = asset_manager.image("images/cloud", filename)
+            screen.blit(image, image.get_rect(topleft=(prev_x + (x - prev_x) * alpha, y)))
+
+        for prev_x, x, y, filename in frame.obstacles:
+            image = asset_manager.image("images/obstacles", filename)
+            screen.blit(image, image.get_rect(topleft=(prev_x + (x - prev_x) * alpha, y)))
+
+        bullet_rect = pygame.Rect(0, 0, settings.bullet_width, settings.bullet_height)
+        for prev_x, x, y in frame.bullets:
+            bullet_rect.x = prev_x + (x - prev_x) * alpha
+            bullet_rect.y = y
+            screen.fill(settings.bullet_color, bullet_rect)
+
+        sb.draw()
+
+        if not frame.game_active:
+            play_button.draw()
+            if high_scores is not None:
+                high_scores.draw()
+
+        profiler.draw_overlay(screen)
+
+    with profiler.phase("flip"):
+        pygame.display.flip()
+
+
+def run_pipelined(world, clock, timestep, replay_inputs=None):
+    """The run_game() loop with the ticks on a SimulationThread.
+
+    world is run_game()'s World; from here on the worker owns its sprites,
+    and its scoreboard is swapped for one the main thread redraws from the
+    Frames. replay_inputs is an iterator of Inputs to play in place of the
+    keyboard and mouse.
+    """
+    settings = world.settings
+    screen = world.screen
+    profiler = settings.profiler
+    render = settings.systems["render"]
+
+    # the main thread's own copy of the numbers the scoreboard shows
+    shown = GameStats(settings)
+    shown.game_active = world.stats.game_active
+    sb = Scoreboard(settings, screen, shown)
+    world.sb = NullScoreboard()
+
+    # obstacles from a level file are built on the worker, which must find
+    # their images converted already
+    asset_manager.warm(GAME_IMAGES)
+
+    controls = Controls()
+    simulation = SimulationThread(world)
+    frame = simulation.finish()
+    alpha = 1.0
+    try:
+        while True:
+            with profiler.phase("wait"):
+                frame_ms = clock.tick(settings.fps_limit)
+            ticks = timestep.advance(frame_ms)
+
+            with profiler.phase("events"):
+                if replay_inputs is not None:
+                    check_quit_events()
+                    inputs = list(islice(replay_inputs, ticks))
+                else:
+                    controls.handle_events(world.play_button, frame.game_active)
+                    inputs = controls.take(ticks)
+
+            # the worker runs this frame's ticks while the last ones are drawn
+            simulation.submit(inputs)
+            if render.enabled:
+                with profiler.phase("render"):
+                    draw_frame(settings, screen, frame, alpha, sb, world.play_button,
+                               world.high_scores)
+
+            with profiler.phase("sync"):
+                frame = simulation.finish()
+            alpha = timestep.alpha if frame.game_active else 1.0
+
+            if frame.score != shown.score:
+                shown.score = frame.score
+                sb.prep_score()
+            if frame.ships_left != shown.ships_left:
+                shown.ships_left = frame.ships_left
+                sb.prep_ships("heart.png")
+            if shown.game_active and not frame.game_active:
+                # the tick systems never touch the display, the cursor comes back here
+                pygame.mouse.set_visible(1)
+            shown.game_active = frame.game_active
+
+            profiler.end_frame(bullets=len(frame.bullets), obstacles=len(frame.obstacles))
+
+            if len(inputs) < ticks:
+                # the replay is over
+                return
+    finally:
+        simulation.stop()
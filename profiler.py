@@ -0,0 +1,185 @@
+"""Per-phase frame profiler.
+
+FrameProfiler times each phase of the run_game() loop, keeps a rolling
+window of the timings for the on-screen overlay and histograms, and
+writes the frames' timings to a JSON or CSV file when the game exits.
+Turn it on with `python air_shooter.py --profile frames.csv`. Only the last
+max_frames frames are kept, ten minutes at 60 fps by default, so a long
+session does not grow without bound.
+
+When profiling is off the game uses NullProfiler, whose phase() hands
+back one shared do-nothing context manager, so the cost is a method call
+per phase.
+
+StartupTimer breaks down the time from launch to the first frames, for
+`python air_shooter.py --startup-profile`.
+"""
+import csv
+import json
+from collections import deque
+from contextlib import nullcontext
+from time import perf_counter
+import pygame
+
+from assets import asset_manager
+
+
+# phases of a frame, in the order the run_game() loop runs them: the events,
+# the systems of each tick and the render system, of which draw and flip are
+# the parts, then the wait for the next frame. sync is the time the pipelined
+# loop waited for its simulation thread (see pipeline.py).
+PHASES = ["events", "input", "ship", "bullets", "obstacles", "collisions", "clouds", "scoring",
+          "render", "draw", "flip", "sync", "wait"]
+
+# upper edges of the histogram buckets, in milliseconds.
+BUCKETS = [1, 2, 4, 8, 16, 33, float("inf")]
+
+
+class Phase:
+    """Context manager that adds its elapsed time to one phase of the frame."""
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        elapsed = (perf_counter() - self.start) * 1000
+        self.profiler.current[self.name] += elapsed
+
+
+class FrameProfiler:
+    """Time every phase of every frame."""
+    enabled = True
+
+    def __init__(self, path=None, history=300, max_frames=36000):
+        self.path = path
+        self.phases = {name: Phase(self, name) for name in PHASES}
+        self.current = dict.fromkeys(PHASES, 0.0)
+        self.frame_start = perf_counter()
+
+        # rolling window for the overlay, and a longer one for the export.
+        self.history = {name: deque(maxlen=history) for name in PHASES + ["frame"]}
+        self.frames = deque(maxlen=max_frames)
+        self.counts = {}
+
+        self.overlay_rect = None
+
+    def phase(self, name):
+        return self.phases[name]
+
+    def end_frame(self, **counts):
+        """Close the frame's timings and store them with the entity counts."""
+        now = perf_counter()
+        frame_ms = (now - self.frame_start) * 1000
+        self.frame_start = now
+
+        for name in PHASES:
+            self.history[name].append(self.current[name])
+        self.history["frame"].append(frame_ms)
+        self.frames.append([frame_ms] + [self.current[name] for name in PHASES] +
+                           list(counts.values()))
+        self.counts = counts
+        self.current = dict.fromkeys(PHASES, 0.0)
+
+    def average(self, name):
+        samples = self.history[name]
+        return sum(samples) / len(samples) if samples else 0.0
+
+    @property
+    def fps(self):
+        frame_ms = self.average("frame")
+        return 1000 / frame_ms if frame_ms else 0.0
+
+    def histogram(self, name):
+        """Count the rolling samples of a phase in each of BUCKETS."""
+        counts = [0] * len(BUCKETS)
+        for sample in self.history[name]:
+            for index, edge in enumerate(BUCKETS):
+                if sample < edge:
+                    counts[index] += 1
+                    break
+        return counts
+
+    def draw_overlay(self, screen):
+        """Draw FPS, per-phase times and entity counts; return the rect it covered."""
+        font = asset_manager.font(20)
+
+        lines = [f"{self.fps:5.1f} fps"]
+        lines += [f"{name:<17}{self.average(name):6.2f} ms" for name in PHASES]
+        lines += [f"{name:<17}{count:6d}" for name, count in self.counts.items()]
+
+        images = [font.render(line, True, (255, 255, 255)) for line in lines]
+        width = max(image.get_width() for image in images) + 10
+        height = sum(image.get_height() for image in images) + 10
+        rect = pygame.Rect(10, screen.get_height() - height - 10, width, height)
+
+        screen.fill((0, 0, 0), rect)
+        y = rect.y + 5
+        for image in images:
+            screen.blit(image, (rect.x + 5, y))
+            y += image.get_height()
+        self.overlay_rect = rect
+        return rect
+
+    def columns(self):
+        return ["frame_ms"] + [f"{name}_ms" for name in PHASES] + list(self.counts)
+
+    def dump(self, path=None):
+        """Write the kept frames' timings to a .json or .csv file."""
+        path = path or self.path
+        if path is None:
+            return
+        columns = self.columns()
+
+        if str(path).endswith(".json"):
+            with open(path, "w") as file:
+                json.dump([dict(zip(columns, frame)) for frame in self.frames], file)
+        else:
+            with open(path, "w", newline="") as file:
+                writer = csv.writer(file)
+                writer.writerow(columns)
+                writer.writerows(self.frames)
+
+
+class NullProfiler:
+    """Stand-in used when profiling is off; every call does nothing."""
+    enabled = False
+    overlay_rect = None
+
+    def __init__(self):
+        self.context = nullcontext()
+
+    def phase(self, name):
+        return self.context
+
+    def end_frame(self, **counts):
+        pass
+
+    def draw_overlay(self, screen):
+        return None
+
+    def dump(self, path=None):
+        pass
+
+
+class StartupTimer:
+    """Time the phases of startup, each from the end of the one before."""
+    def __init__(self, start=None):
+        self.start = self.last = start if start is not None else perf_counter()
+        self.phases = []
+
+    def mark(self, name):
+        """End the phase called name."""
+        now = perf_counter()
+        self.phases.append((name, (now - self.last) * 1000))
+        self.last = now
+
+    def report(self):
+        """Print how long each phase took and the total."""
+        for name, ms in self.phases:
+            print(f"{name:<17}{ms:8.1f} ms")
+        print(f"{'total':<17}{(self.last - self.start) * 1000:8.1f} ms")
@@ -0,0 +1,108 @@
+"""Dirty-rectangle rendering.
+
+DirtyRenderer is a drop-in for update_screen() that keeps the last frame
+on the display and only repaints what moved. Each frame it clears the
+rects the sprites covered last frame and cover now, draws the sprites
+back and passes just those regions to pygame.display.update() instead of
+filling and flipping the whole screen. The score is only blitted again
+after Scoreboard.prep_score() or prep_ships() ran or when a sprite
+crossed it, and a frame where nothing moved (like the "Start" screen)
+does no drawing at all. With a profiler overlay on, its box is repainted
+every frame.
+"""
+import pygame
+
+
+def sprite_rects(ship, bullets, obstacles, clouds, screen_rect, alpha):
+    """Return the on-screen areas the ship, clouds, obstacles and bullets cover."""
+    sprites = [ship] + list(clouds) + obstacles.sprites() + bullets.sprites()
+    rects = [sprite.rect_at(alpha).clip(screen_rect) for sprite in sprites]
+    return [rect for rect in rects if rect.width and rect.height]
+
+
+class DirtyRenderer:
+    """Redraw only the parts of the screen that changed since the last frame."""
+    def __init__(self, settings, screen):
+        self.settings = settings
+        self.screen = screen
+        self.screen_rect = screen.get_rect()
+
+        # rects the moving sprites covered in the previous frame.
+        self.last_rects = []
+        self.was_active = None
+
+    def update_screen(self, ship, bullets, obstacles, clouds, stats, sb, play_button,
+                      alpha=1.0, high_scores=None):
+        """Draw the frame and push only the changed regions to the display."""
+        if stats.game_active != self.was_active:
+            # the play button and high scores come or go, so repaint everything once.
+            self.redraw(ship, bullets, obstacles, clouds, stats, sb, play_button, alpha,
+                        high_scores)
+            return
+
+        profiler = self.settings.profiler
+        rects = sprite_rects(ship, bullets, obstacles, clouds, self.screen_rect, alpha)
+        if rects == self.last_rects and not sb.dirty and not profiler.enabled:
+            return
+
+        with profiler.phase("draw"):
+            # clear the old and new spot of every sprite, so nothing with alpha is
+            # blended over itself, then draw the sprites back in order.
+            dirty = self.last_rects + rects
+            if profiler.overlay_rect is not None:
+                dirty.append(profiler.overlay_rect)
+
+            # the score and hearts sit on top, so repaint them if anything crossed them.
+            hud = sb.dirty or any(rect.collidelist(dirty) != -1 for rect in sb.rects())
+            if hud:
+                dirty += sb.last_rects + sb.rects()
+
+            for rect in dirty:
+                self.screen.fill(self.settings.bg_color, rect)
+            self.draw_sprites(ship, bullets, obstacles, clouds, alpha)
+            if hud:
+                sb.draw()
+
+            if not stats.game_active and play_button.rect.collidelist(dirty) != -1:
+                play_button.draw()
+            if (not stats.game_active and high_scores is not None
+                    and any(rect.collidelist(dirty) != -1 for rect in high_scores.rects())):
+                high_scores.draw()
+
+            overlay = profiler.draw_overlay(self.screen)
+            if overlay is not None:
+                dirty.append(overlay)
+
+        self.last_rects = rects
+        with profiler.phase("flip"):
+            pygame.display.update(dirty)
+
+    def redraw(self, ship, bullets, obstacles, clouds, stats, sb, play_button, alpha=1.0,
+               high_scores=None):
+        """Repaint the whole screen and remember where everything is."""
+        profiler = self.settings.profiler
+        with profiler.phase("draw"):
+            self.screen.fill(self.settings.bg_color)
+            self.draw_sprites(ship, bullets, obstacles, clouds, alpha)
+            sb.draw()
+            if not stats.game_active:
+                play_button.draw()
+                if high_scores is not None:
+                    high_scores.draw()
+            profiler.draw_overlay(self.screen)
+        with profiler.phase("flip"):
+            pygame.display.flip()
+
+        self.last_rects = sprite_rects(ship, bullets, obstacles, clouds, self.screen_rect,
+                                       alpha)
+        self.was_active = stats.game_active
+
+    def draw_sprites(self, ship, bullets, obstacles, clouds, alpha):
+        """Draw the moving sprites in the same order as update_screen()."""
+        ship.draw(alpha)
+        for cloud in clouds:
+            cloud.draw(alpha)
+        for obstacle in obstacles.sprites():
+            obstacle.draw(alpha)
+        for bullet in bullets.sprites():
+            bullet.draw(alpha)
@@ -0,0 +1,115 @@
+"""Record and replay games tick by tick.
+
+A replay file starts with a small header holding the seed for
+Settings.rng and the tick rate, followed by one byte per tick:
+
+    bit 0     up held
+    bit 1     down held
+    bit 2     play button clicked
+    bits 3-7  shots fired (0-31)
+
+The same seed and inputs always play out the same game, so a file can be
+played back in real time with `python air_shooter.py --replay FILE` or as
+fast as possible with play_fast(). Files are written and read in small
+buffered chunks, so very long sessions never have to fit in memory.
+"""
+import struct
+
+from simulation import Inputs, Simulation
+
+
+MAGIC = b"ASRP"
+# version 2: each tick moves bullets and obstacles once, see systems.py
+VERSION = 2
+HEADER = struct.Struct("<4sBQH")
+MAX_SHOTS = 31
+CHUNK_SIZE = 4096
+
+
+def pack_inputs(up, down, click, shots):
+    """Pack one tick of inputs into a byte."""
+    return int(up) | int(down) << 1 | int(click) << 2 | min(shots, MAX_SHOTS) << 3
+
+
+def unpack_inputs(byte):
+    """Turn a packed byte back into Inputs."""
+    return Inputs(up=bool(byte & 1), down=bool(byte & 2), fire=byte >> 3,
+                  click=bool(byte & 4))
+
+
+class Recorder:
+    """Write a game's inputs to a replay file as it is played."""
+    def __init__(self, path, seed, settings):
+        self.file = open(path, "wb")
+        self.file.write(HEADER.pack(MAGIC, VERSION, seed, settings.tick_rate))
+        self.ticks = 0
+
+        # input seen since the last tick.
+        self.shots = 0
+        self.clicked = False
+
+    def fire(self):
+        self.shots += 1
+
+    def click(self):
+        # starting the game empties the bullets, so earlier shots never count.
+        self.clicked = True
+        self.shots = 0
+
+    def tick(self, ship):
+        """Write the input for the tick that is about to run."""
+        self.file.write(bytes((pack_inputs(ship.move_up, ship.move_down,
+                                           self.clicked, self.shots),)))
+        self.ticks += 1
+        self.shots = 0
+        self.clicked = False
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class Replay:
+    """Read a replay file and yield its Inputs one tick at a time."""
+    def __init__(self, path):
+        self.file = open(path, "rb")
+        header = self.file.read(HEADER.size)
+        if len(header) < HEADER.size:
+            raise ValueError(f"{path} is too short to be a replay file")
+
+        magic, version, self.seed, self.tick_rate = HEADER.unpack(header)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} replay file")
+
+    def __iter__(self):
+        while True:
+            chunk = self.file.read(CHUNK_SIZE)
+            if not chunk:
+                return
+            for byte in chunk:
+                yield unpack_inputs(byte)
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def play_fast(path, settings=None):
+    """Play a replay file headless as fast as possible and return the final State."""
+    with Replay(path) as replay:
+        sim = Simulation(seed=replay.seed, settings=settings)
+        sim.settings.tick_rate = replay.tick_rate
+        state = sim.state()
+        for inputs in replay:
+            state = sim.step(inputs)
+    return state
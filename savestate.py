@@ -0,0 +1,237 @@
+"""Compact binary snapshots of a running game.
+
+save_state() packs everything the next ticks depend on into one bytes
+buffer, and load_state() puts a game back exactly as it was, so the same
+inputs then play out the same way as they did the first time:
+
+    header      tick, GameStats, the ship's center, previous y and keys
+                held, the number of bullets, obstacles and clouds, and the
+                Random.gauss() carry-over
+    bullets     x, previous x and rect y of each, column after column
+    obstacles   x, previous x, rect x, rect y, y and image id of each
+    clouds      x, previous x and y of each
+    rng         the 625 words of Settings.rng's Mersenne Twister
+
+Columns are packed with array.array, so a snapshot of a normal game takes
+a few microseconds and about 3 KB, most of it the RNG. StateRing keeps the
+last few hundred of them for rewinding. Buffers use the machine's own byte
+order; they are meant for this process and its crash files, not for
+sharing.
+
+Obstacles from a level file (Settings.waves) and the NumPy entity backend
+are not covered.
+"""
+import struct
+from array import array
+from collections import deque
+
+from air_shooter import OBSTACLE_IMAGES, Obstacles
+
+
+MAGIC = b"ASST"
+VERSION = 1
+HEADER = struct.Struct("=4sBQ?iqidi??IIB?d")
+RNG_WORDS = 625
+
+
+class RngCache:
+    """The packed state of the last RNG saved or loaded, while it has not moved.
+
+    Unpacking and repacking the Mersenne Twister's 625 words costs more than
+    the rest of a snapshot together, and the game only draws numbers when
+    obstacles and clouds come round, so most snapshots reuse the last words.
+    Only an air_shooter.GameRandom counts its changes; any other RNG is
+    packed every time.
+    """
+    def __init__(self):
+        self.rng = None
+        self.changes = None
+        self.words = None
+
+    def fresh(self, rng):
+        changes = getattr(rng, "changes", None)
+        return changes is not None and rng is self.rng and changes == self.changes
+
+    def store(self, rng, words):
+        self.rng = rng
+        self.changes = getattr(rng, "changes", None)
+        self.words = words
+
+
+rng_cache = RngCache()
+
+
+def save_state(tick, settings, ship, bullets, obstacles, clouds, stats):
+    """Pack the game into a snapshot buffer."""
+    if settings.waves is not None:
+        raise ValueError("snapshots do not cover obstacles from a level file")
+
+    rng = settings.rng
+    if rng_cache.fresh(rng):
+        words = rng_cache.words
+        gauss_next = rng.gauss_next
+    else:
+        _, state, gauss_next = rng.getstate()
+        words = array("I", state).tobytes()
+        rng_cache.store(rng, words)
+
+    header = HEADER.pack(
+        MAGIC, VERSION, tick,
+        stats.game_active, stats.ships_left, stats.score, stats.respawn_ticks,
+        ship.center, ship.prev_y, ship.move_up, ship.move_down,
+        len(bullets), len(obstacles), len(clouds),
+        gauss_next is not None, gauss_next or 0.0,
+    )
+
+    bullets = bullets.sprites()
+    obstacles = obstacles.sprites()
+    return b"".join([
+        header,
+        array("d", [bullet.x for bullet in bullets]).tobytes(),
+        array("d", [bullet.prev_x for bullet in bullets]).tobytes(),
+        array("i", [bullet.rect.y for bullet in bullets]).tobytes(),
+        array("d", [obstacle.x for obstacle in obstacles]).tobytes(),
+        array("d", [obstacle.prev_x for obstacle in obstacles]).tobytes(),
+        # an obstacle's rect lags behind its x and y after it came round again
+        array("i", [obstacle.rect.x for obstacle in obstacles]).tobytes(),
+        array("i", [obstacle.rect.y for obstacle in obstacles]).tobytes(),
+        array("i", [obstacle.y for obstacle in obstacles]).tobytes(),
+        bytes(OBSTACLE_IMAGES.index(obstacle.filename) for obstacle in obstacles),
+        array("d", [cloud.x for cloud in clouds]).tobytes(),
+        array("d", [cloud.prev_x for cloud in clouds]).tobytes(),
+        array("i", [cloud.y for cloud in clouds]).tobytes(),
+        words,
+    ])
+
+
+class Reader:
+    """Read columns off a snapshot buffer in order."""
+    def __init__(self, buffer, offset):
+        self.view = memoryview(buffer)
+        self.offset = offset
+
+    def column(self, typecode, count):
+        values = array(typecode)
+        end = self.offset + values.itemsize * count
+        values.frombytes(self.view[self.offset:end])
+        self.offset = end
+        return values
+
+
+def load_state(buffer, settings, screen, ship, bullets, obstacles, clouds, stats, sb=None):
+    """Put the game back the way a snapshot buffer holds it and return its tick.
+
+    bullets must be a BulletPool with room for every bullet in the snapshot,
+    and clouds the same clouds the snapshot was taken of. Pass the
+    Scoreboard as sb to have its images redrawn.
+    """
+    (magic, version, tick,
+     game_active, ships_left, score, respawn_ticks,
+     center, prev_y, move_up, move_down,
+     bullet_count, obstacle_count, cloud_count,
+     has_gauss, gauss_next) = HEADER.unpack_from(buffer)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("not an Air Shooter snapshot")
+    if bullet_count > bullets.capacity:
+        raise ValueError(f"snapshot has {bullet_count} bullets, the pool holds {bullets.capacity}")
+    if cloud_count != len(clouds):
+        raise ValueError(f"snapshot has {cloud_count} clouds, the game has {len(clouds)}")
+
+    reader = Reader(buffer, HEADER.size)
+    bullet_x = reader.column("d", bullet_count)
+    bullet_prev_x = reader.column("d", bullet_count)
+    bullet_y = reader.column("i", bullet_count)
+    obstacle_x = reader.column("d", obstacle_count)
+    obstacle_prev_x = reader.column("d", obstacle_count)
+    obstacle_rect_x = reader.column("i", obstacle_count)
+    obstacle_rect_y = reader.column("i", obstacle_count)
+    obstacle_y = reader.column("i", obstacle_count)
+    obstacle_image = reader.column("B", obstacle_count)
+    cloud_x = reader.column("d", cloud_count)
+    cloud_prev_x = reader.column("d", cloud_count)
+    cloud_y = reader.column("i", cloud_count)
+    words = bytes(reader.view[reader.offset:reader.offset + 4 * RNG_WORDS])
+
+    stats.game_active = game_active
+    stats.ships_left = ships_left
+    stats.score = score
+    stats.respawn_ticks = respawn_ticks
+
+    ship.center = center
+    ship.rect.centery = center
+    ship.prev_y = prev_y
+    ship.move_up = move_up
+    ship.move_down = move_down
+
+    # bullets are alike, so the live ones are reused in place and only the
+    # difference is fired or sent back to the pool. Their order is kept, it
+    # decides which bullet hits first.
+    live = bullets.sprites()
+    for bullet in live[bullet_count:]:
+        bullets.remove(bullet)
+    for _ in range(bullet_count - len(live)):
+        bullets.fire(ship)
+    for bullet, x, prev_x, y in zip(bullets.sprites(), bullet_x, bullet_prev_x, bullet_y):
+        bullet.x = x
+        bullet.prev_x = prev_x
+        bullet.rect.x = x
+        bullet.rect.y = y
+
+    # obstacles are reused too when they have the same images in the same order
+    filenames = [OBSTACLE_IMAGES[image] for image in obstacle_image]
+    if [obstacle.filename for obstacle in obstacles] != filenames:
+        obstacles.empty()
+        for filename in filenames:
+            obstacles.add(Obstacles(settings, screen, filename, x=0, y=0))
+    for index, obstacle in enumerate(obstacles.sprites()):
+        obstacle.x = obstacle_x[index]
+        obstacle.prev_x = obstacle_prev_x[index]
+        obstacle.y = obstacle_y[index]
+        obstacle.rect.x = obstacle_rect_x[index]
+        obstacle.rect.y = obstacle_rect_y[index]
+
+    for cloud, x, prev_x, y in zip(clouds, cloud_x, cloud_prev_x, cloud_y):
+        cloud.x = x
+        cloud.prev_x = prev_x
+        cloud.y = y
+
+    # the RNG is left alone when it is already in the snapshot's state
+    rng = settings.rng
+    gauss_next = gauss_next if has_gauss else None
+    if not (rng_cache.fresh(rng) and rng_cache.words == words and rng.gauss_next == gauss_next):
+        rng.setstate((3, tuple(array("I", words)), gauss_next))
+        rng_cache.store(rng, words)
+
+    if sb is not None:
+        sb.prep_score()
+        sb.prep_ships("heart.png")
+    return tick
+
+
+class StateRing:
+    """The last size snapshots, newest last, for rewinding."""
+    def __init__(self, size=300):
+        self.states = deque(maxlen=size)
+
+    def __len__(self):
+        return len(self.states)
+
+    def push(self, buffer):
+        """Keep buffer, dropping the oldest snapshot once the ring is full."""
+        self.states.append(buffer)
+
+    def back(self, frames=0):
+        """Return the snapshot from frames pushes before the newest one."""
+        if not 0 <= frames < len(self.states):
+            raise IndexError(f"only {len(self.states)} snapshots kept")
+        return self.states[-1 - frames]
+
+    def rewind(self, frames=0):
+        """Drop the newer snapshots and return the one frames pushes back."""
+        buffer = self.back(frames)
+        for _ in range(frames):
+            self.states.pop()
+        return buffer
+
+    def clear(self):
+        self.states.clear()
@@ -0,0 +1,148 @@
+"""High scores kept in an SQLite file.
+
+Leaderboard holds the best scores in memory, so the "Start" screen reads
+them without touching the disk, and hands every finished game to a
+ScoreWriter. The writer commits them on its own thread, in batches of up
+to batch_size games or whatever came in within flush_interval seconds of
+the first one, so a game over never waits for the disk.
+
+The file is opened in write-ahead-log mode and every batch is one
+transaction, so a crash or a power cut loses at most the batch that was
+not committed yet, and SQLite rolls the log forward the next time the file
+is opened.
+"""
+import queue
+import sqlite3
+import threading
+import time
+
+
+SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS scores (score INTEGER NOT NULL, played REAL NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS scores_by_score ON scores (score DESC)",
+]
+
+
+def connect(path):
+    """Open the score file, creating its table the first time."""
+    connection = sqlite3.connect(path)
+    connection.execute("PRAGMA journal_mode=WAL")
+    # with the log, NORMAL still never leaves a half-written batch behind
+    connection.execute("PRAGMA synchronous=NORMAL")
+    with connection:
+        for statement in SCHEMA:
+            connection.execute(statement)
+    return connection
+
+
+class ScoreWriter:
+    """Insert (score, played) rows into the score file on a background thread."""
+    def __init__(self, path, batch_size=64, flush_interval=1.0):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.rows = queue.Queue()
+
+        # rows and transactions committed so far, and what went wrong if anything
+        self.written = 0
+        self.batches = 0
+        self.error = None
+
+        self.thread = threading.Thread(target=self.run, name="score writer", daemon=True)
+        self.thread.start()
+
+    def put(self, score, played):
+        self.rows.put((score, played))
+
+    def run(self):
+        try:
+            connection = connect(self.path)
+        except sqlite3.Error as error:
+            # nothing can be written, take the rows until close() so it reports it
+            self.error = error
+            while self.rows.get() is not None:
+                pass
+            return
+        try:
+            closing = False
+            while not closing:
+                row = self.rows.get()
+                if row is None:
+                    break
+                rows, closing = self.batch(row)
+                try:
+                    with connection:
+                        connection.executemany("INSERT INTO scores VALUES (?, ?)", rows)
+                except sqlite3.Error as error:
+                    # keep the game going, close() reports it
+                    self.error = error
+                    continue
+                self.written += len(rows)
+                self.batches += 1
+        finally:
+            connection.close()
+
+    def batch(self, first):
+        """Gather the rows queued within flush_interval of first; True too if closing."""
+        rows = [first]
+        deadline = time.monotonic() + self.flush_interval
+        while len(rows) < self.batch_size:
+            try:
+                row = self.rows.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                break
+            if row is None:
+                return rows, True
+            rows.append(row)
+        return rows, False
+
+    def close(self):
+        """Commit what is queued and stop the thread."""
+        self.rows.put(None)
+        self.thread.join()
+        if self.error is not None:
+            raise self.error
+
+
+class Leaderboard:
+    """The size best scores in memory, with every game written to path."""
+    def __init__(self, path, size=10, batch_size=64, flush_interval=1.0):
+        self.path = path
+        self.size = size
+
+        connection = connect(path)
+        try:
+            rows = connection.execute("SELECT score FROM scores ORDER BY score DESC LIMIT ?",
+                                      (size,))
+            # best first; a new tuple replaces it on every change, so another
+            # thread can read it while a game is recorded
+            self.scores = tuple(score for score, in rows)
+        finally:
+            connection.close()
+
+        self.writer = ScoreWriter(path, batch_size, flush_interval)
+
+    def top(self, count=None):
+        """Return the best count scores, best first."""
+        return self.scores[:count]
+
+    def qualifies(self, score):
+        """True if score would make the top scores."""
+        return len(self.scores) < self.size or score > self.scores[-1]
+
+    def record(self, score, played=None):
+        """Add a finished game's score; it is written to the file in the background."""
+        if played is None:
+            played = time.time()
+        self.writer.put(score, played)
+        if self.qualifies(score):
+            self.scores = tuple(sorted(self.scores + (score,), reverse=True)[:self.size])
+
+    def close(self):
+        self.writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,366 @@
+"""Authoritative game server running many sessions in one process.
+
+Every connection gets its own headless Simulation, and one asyncio task
+steps all of them together at Settings.tick_rate. Clients connect over TCP
+or a Unix socket and talk a small binary protocol, little-endian throughout:
+
+    server -> client, once    HELLO: magic, version, the session's seed and
+                              the tick rate
+    client -> server          one byte of inputs per tick, packed like a
+                              replay file (see replay.pack_inputs)
+    server -> client, a tick  a frame: 2 byte length, tick, a bit set of the
+                              sections that changed, then only those sections
+
+The sections are the stats, the ship, the bullets, the obstacles and the
+clouds. A changed section is sent whole, so a client that missed frames
+still gets a correct picture from the next one; the server skips writing to
+clients whose send buffer is full instead of queueing more for them. Each
+session gets at most one write per tick.
+
+Inputs queue up and one is used per tick. When a client has sent nothing
+for a tick the ship keeps the keys it held last and does not fire.
+
+TickMetrics counts ticks that took longer than their share of a second
+(overruns), ticks that started late, and ticks that were skipped to catch
+up after a long stall. A session whose game raises is logged and
+disconnected, the other sessions keep playing.
+
+    python server.py --port 7777
+    python server.py --unix /tmp/air_shooter.sock --report 5
+
+GameClient is a headless client for tests and bots.
+"""
+import sys
+import random
+import asyncio
+import logging
+import argparse
+import struct
+from collections import deque
+from time import perf_counter
+
+from air_shooter import CLOUD_IMAGES, OBSTACLE_IMAGES, Settings
+from replay import pack_inputs, unpack_inputs
+from simulation import Inputs, Simulation, State
+
+
+MAGIC = b"ASRV"
+VERSION = 1
+HELLO = struct.Struct("<4sBQH")
+LENGTH = struct.Struct("<H")
+FRAME = struct.Struct("<IB")
+STATS = struct.Struct("<?Bi")
+SHIP = struct.Struct("<hh")
+COUNT = struct.Struct("<H")
+
+log = logging.getLogger(__name__)
+
+# bits of a frame's section set
+STATS_CHANGED = 1
+SHIP_CHANGED = 2
+BULLETS_CHANGED = 4
+OBSTACLES_CHANGED = 8
+CLOUDS_CHANGED = 16
+
+
+def pack_sprites(sprites, images):
+    """Pack (x, y, image) triples as a count and int16 x, int16 y, uint8 image id."""
+    values = []
+    for x, y, filename in sprites:
+        values += (int(x), int(y), images.index(filename))
+    return COUNT.pack(len(sprites)) + struct.pack("<" + "hhB" * len(sprites), *values)
+
+
+def unpack_sprites(body, offset, images):
+    (count,) = COUNT.unpack_from(body, offset)
+    offset += COUNT.size
+    values = struct.unpack_from("<" + "hhB" * count, body, offset)
+    sprites = tuple((values[index], values[index + 1], images[values[index + 2]])
+                    for index in range(0, len(values), 3))
+    return sprites, offset + struct.calcsize("<" + "hhB" * count)
+
+
+def encode_delta(sent, state):
+    """Return the frame that brings a client from State sent (or None) to state."""
+    sections = 0
+    parts = []
+    if sent is None or (sent.game_active, sent.ships_left, sent.score) != \
+            (state.game_active, state.ships_left, state.score):
+        sections |= STATS_CHANGED
+        parts.append(STATS.pack(state.game_active, state.ships_left, state.score))
+    if sent is None or sent.ship != state.ship:
+        sections |= SHIP_CHANGED
+        parts.append(SHIP.pack(*state.ship))
+    if sent is None or sent.bullets != state.bullets:
+        sections |= BULLETS_CHANGED
+        bullets = [value for position in state.bullets for value in position]
+        parts.append(COUNT.pack(len(state.bullets)) +
+                     struct.pack(f"<{len(bullets)}h", *bullets))
+    if sent is None or sent.obstacles != state.obstacles:
+        sections |= OBSTACLES_CHANGED
+        parts.append(pack_sprites(state.obstacles, OBSTACLE_IMAGES))
+    if sent is None or sent.clouds != state.clouds:
+        sections |= CLOUDS_CHANGED
+        parts.append(pack_sprites(state.clouds, CLOUD_IMAGES))
+
+    body = FRAME.pack(state.tick, sections) + b"".join(parts)
+    return LENGTH.pack(len(body)) + body
+
+
+def apply_delta(state, body):
+    """Apply a frame's body (without its length) to the client's State and return the new one."""
+    tick, sections = FRAME.unpack_from(body)
+    offset = FRAME.size
+    if state is None:
+        state = State(0, False, 0, 0, (0, 0), (), (), ())
+    changes = {"tick": tick}
+
+    if sections & STATS_CHANGED:
+        changes["game_active"], changes["ships_left"], changes["score"] = \
+            STATS.unpack_from(body, offset)
+        offset += STATS.size
+    if sections & SHIP_CHANGED:
+        changes["ship"] = SHIP.unpack_from(body, offset)
+        offset += SHIP.size
+    if sections & BULLETS_CHANGED:
+        (count,) = COUNT.unpack_from(body, offset)
+        offset += COUNT.size
+        values = struct.unpack_from(f"<{2 * count}h", body, offset)
+        changes["bullets"] = tuple(zip(values[::2], values[1::2]))
+        offset += 4 * count
+    if sections & OBSTACLES_CHANGED:
+        changes["obstacles"], offset = unpack_sprites(body, offset, OBSTACLE_IMAGES)
+    if sections & CLOUDS_CHANGED:
+        changes["clouds"], offset = unpack_sprites(body, offset, CLOUD_IMAGES)
+    return state._replace(**changes)
+
+
+class TickMetrics:
+    """How the shared tick keeps up with its budget of one tick's share of a second."""
+    def __init__(self, budget_ms):
+        self.budget_ms = budget_ms
+        self.ticks = 0
+        self.overruns = 0
+        self.late = 0
+        self.skipped = 0
+        self.dropped_frames = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def record(self, tick_ms, late_ms=0.0):
+        """Count one tick that took tick_ms and started late_ms after it was due."""
+        self.ticks += 1
+        self.total_ms += tick_ms
+        self.max_ms = max(self.max_ms, tick_ms)
+        if tick_ms > self.budget_ms:
+            self.overruns += 1
+        if late_ms > self.budget_ms:
+            self.late += 1
+
+    @property
+    def average_ms(self):
+        return self.total_ms / self.ticks if self.ticks else 0.0
+
+    def report(self, sessions):
+        return (f"sessions {sessions}  ticks {self.ticks}  avg {self.average_ms:.2f} ms  "
+                f"max {self.max_ms:.2f} ms  budget {self.budget_ms:.2f} ms  "
+                f"overruns {self.overruns}  late {self.late}  skipped {self.skipped}  "
+                f"dropped frames {self.dropped_frames}")
+
+
+class Session(asyncio.Protocol):
+    """One client's connection and the game it plays."""
+    def __init__(self, server):
+        self.server = server
+        self.transport = None
+        self.simulation = None
+        self.seed = None
+        # unused inputs, at most a second's worth
+        self.inputs = deque(maxlen=server.tick_rate)
+        self.held = Inputs()
+        self.sent = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+        self.seed = self.server.rng.randrange(2 ** 32)
+        settings = self.server.settings_factory()
+        settings.tick_rate = self.server.tick_rate
+        self.simulation = Simulation(self.seed, settings)
+        transport.write(HELLO.pack(MAGIC, VERSION, self.seed, self.server.tick_rate))
+        self.server.sessions[self] = None
+
+    def data_received(self, data):
+        self.inputs.extend(unpack_inputs(byte) for byte in data)
+
+    def connection_lost(self, exc):
+        self.server.sessions.pop(self, None)
+
+    def tick(self):
+        """Step the game one tick and send the client what changed."""
+        if self.inputs:
+            inputs = self.inputs.popleft()
+            self.held = Inputs(up=inputs.up, down=inputs.down)
+        else:
+            inputs = self.held
+        state = self.simulation.step(inputs)
+
+        if self.transport.get_write_buffer_size() > self.server.max_buffer:
+            # the client is not keeping up, the next frame covers this one
+            self.server.metrics.dropped_frames += 1
+            return
+        self.transport.write(encode_delta(self.sent, state))
+        self.sent = state
+
+
+class GameServer:
+    """Run every connected session on one shared tick."""
+    def __init__(self, settings_factory=Settings, seed=None, tick_rate=None,
+                 max_buffer=64 * 1024, max_behind=5):
+        self.settings_factory = settings_factory
+        self.tick_rate = tick_rate or settings_factory().tick_rate
+        self.rng = random.Random(seed)
+        self.max_buffer = max_buffer
+        # ticks the schedule may fall behind before it gives up catching up
+        self.max_behind = max_behind
+
+        self.sessions = {}
+        self.listeners = []
+        self.metrics = TickMetrics(1000 / self.tick_rate)
+
+    async def listen_tcp(self, host="127.0.0.1", port=0):
+        """Accept clients on a TCP port, 0 picks a free one; returns the asyncio server."""
+        loop = asyncio.get_running_loop()
+        listener = await loop.create_server(lambda: Session(self), host, port)
+        self.listeners.append(listener)
+        return listener
+
+    async def listen_unix(self, path):
+        """Accept clients on a Unix socket at path; returns the asyncio server."""
+        loop = asyncio.get_running_loop()
+        listener = await loop.create_unix_server(lambda: Session(self), path)
+        self.listeners.append(listener)
+        return listener
+
+    def tick(self, late_ms=0.0):
+        """Step every session once."""
+        start = perf_counter()
+        for session in list(self.sessions):
+            try:
+                session.tick()
+            except Exception:
+                # one broken game must not stop everyone else's
+                log.exception("session with seed %s failed, dropping it", session.seed)
+                self.sessions.pop(session, None)
+                session.transport.close()
+        self.metrics.record((perf_counter() - start) * 1000, late_ms)
+
+    async def run(self, ticks=None):
+        """Tick at tick_rate, forever or for a number of ticks."""
+        loop = asyncio.get_running_loop()
+        period = 1 / self.tick_rate
+        due = loop.time()
+        count = 0
+        while ticks is None or count < ticks:
+            self.tick((loop.time() - due) * 1000)
+            count += 1
+
+            due += period
+            behind = loop.time() - due
+            if behind > self.max_behind * period:
+                # after a long stall start afresh rather than run a burst of ticks
+                self.metrics.skipped += int(behind / period)
+                due = loop.time()
+            await asyncio.sleep(max(0.0, due - loop.time()))
+
+    def close(self):
+        for listener in self.listeners:
+            listener.close()
+        for session in list(self.sessions):
+            session.transport.close()
+
+
+class GameClient:
+    """Headless client that sends inputs and keeps the latest State."""
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.seed = None
+        self.tick_rate = None
+        self.state = None
+
+    @classmethod
+    async def open_tcp(cls, host, port):
+        client = cls(*await asyncio.open_connection(host, port))
+        await client.hello()
+        return client
+
+    @classmethod
+    async def open_unix(cls, path):
+        client = cls(*await asyncio.open_unix_connection(path))
+        await client.hello()
+        return client
+
+    async def hello(self):
+        magic, version, self.seed, self.tick_rate = \
+            HELLO.unpack(await self.reader.readexactly(HELLO.size))
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"not a version {VERSION} Air Shooter server")
+
+    def send(self, inputs):
+        """Queue one tick of Inputs for the server."""
+        self.writer.write(bytes((pack_inputs(inputs.up, inputs.down, inputs.click,
+                                             int(inputs.fire)),)))
+
+    async def receive(self):
+        """Wait for the next frame and return the State it brings."""
+        (length,) = LENGTH.unpack(await self.reader.readexactly(LENGTH.size))
+        self.state = apply_delta(self.state, await self.reader.readexactly(length))
+        return self.state
+
+    async def close(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+
+
+async def serve(args):
+    server = GameServer(seed=args.seed, tick_rate=args.tick_rate)
+    if args.unix:
+        await server.listen_unix(args.unix)
+        print(f"serving on {args.unix}")
+    else:
+        await server.listen_tcp(args.host, args.port)
+        print(f"serving on {args.host}:{args.port}")
+
+    async def report():
+        while True:
+            await asyncio.sleep(args.report)
+            print(server.metrics.report(len(server.sessions)))
+            sys.stdout.flush()
+
+    tasks = [asyncio.create_task(server.run())]
+    if args.report:
+        tasks.append(asyncio.create_task(report()))
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        server.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Host Air Shooter sessions.")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on")
+    parser.add_argument("--port", type=int, default=7777, help="TCP port to listen on")
+    parser.add_argument("--unix", metavar="PATH", help="listen on a Unix socket instead")
+    parser.add_argument("--tick-rate", type=int, help="ticks per second (default from Settings)")
+    parser.add_argument("--seed", type=int, help="seed the sessions' seeds, for repeatable runs")
+    parser.add_argument("--report", metavar="SECONDS", type=float, default=0,
+                        help="print tick metrics every SECONDS")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
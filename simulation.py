@@ -0,0 +1,164 @@
+"""Headless game simulation.
+
+The Simulation class runs the same game logic as run_game() but without a
+window or a frame clock, so it can be stepped as fast as the CPU allows.
+Each call to step() takes the player's inputs for one tick and returns a
+State snapshot that a renderer can draw later.
+"""
+from collections import namedtuple
+import pygame
+from pygame.sprite import Group
+
+from air_shooter import (Settings, Ship, BulletPool, Clouds, GameStats, World, CLOUD_IMAGES,
+                         add_new_obstacles)
+from assets import asset_manager
+from entity_store import EntityStore
+from savestate import load_state, save_state
+
+
+# player input for a single tick, fire is True or a number of shots.
+Inputs = namedtuple("Inputs", ["up", "down", "fire", "click"],
+                    defaults=[False, False, False, False])
+
+# snapshot of the game world after a tick.
+State = namedtuple("State", ["tick", "game_active", "score", "ships_left", "ship",
+                             "bullets", "obstacles", "clouds"])
+
+
+class NullScoreboard:
+    """Scoreboard stand-in for runs that never draw the score."""
+    def prep_score(self):
+        pass
+
+    def prep_ships(self, filename):
+        pass
+
+    def draw(self):
+        pass
+
+
+class Simulation:
+    """Run the game logic without a display."""
+    def __init__(self, seed=None, settings=None):
+        self.settings = settings if settings is not None else Settings()
+        self.seed = seed
+        self.settings.rng.seed(seed)
+
+        # an off-screen surface gives the sprites their play field.
+        self.screen = pygame.Surface((self.settings.screen_width,
+                                      self.settings.screen_height))
+
+        self.ship = Ship(self.settings, self.screen)
+        self.stats = GameStats(self.settings)
+        self.sb = NullScoreboard()
+        self.bullets = BulletPool(self.settings, self.screen)
+        self.obstacles = Group()
+        self.store = None
+        if self.settings.entity_backend == "arrays":
+            self.store = EntityStore(self.settings, self.screen)
+            self.store.add_new_obstacles()
+        else:
+            add_new_obstacles(self.settings, self.screen, self.obstacles)
+        self.clouds = [Clouds(self.settings, self.screen, filename)
+                       for filename in CLOUD_IMAGES]
+        self.world = World(self.settings, self.screen, self.ship, self.bullets,
+                           self.obstacles, self.clouds, self.stats, self.sb)
+        self.tick = 0
+
+    def step(self, inputs=Inputs()):
+        """Apply one tick of inputs, advance the world and return its state."""
+        if self.store is not None:
+            self.step_store(inputs)
+        else:
+            self.step_sprites(inputs)
+
+        self.tick += 1
+        return self.state()
+
+    def step_sprites(self, inputs):
+        self.world.inputs = inputs
+        self.settings.systems.tick(self.world)
+
+    def step_store(self, inputs):
+        self.ship.move_up = inputs.up
+        self.ship.move_down = inputs.down
+
+        if inputs.click and not self.stats.game_active:
+            self.stats.reset_stats()
+            self.stats.game_active = True
+            self.store.start_game()
+            self.ship.reset_ship_pos()
+
+        for _ in range(int(inputs.fire)):
+            self.store.add_bullet(self.ship)
+
+        if self.stats.game_active:
+            self.store.update_game(self.ship, self.clouds, self.stats, self.sb)
+
+    def run(self, ticks, inputs=Inputs()):
+        """Step the same inputs for a number of ticks and return the final state."""
+        state = None
+        for _ in range(ticks):
+            state = self.step(inputs)
+        return state
+
+    def save_state(self):
+        """Return a savestate buffer of the game, see savestate.py."""
+        if self.store is not None:
+            raise ValueError("snapshots need the sprites entity backend")
+        return save_state(self.tick, self.settings, self.ship, self.bullets, self.obstacles,
+                          self.clouds, self.stats)
+
+    def load_state(self, buffer):
+        """Put the game back the way a save_state() buffer holds it."""
+        if self.store is not None:
+            raise ValueError("snapshots need the sprites entity backend")
+        self.tick = load_state(buffer, self.settings, self.screen, self.ship, self.bullets,
+                               self.obstacles, self.clouds, self.stats, self.sb)
+
+    def state(self):
+        """Take a snapshot of the game world."""
+        if self.store is None:
+            return snapshot(self.tick, self.stats, self.ship, self.bullets, self.obstacles,
+                            self.clouds)
+
+        return State(
+            tick=self.tick,
+            game_active=self.stats.game_active,
+            score=self.stats.score,
+            ships_left=self.stats.ships_left,
+            ship=(self.ship.rect.x, self.ship.rect.y),
+            bullets=self.store.bullet_positions(),
+            obstacles=self.store.obstacle_positions(),
+            clouds=tuple((cloud.x, cloud.y, cloud.filename) for cloud in self.clouds),
+        )
+
+
+def snapshot(tick, stats, ship, bullets, obstacles, clouds):
+    """Take a State snapshot of the sprite-based game objects."""
+    return State(
+        tick=tick,
+        game_active=stats.game_active,
+        score=stats.score,
+        ships_left=stats.ships_left,
+        ship=(ship.rect.x, ship.rect.y),
+        bullets=tuple((bullet.rect.x, bullet.rect.y) for bullet in bullets),
+        obstacles=tuple((obstacle.x, obstacle.y, obstacle.filename) for obstacle in obstacles),
+        clouds=tuple((cloud.x, cloud.y, cloud.filename) for cloud in clouds),
+    )
+
+
+def render_state(settings, screen, state):
+    """Draw a State snapshot onto screen."""
+    screen.fill(settings.bg_color)
+    screen.blit(asset_manager.image("images/ship", "ship.png"), state.ship)
+
+    for x, y, filename in state.clouds:
+        screen.blit(asset_manager.image("images/cloud", filename), (x, y))
+
+    for x, y, filename in state.obstacles:
+        screen.blit(asset_manager.image("images/obstacles", filename), (x, y))
+
+    for x, y in state.bullets:
+        screen.fill(settings.bullet_color,
+                    (x, y, settings.bullet_width, settings.bullet_height))
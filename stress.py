@@ -0,0 +1,189 @@
+"""Load test that finds how many bullets and obstacles a machine can keep up with.
+
+Each step of the ramp plays the real game loop, with the real Settings,
+sprites and systems, while a bot sweeps the ship up and down and
+holds the fire button. Every step has more bullets and obstacles than the
+one before, and fires faster to keep the bullets in the air. The ramp stops
+at the first step whose average frame takes longer than the target, and the
+report shows each step's frame time, where the time went, and the largest
+counts that stayed under the target.
+
+    python air_shooter.py --stress
+    python air_shooter.py --stress --stress-target 8.3
+
+Frames are not limited to Settings.fps_limit and run one tick each, so the
+frame time is the work the game does. It works under SDL's dummy video
+driver too, though then drawing and flipping cost less than on a screen.
+"""
+import math
+from collections import namedtuple
+
+import pygame
+
+from air_shooter import (Settings, Ship, BulletPool, Obstacles, Clouds, GameStats, Button,
+                         Scoreboard, World, CLOUD_IMAGES, OBSTACLE_IMAGES, check_quit_events,
+                         open_display)
+from profiler import PHASES, FrameProfiler
+from simulation import Inputs
+
+# the phases a step's time is reported in, waiting is never done here.
+REPORT_PHASES = [name for name in PHASES if name != "wait"]
+
+Level = namedtuple("Level", ["bullets", "obstacles", "fire"])
+
+
+def ramp(bullets=50, obstacles=10, growth=1.5, steps=20, tick_rate=60):
+    """Yield the Levels of the ramp, each growth times the one before.
+
+    A bullet crosses the screen in about a second, so firing bullets /
+    tick_rate shots a tick keeps the whole pool in the air.
+    """
+    for step in range(steps):
+        scale = growth ** step
+        count = round(bullets * scale)
+        yield Level(count, round(obstacles * scale), max(1, math.ceil(count / tick_rate)))
+
+
+class StressProfiler(FrameProfiler):
+    """FrameProfiler without the overlay, which would be timed along with the game."""
+    def draw_overlay(self, screen):
+        return None
+
+
+class AutoFireBot:
+    """Sweep the ship from the top of the screen to the bottom and back, always firing."""
+    def __init__(self, shots=1):
+        self.shots = shots
+        self.up = False
+
+    def inputs(self, ship):
+        if ship.rect.top <= 0:
+            self.up = False
+        elif ship.rect.bottom >= ship.screen_rect.bottom:
+            self.up = True
+        return Inputs(up=self.up, down=not self.up, fire=self.shots)
+
+
+class StressWorld:
+    """A running game held at one Level of the ramp."""
+    def __init__(self, screen, level, seed=0):
+        self.settings = settings = Settings()
+        settings.bullets_allowed = level.bullets
+        # no pause after a hit, it would leave frames with nothing to do.
+        settings.hit_pause = 0
+        settings.rng.seed(seed)
+        self.screen = screen
+        self.level = level
+
+        self.ship = Ship(settings, screen)
+        self.stats = GameStats(settings)
+        self.stats.game_active = True
+        self.sb = Scoreboard(settings, screen, self.stats)
+        self.play_button = Button(screen, "Start")
+        self.bullets = BulletPool(settings, screen)
+        self.obstacles = pygame.sprite.Group()
+        self.clouds = [Clouds(settings, screen, filename) for filename in CLOUD_IMAGES]
+        self.bot = AutoFireBot(level.fire)
+        self.world = World(settings, screen, self.ship, self.bullets, self.obstacles,
+                           self.clouds, self.stats, self.sb, self.play_button)
+
+        # start with the obstacles spread over the screen
+        self.refill(0)
+
+    def refill(self, left):
+        """Top the obstacles back up to the level's count, from x = left rightwards."""
+        settings = self.settings
+        rng = settings.rng
+        for index in range(len(self.obstacles), self.level.obstacles):
+            x = rng.randint(left, left + settings.screen_width)
+            filename = OBSTACLE_IMAGES[index % len(OBSTACLE_IMAGES)]
+            self.obstacles.add(Obstacles(settings, self.screen, filename, x=x))
+
+    def frame(self):
+        """One frame of the run_game() loop at one tick per frame."""
+        s = self
+        profiler = s.settings.profiler
+        with profiler.phase("events"):
+            check_quit_events()
+            # shot obstacles come back in from the right, and the ship never runs out
+            s.refill(s.settings.screen_width)
+            s.stats.ships_left = s.settings.ship_lives
+
+        s.world.inputs = s.bot.inputs(s.ship)
+        s.settings.systems.tick(s.world)
+        s.settings.systems.frame(s.world)
+        profiler.end_frame(bullets=len(s.bullets), obstacles=len(s.obstacles))
+
+
+def measure(screen, level, frames=120, warmup=60):
+    """Play frames frames at level after warmup and return the step's report."""
+    world = StressWorld(screen, level)
+    for _ in range(warmup):
+        world.frame()
+
+    profiler = world.settings.profiler = StressProfiler(history=frames)
+    for _ in range(frames):
+        world.frame()
+
+    counts = list(zip(*(frame[len(PHASES) + 1:] for frame in profiler.frames)))
+    frame_times = sorted(profiler.history["frame"])
+    return {
+        "level": level,
+        "frame_ms": profiler.average("frame"),
+        "p95_ms": frame_times[max(0, math.ceil(0.95 * len(frame_times)) - 1)],
+        "phases_ms": {name: profiler.average(name) for name in REPORT_PHASES},
+        "bullets": sum(counts[0]) / frames,
+        "obstacles": sum(counts[1]) / frames,
+    }
+
+
+def run_stress(target_ms=1000 / 60, levels=None, frames=120, warmup=60):
+    """Ramp through levels until a step's average frame goes over target_ms.
+
+    Returns the report of every step played, the last one being the first
+    over the target unless the ramp ran out first.
+    """
+    if levels is None:
+        levels = ramp()
+
+    settings = Settings()
+    pygame.display.init()
+    pygame.font.init()
+    screen = open_display(settings, "Air Shooter stress test")
+
+    steps = []
+    try:
+        for level in levels:
+            step = measure(screen, level, frames, warmup)
+            steps.append(step)
+            if step["frame_ms"] > target_ms:
+                break
+    finally:
+        pygame.display.quit()
+    return steps
+
+
+def sustainable(steps, target_ms):
+    """Return the report of the busiest step that stayed under target_ms, or None."""
+    under = [step for step in steps if step["frame_ms"] <= target_ms]
+    return under[-1] if under else None
+
+
+def print_report(steps, target_ms):
+    print(f"target frame time: {target_ms:.2f} ms")
+    print(f"{'bullets':>8}{'obstacles':>10}{'fire':>6}{'frame ms':>10}{'p95 ms':>9}"
+          + "".join(f"{name:>17}" for name in REPORT_PHASES))
+    for step in steps:
+        level = step["level"]
+        print(f"{step['bullets']:>8.0f}{step['obstacles']:>10.0f}{level.fire:>6}"
+              f"{step['frame_ms']:>10.2f}{step['p95_ms']:>9.2f}"
+              + "".join(f"{step['phases_ms'][name]:>17.2f}" for name in REPORT_PHASES))
+
+    best = sustainable(steps, target_ms)
+    if best is None:
+        print("even the first step went over the target")
+        return
+    print(f"max sustainable: {best['bullets']:.0f} bullets, {best['obstacles']:.0f} obstacles, "
+          f"{best['level'].fire} shots a tick ({best['frame_ms']:.2f} ms a frame)")
+    if best is steps[-1]:
+        print("the ramp ended before going over the target")
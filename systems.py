@@ -0,0 +1,83 @@
+"""Ordered game systems.
+
+A tick of the game is a fixed list of systems, each a function of the
+World, run in the order they are declared and exactly once per tick:
+
+    input, ship, bullets, obstacles, collisions, clouds, scoring
+
+and a frame ends with the systems that draw, run once however many ticks
+the frame held:
+
+    render
+
+SystemScheduler times each system as a phase of Settings.profiler, so
+`python air_shooter.py --profile` shows where each tick went, and any
+system can be turned off, e.g. render and clouds for headless runs.
+Systems marked always run even while the world holds still (before the
+game starts and in the pause after the ship was hit); the others only run
+once World.begin_tick() said the world moves this tick.
+"""
+
+
+class System:
+    """A named step of the tick or frame."""
+    def __init__(self, name, run, every_tick=True, always=False):
+        self.name = name
+        self.run = run
+        self.every_tick = every_tick
+        self.always = always
+        self.enabled = True
+
+    def __repr__(self):
+        state = "on" if self.enabled else "off"
+        return f"System({self.name!r}, {state})"
+
+
+class SystemScheduler:
+    """Run systems in their declared order, once per tick or once per frame."""
+    def __init__(self, systems):
+        self.systems = list(systems)
+        self.by_name = {system.name: system for system in self.systems}
+        self.tick_systems = [system for system in self.systems if system.every_tick]
+        self.frame_systems = [system for system in self.systems if not system.every_tick]
+
+    @property
+    def names(self):
+        return [system.name for system in self.systems]
+
+    def __getitem__(self, name):
+        system = self.by_name.get(name)
+        if system is None:
+            raise KeyError(f"no system called {name!r}, the systems are {self.names}")
+        return system
+
+    def enable(self, *names):
+        for name in names:
+            self[name].enabled = True
+
+    def disable(self, *names):
+        for name in names:
+            self[name].enabled = False
+
+    def tick(self, world):
+        """Run one tick of every enabled tick system."""
+        profiler = world.settings.profiler
+        moving = None
+        for system in self.tick_systems:
+            if not system.enabled:
+                continue
+            if not system.always:
+                if moving is None:
+                    moving = world.begin_tick()
+                if not moving:
+                    return
+            with profiler.phase(system.name):
+                system.run(world)
+
+    def frame(self, world):
+        """Run the enabled systems that draw the frame."""
+        profiler = world.settings.profiler
+        for system in self.frame_systems:
+            if system.enabled:
+                with profiler.phase(system.name):
+                    system.run(world)
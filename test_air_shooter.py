@@ -1,5 +1,8 @@
+import random
 import pygame
-from project import *
+from air_shooter import *
+from collision import SpatialHash
+from profiler import NullProfiler
 from unittest.mock import MagicMock
 pygame.init()
 
@@ -16,9 +19,24 @@ class SettingsMock:
         self.bullet_width = 20
         self.bullet_height = 7
         self.bullet_color = (255, 60, 60)
+        self.bullets_allowed = 5
+        self.tick_rate = 50
+        self.max_ticks_per_frame = 5
         self.obs_speed = 6
+        self.obstacle_lanes = (250, 450)
+        self.obstacle_spawn = (2000, 3000)
+        self.waves = None
         self.game_speed = 9
+        self.cloud_heights = (20, 50)
+        self.cloud_spawn = (1000, 2000)
+        self.score_margin = 20
+        self.hearts_margin = 10
         self.points = True
+        self.leaderboard = None
+        self.hit_pause = 0.3
+        self.rng = random.Random()
+        self.broadphase = SpatialHash(1100, 600, 100)
+        self.profiler = NullProfiler()
 
 class ScreenMock:
     def __init__(self):
@@ -36,7 +54,7 @@ class ShipMock:
     def reset_ship_pos(self):
         pass
 
-    def draw(self):
+    def draw(self, alpha=1.0):
         self.draw_called = True
 
 class BulletsMock:
@@ -48,11 +66,22 @@ class BulletsMock:
         self.add_called_with = bullet
         self.sprites.append(bullet)  # mimic the behavior of adding to the sprite group
 
+    def fire(self, ship):
+        self.add(object())  # mimic the pool adding a recycled bullet
+
     def draw(self):
         self.draw_called = True
 
 class ObstacleMock:
-    def draw(self):
+    def draw(self, alpha=1.0):
+        self.draw_called = True
+
+class SpriteMock(pygame.sprite.Sprite):
+    def __init__(self):
+        super().__init__()
+        self.draw_called = False
+
+    def draw(self, alpha=1.0):
         self.draw_called = True
 
 class CloudsMock:
@@ -65,11 +94,15 @@ class CloudsMock:
     def __iter__(self):
         return iter(self.clouds)
 
+    @property
     def draw_called(self):
-        return any(cloud.draw_called() for cloud in self.clouds)
+        return all(cloud.draw_called for cloud in self.clouds)
 
 class CloudMock:
-    def draw(self):
+    def __init__(self):
+        self.draw_called = False
+
+    def draw(self, alpha=1.0):
         self.draw_called = True
 
 class ScoreboardMock:
@@ -92,6 +125,7 @@ class GameStatsMock:
 class ButtonMock:
     def __init__(self):
         self.rect = pygame.Rect(0, 0, 200, 50)
+        self.draw_called = False
 
     def draw(self):
         self.draw_called = True
@@ -141,13 +175,19 @@ def test_key_mouse_events():
     assert ship.move_up is False
 
 
-def test_update_screen():
+def test_update_screen(monkeypatch):
+    # count the flips instead of presenting to a display
+    flips = []
+    monkeypatch.setattr(pygame.display, "flip", lambda: flips.append(True))
+
     # create mock objects for testing
     settings = SettingsMock()
     screen = ScreenMock()
     ship = ShipMock()
-    bullets = pygame.sprite.Group()
-    obstacles = pygame.sprite.Group()
+    bullet = SpriteMock()
+    obstacle = SpriteMock()
+    bullets = pygame.sprite.Group(bullet)
+    obstacles = pygame.sprite.Group(obstacle)
 
     clouds = CloudsMock()
 
@@ -171,13 +211,16 @@ def test_update_screen():
     assert screen.fill_called_with == settings.bg_color
     assert ship.draw_called
     assert clouds.draw_called
-    assert obstacles.draw()
-    assert bullets.draw()
+    assert obstacle.draw_called
+    assert bullet.draw_called
     assert score.draw_called
     assert not play_button.draw_called  # because game is active
+    assert len(flips) == 1
 
     # reset for the second test where the game is not active
     stats.game_active = False
+    for mock in [ship, cloud1, cloud2, bullet, obstacle, score]:
+        mock.draw_called = False
 
     # call function to be tested
     update_screen(settings, screen, ship, bullets, obstacles, clouds, stats, score, play_button)
@@ -186,10 +229,11 @@ def test_update_screen():
     assert screen.fill_called_with == settings.bg_color
     assert ship.draw_called
     assert clouds.draw_called
-    assert obstacles.draw()
-    assert bullets.draw()
+    assert obstacle.draw_called
+    assert bullet.draw_called
     assert score.draw_called
     assert play_button.draw_called
+    assert len(flips) == 2
 
 
 def test_update_bullets():
@@ -232,7 +276,7 @@ def test_update_obstacles():
     initial_ships_left = stats.ships_left
 
     # test when ship is hit by an obstacle
-    pygame.sprite.spritecollideany = MagicMock(return_value=True)
+    settings.broadphase.spritecollideany = MagicMock(return_value=True)
 
     update_obstacles(settings, screen, ship, obstacles, bullets, stats, sb)
 
@@ -241,7 +285,7 @@ def test_update_obstacles():
     assert sb.prep_ships_called_with == "heart.png"
 
     # test when ship is not hit by an obstacle
-    pygame.sprite.spritecollideany = MagicMock(return_value=False)
+    settings.broadphase.spritecollideany = MagicMock(return_value=False)
 
     update_obstacles(settings, screen, ship, obstacles, bullets, stats, sb)
 
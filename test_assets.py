@@ -0,0 +1,118 @@
+import os
+import pygame
+from assets import AssetManager
+
+
+def test_image_is_loaded_once():
+    assets = AssetManager()
+
+    first = assets.image("images/obstacles", "bird.png")
+    second = assets.image("images/obstacles", "bird.png")
+
+    # the same surface is shared and the disk is only hit once
+    assert first is second
+    assert assets.misses == 1
+    assert assets.hits == 1
+
+
+def test_different_images_are_cached_separately():
+    assets = AssetManager()
+
+    bird = assets.image("images/obstacles", "bird.png")
+    box = assets.image("images/obstacles", "box.png")
+
+    assert bird is not box
+    assert assets.misses == 2
+    assert assets.hits == 0
+
+
+def test_clear_resets_cache():
+    assets = AssetManager()
+    assets.image("images/ship", "ship.png")
+    assets.image("images/ship", "ship.png")
+
+    assets.clear()
+
+    assert assets.images == {}
+    assert assets.hits == 0
+    assert assets.misses == 0
+
+
+def test_image_is_converted_for_display():
+    pygame.display.init()
+    pygame.display.set_mode((10, 10))
+    assets = AssetManager()
+
+    image = assets.image("images/ship", "heart.png")
+
+    # images with transparency keep their per-pixel alpha
+    assert image.get_flags() & pygame.SRCALPHA
+    pygame.display.quit()
+
+
+def test_fonts_are_shared():
+    pygame.font.init()
+    assets = AssetManager()
+
+    assert assets.font(48) is assets.font(48)
+    assert assets.font(48) is not assets.font(20)
+
+
+def test_text_is_rendered_once():
+    pygame.font.init()
+    assets = AssetManager()
+
+    first = assets.text("120", 48, (30, 30, 30), (103, 178, 255))
+    second = assets.text("120", 48, (30, 30, 30), (103, 178, 255))
+    other_color = assets.text("120", 48, (255, 255, 255), (103, 178, 255))
+
+    assert first is second
+    assert first is not other_color
+    assert first.get_size() == assets.font(48).size("120")
+    assert assets.misses == 2
+    assert assets.hits == 1
+
+
+def test_text_cache_drops_least_recently_used():
+    pygame.font.init()
+    assets = AssetManager(text_cache_size=2)
+    color = (30, 30, 30)
+
+    ten = assets.text("10", 48, color)
+    assets.text("20", 48, color)
+    assets.text("10", 48, color)
+    assets.text("30", 48, color)
+
+    # "20" was shown longest ago, so it went and "10" stayed
+    assert len(assets.texts) == 2
+    assert assets.text("10", 48, color) is ten
+    assert ("20", 48, color, None) not in assets.texts
+
+
+def test_preloaded_images_are_used():
+    assets = AssetManager()
+
+    assets.preload([("images/ship", "ship.png"), ("images/cloud", "cloud1.png")])
+    assets.wait()
+    assert len(assets.preloaded) == 2
+
+    ship = assets.image("images/ship", "ship.png")
+
+    # the decoded image is handed over rather than loaded again
+    assert os.path.join("images/ship", "ship.png") not in assets.preloaded
+    assert list(assets.images.values()) == [ship]
+    assert assets.misses == 1
+
+
+def test_scale_resizes_images_and_fonts():
+    pygame.font.init()
+    assets = AssetManager()
+    full = assets.image("images/obstacles", "box.png")
+    font = assets.font(48)
+
+    assets.set_scale(0.5)
+    half = assets.image("images/obstacles", "box.png")
+
+    assert half.get_size() == (round(full.get_width() / 2), round(full.get_height() / 2))
+    assert assets.font(48) is not font
+    assert assets.font(48).get_height() < font.get_height()
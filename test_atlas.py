@@ -0,0 +1,81 @@
+import os
+import shutil
+
+import pygame
+import pytest
+from assets import AssetManager
+from atlas import VERSION, Atlas, build_atlas, image_paths, load_atlas, pack
+
+
+def test_packed_images_match_their_files(tmp_path):
+    path = tmp_path / "atlas.bin"
+    paths = image_paths()
+    build_atlas(paths, path)
+    atlas = Atlas(path)
+
+    assert len(atlas) == len(paths)
+    for image_path in paths:
+        image = atlas.image(image_path)
+        original = pygame.image.load(image_path)
+        assert image.get_size() == original.get_size()
+        assert pygame.image.tobytes(image, "RGBA") == pygame.image.tobytes(original, "RGBA")
+    assert atlas.image("images/ship/missing.png") is None
+
+
+def test_shelves_never_overlap():
+    sizes = [(30, 40), (500, 20), (700, 35), (10, 10), (1024, 5), (200, 40)]
+    positions, height = pack(sizes, 1024)
+
+    rects = [pygame.Rect(position, size) for position, size in zip(positions, sizes)]
+    for index, rect in enumerate(rects):
+        assert rect.collidelist(rects[:index] + rects[index + 1:]) == -1
+        assert rect.right <= 1024 and rect.bottom <= height
+
+
+def test_asset_manager_never_decodes_packed_images(tmp_path, monkeypatch):
+    path = tmp_path / "atlas.bin"
+    build_atlas(["images/ship/ship.png", "images/obstacles/bird.png"], path)
+    assets = AssetManager()
+    assets.use_atlas(Atlas(path))
+
+    def load(path):
+        raise AssertionError(f"decoded {path}")
+    monkeypatch.setattr(pygame.image, "load", load)
+
+    ship = assets.image("images/ship", "ship.png")
+    assert ship is assets.image("images/ship", "ship.png")
+    assert assets.mask("images/obstacles", "bird.png").count() > 0
+    # images left out of the atlas still come from their files
+    with pytest.raises(AssertionError):
+        assets.image("images/cloud", "cloud1.png")
+
+
+def test_changed_images_make_the_atlas_stale(tmp_path, monkeypatch):
+    shutil.copytree("images", tmp_path / "images")
+    monkeypatch.chdir(tmp_path)
+    path = os.path.join("images", "atlas.bin")
+    build_atlas(image_paths(), path)
+    assert not Atlas(path).stale()
+    assert load_atlas(path) is not None
+
+    # an edited image, even one with an older time, no longer matches
+    edited = os.path.join("images", "ship", "ship.png")
+    stat = os.stat(edited)
+    os.utime(edited, ns=(stat.st_atime_ns, stat.st_mtime_ns - 10 ** 9))
+    assert Atlas(path).stale()
+    assert load_atlas(path) is None
+
+    build_atlas(image_paths(), path)
+    os.remove(edited)
+    assert load_atlas(path) is None
+
+
+def test_missing_or_older_atlas_files_are_not_used(tmp_path):
+    assert load_atlas(tmp_path / "atlas.bin") is None
+
+    path = tmp_path / "atlas.bin"
+    build_atlas(["images/ship/ship.png"], path)
+    with open(path, "r+b") as file:
+        file.seek(4)
+        file.write(bytes([VERSION - 1]))
+    assert load_atlas(path) is None
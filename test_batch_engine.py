@@ -0,0 +1,83 @@
+import random
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from air_shooter import Settings
+from batch_engine import BatchEngine
+from simulation import Inputs, Simulation
+from waves import WaveSpawner
+
+
+class PythonRandom:
+    """Hand out Python random.Random numbers through numpy's integers()."""
+    def __init__(self, rng):
+        self.rng = rng
+
+    def integers(self, low, high, size):
+        return np.array([[self.rng.randint(lo, hi - 1) for lo, hi in zip(low, high)]
+                         for _ in range(size[0])], dtype=np.int64).reshape(size)
+
+
+def weave(tick):
+    up = (tick // 40) % 2 == 0
+    return Inputs(up=up, down=not up, fire=tick % 3 == 0, click=tick == 0)
+
+
+def idle(tick):
+    # stands in the obstacles' way, losing every ship
+    return Inputs(click=tick == 0)
+
+
+@pytest.mark.parametrize("seed", [1, 7])
+@pytest.mark.parametrize("inputs", [weave, idle])
+def test_single_game_matches_simulation(seed, inputs):
+    sim = Simulation(seed=seed)
+    engine = BatchEngine(1, rng=PythonRandom(random.Random(seed)))
+
+    for tick in range(3000):
+        now = inputs(tick)
+        state = sim.step(now)
+        engine.step(now.up, now.down, int(now.fire), now.click)
+
+        assert engine.active[0] == state.game_active
+        assert engine.score[0] == state.score
+        assert engine.ships_left[0] == state.ships_left
+        assert engine.ship_y[0] == state.ship[1]
+        assert engine.bullet_positions(0) == state.bullets
+        assert engine.obstacle_positions(0) == state.obstacles
+        assert engine.cloud_positions(0) == state.clouds
+
+    if inputs is idle:
+        assert state.ships_left == 0
+    else:
+        assert state.score > 0
+
+
+def test_games_end_independently():
+    engine = BatchEngine(64, seed=0)
+    engine.step(click=True)
+    assert not engine.done.any()
+
+    # firing games score and last longer than idle ones
+    fire = np.arange(64) % 2
+    for _ in range(3000):
+        engine.step(fire=fire)
+    assert engine.score[1::2].sum() > 0
+    assert (engine.score[::2] == 0).all()
+    assert engine.done.any()
+    assert (engine.ships_left[engine.done] == 0).all()
+
+    # finished games hold still until clicked again
+    score = engine.score.copy()
+    rewards = engine.step(fire=1)
+    assert (rewards[engine.done] == 0).all()
+    assert (engine.score[engine.done] == score[engine.done]).all()
+
+
+def test_level_files_are_rejected():
+    settings = Settings()
+    settings.waves = WaveSpawner("levels/level1.csv")
+
+    with pytest.raises(ValueError):
+        BatchEngine(2, settings)
@@ -0,0 +1,33 @@
+from bench_air_shooter import BENCHMARKS, compare, percentile, run_suite
+
+
+def test_suite_reports_every_case():
+    results = run_suite(counts=[1, 20], samples=3)
+
+    assert set(results) == {f"{name}/{count}" for name in BENCHMARKS for count in (1, 20)}
+    for result in results.values():
+        assert 0 <= result["median_ms"] <= result["p99_ms"]
+        assert result["alloc_kib"] >= 0
+
+
+def test_compare_flags_slower_medians():
+    baseline = {"frame/10": {"median_ms": 2.0}, "frame/100": {"median_ms": 10.0}}
+    results = {"frame/10": {"median_ms": 2.3}, "frame/100": {"median_ms": 12.5},
+               "frame/1000": {"median_ms": 99.0}}
+
+    # 15% slower is within tolerance, 25% is not, and new cases are skipped
+    assert compare(results, baseline, tolerance=0.2) == [("frame/100", 10.0, 12.5)]
+
+
+def test_compare_ignores_timer_noise():
+    baseline = {"prep_score/1": {"median_ms": 0.004}}
+    results = {"prep_score/1": {"median_ms": 0.02}}
+
+    assert compare(results, baseline) == []
+
+
+def test_percentile_uses_nearest_rank():
+    samples = list(range(1, 101))
+
+    assert percentile(samples, 0.99) == 99
+    assert percentile(samples, 0.5) == 50
@@ -0,0 +1,49 @@
+import pygame
+from air_shooter import (Settings, Ship, BulletPool, GameStats, add_new_obstacles,
+                         update_bullets)
+from simulation import NullScoreboard
+
+
+def make_pool(bullets_allowed=5):
+    settings = Settings()
+    settings.bullets_allowed = bullets_allowed
+    screen = pygame.Surface((settings.screen_width, settings.screen_height))
+    return settings, screen, Ship(settings, screen), BulletPool(settings, screen)
+
+
+def test_bullet_pool_limits_live_bullets():
+    settings, screen, ship, bullets = make_pool()
+
+    fired = [bullets.fire(ship) for _ in range(settings.bullets_allowed + 2)]
+
+    # only bullets_allowed bullets can be in flight at once
+    assert fired[-1] is None
+    assert bullets.live_count == settings.bullets_allowed
+    assert bullets.free_count == 0
+
+
+def test_bullet_pool_recycles_offscreen_bullets():
+    settings, screen, ship, bullets = make_pool()
+    obstacles = pygame.sprite.Group()
+    add_new_obstacles(settings, screen, obstacles)
+
+    bullet = bullets.fire(ship)
+    bullet.x = settings.screen_width
+
+    update_bullets(settings, screen, bullets, obstacles, GameStats(settings), NullScoreboard())
+
+    # the bullet left the screen and went back to the pool
+    assert bullets.live_count == 0
+    assert bullets.free_count == settings.bullets_allowed
+    assert bullets.fire(ship) is bullet
+
+
+def test_emptying_the_pool_recycles_every_bullet():
+    settings, screen, ship, bullets = make_pool()
+    for _ in range(3):
+        bullets.fire(ship)
+
+    bullets.empty()
+
+    assert bullets.live_count == 0
+    assert bullets.free_count == settings.bullets_allowed
@@ -0,0 +1,138 @@
+import random
+import pygame
+from pygame.sprite import Sprite, Group
+from assets import asset_manager
+from collision import SpatialHash
+
+
+class Box(Sprite):
+    def __init__(self, x, y, width, height):
+        super().__init__()
+        self.rect = pygame.Rect(x, y, width, height)
+
+
+def random_group(rng, count, width, height):
+    return Group([Box(rng.randint(-200, 1300), rng.randint(-100, 700), width, height)
+                  for _ in range(count)])
+
+
+def twin(group):
+    """Copy a group with new sprites, since kill() removes a sprite from every group."""
+    return Group([Box(*sprite.rect) for sprite in group])
+
+
+def rects(group):
+    return [tuple(sprite.rect) for sprite in group]
+
+
+def hit_rects(collisions):
+    return sorted((tuple(a.rect), sorted(tuple(b.rect) for b in hits))
+                  for a, hits in collisions.items())
+
+
+def test_groupcollide_matches_pygame():
+    rng = random.Random(4)
+    grid = SpatialHash(1100, 600, 100)
+
+    for _ in range(20):
+        bullets = random_group(rng, 60, 20, 7)
+        obstacles = random_group(rng, 30, 90, 80)
+        expected_bullets, expected_obstacles = twin(bullets), twin(obstacles)
+
+        expected = pygame.sprite.groupcollide(expected_bullets, expected_obstacles, True, True)
+        result = grid.groupcollide(bullets, obstacles, True, True)
+
+        # same bullets hit the same obstacles and the same sprites survive
+        assert hit_rects(result) == hit_rects(expected)
+        assert rects(bullets) == rects(expected_bullets)
+        assert rects(obstacles) == rects(expected_obstacles)
+
+
+def test_spritecollideany_matches_pygame():
+    rng = random.Random(5)
+    grid = SpatialHash(1100, 600, 100)
+
+    for _ in range(50):
+        ship = Box(rng.randint(0, 1000), rng.randint(0, 550), 70, 53)
+        obstacles = random_group(rng, 10, 90, 80)
+
+        expected = pygame.sprite.spritecollideany(ship, obstacles)
+        assert grid.spritecollideany(ship, obstacles) == expected
+
+
+def test_small_and_large_groups_match_pygame():
+    rng = random.Random(6)
+    grid = SpatialHash(1100, 600, 100)
+
+    for _ in range(20):
+        # few enough pairs to skip the grid
+        bullets = random_group(rng, 12, 20, 7)
+        obstacles = random_group(rng, 8, 90, 80)
+        expected_bullets, expected_obstacles = twin(bullets), twin(obstacles)
+
+        expected = pygame.sprite.groupcollide(expected_bullets, expected_obstacles, True, True)
+        assert hit_rects(grid.groupcollide(bullets, obstacles, True, True)) == \
+            hit_rects(expected)
+        assert rects(obstacles) == rects(expected_obstacles)
+
+        # too many obstacles to test them all against the ship
+        ship = Box(rng.randint(0, 1000), rng.randint(0, 550), 70, 53)
+        many = random_group(rng, 200, 90, 80)
+        assert grid.spritecollideany(ship, many) == pygame.sprite.spritecollideany(ship, many)
+
+
+def test_only_nearby_pairs_are_tested():
+    grid = SpatialHash(1100, 600, 100)
+    # a column of bullets on the left and obstacles on the right
+    bullets = Group([Box(10, y * 10, 20, 7) for y in range(50)])
+    obstacles = Group([Box(900, y * 20, 90, 15) for y in range(20)])
+
+    grid.groupcollide(bullets, obstacles, True, True)
+    grid.begin_frame()
+
+    assert grid.last_frame_tests == 0
+    assert grid.narrowphase_tests == 0
+    assert len(bullets) == 50
+
+
+class Image(Box):
+    """A box with a real obstacle image's collision mask."""
+    def __init__(self, x, y, filename):
+        mask = asset_manager.mask("images/obstacles", filename)
+        super().__init__(x, y, *mask.get_size())
+        self.mask = mask
+
+
+def solid(x, y, width, height):
+    box = Box(x, y, width, height)
+    box.mask = asset_manager.solid_mask((width, height))
+    return box
+
+
+def test_mask_precision_ignores_transparent_padding():
+    rect_grid = SpatialHash(1100, 600, 100)
+    mask_grid = SpatialHash(1100, 600, 100, precision="mask")
+
+    # the box image is transparent down its left side, the bullet only grazes that
+    box = Image(500, 300, "box.png")
+    grazing = solid(490, 350, 20, 7)
+    hitting = solid(540, 350, 20, 7)
+
+    assert rect_grid.spritecollideany(grazing, Group(box)) is box
+    assert mask_grid.spritecollideany(grazing, Group(box)) is None
+    assert mask_grid.spritecollideany(hitting, Group(box)) is box
+
+    collisions = mask_grid.groupcollide(Group(grazing, hitting), Group(box), True, True)
+    assert list(collisions) == [hitting]
+
+
+def test_masks_are_only_tested_after_rects_overlap():
+    grid = SpatialHash(1100, 600, 100, precision="mask")
+    obstacles = Group([Image(x, 300, "bird.png") for x in range(0, 1000, 100)])
+    bullets = Group([solid(x + 80, 100, 20, 7) for x in range(0, 1000, 100)] +
+                    [solid(120, 310, 20, 7)])
+
+    grid.groupcollide(bullets, obstacles, False, False)
+
+    # one bullet sits on a bird, every other pair is apart
+    assert grid.mask_tests == 1
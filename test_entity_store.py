@@ -0,0 +1,56 @@
+import pytest
+from air_shooter import Settings
+from simulation import Inputs, Simulation
+from waves import WaveSpawner
+
+np = pytest.importorskip("numpy")
+
+
+def play(backend, seed, ticks):
+    """Play a game that fires often and weaves through the obstacle lanes."""
+    settings = Settings()
+    settings.entity_backend = backend
+    sim = Simulation(seed=seed, settings=settings)
+    states = [sim.step(Inputs(click=True))]
+    for tick in range(ticks):
+        up = (tick // 60) % 2 == 0
+        states.append(sim.step(Inputs(up=up, down=not up, fire=tick % 3 == 0,
+                                      click=tick % 500 == 0)))
+    return states
+
+
+@pytest.mark.parametrize("seed", [1, 7])
+def test_arrays_match_sprites(seed):
+    sprites = play("sprites", seed, 3000)
+    arrays = play("arrays", seed, 3000)
+
+    # every tick of both games must be identical
+    assert sprites == arrays
+    assert sprites[-1].score > 0
+
+
+def test_first_bullet_takes_the_obstacle():
+    settings = Settings()
+    settings.entity_backend = "arrays"
+    sim = Simulation(seed=1, settings=settings)
+    store = sim.store
+
+    # move the first obstacle on screen and stack two bullets on top of it
+    store.obstacle_rect_x[0] = store.obstacle_rect_y[0] = 0
+    store.add_bullet(sim.ship)
+    store.add_bullet(sim.ship)
+    store.bullet_rect_x[:] = 0
+    store.bullet_rect_y[:] = 0
+
+    assert store.collide_bullets()
+    assert store.bullet_count == 1
+    assert store.obstacle_count == 3
+
+
+def test_arrays_backend_rejects_level_files():
+    settings = Settings()
+    settings.entity_backend = "arrays"
+    settings.waves = WaveSpawner("levels/level1.csv")
+
+    with pytest.raises(ValueError):
+        Simulation(settings=settings)
@@ -0,0 +1,71 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from air_shooter import Settings
+from env import ACTIONS, FIRE, NOOP, AirShooterEnv, VectorEnv
+from waves import WaveSpawner
+
+
+def play(env, seed, ticks):
+    obs = env.reset(seed)
+    total = 0
+    for tick in range(ticks):
+        obs, reward, done, info = env.step(FIRE if tick % 5 == 0 else NOOP)
+        total += reward
+        if done:
+            break
+    return obs, total, done, info
+
+
+def test_reward_follows_score():
+    env = AirShooterEnv()
+    env.settings.points = 7
+    obs, total, done, info = play(env, 1, 3000)
+
+    assert total > 0
+    assert total % 7 == 0
+    assert total == info["score"] == obs["score"]
+
+
+def test_observation_shapes_and_game_over():
+    env = AirShooterEnv()
+    obs = env.reset(seed=1)
+    assert obs["bullets"].shape == (env.settings.bullets_allowed, 2)
+    assert obs["obstacles"].shape == (4, 3)
+    assert obs["obstacle_count"] == 4
+    assert obs["ships_left"] == env.settings.ship_lives
+
+    # seed 1 runs out of ships while standing still
+    done = False
+    while not done:
+        obs, _, done, info = env.step(NOOP)
+    assert info["ships_left"] == obs["ships_left"] == 0
+    assert env.step(NOOP)[1:3] == (0, True)
+
+
+def test_vector_env_matches_single_envs():
+    seeds = [1, 2, 3, 4, 5]
+    actions = [tick % len(ACTIONS) for tick in range(200)]
+
+    with VectorEnv(len(seeds), processes=2) as vec:
+        batch = vec.reset(seeds)
+        for action in actions:
+            batch, rewards, dones, infos = vec.step([action] * len(seeds))
+
+    assert batch["bullets"].shape == (5, 100, 2)
+    assert rewards.shape == dones.shape == (5,)
+    for index, seed in enumerate(seeds):
+        env = AirShooterEnv()
+        env.reset(seed)
+        for action in actions:
+            obs = env.step(action)[0]
+        for key in obs:
+            assert np.array_equal(batch[key][index], obs[key])
+
+
+def test_level_files_are_rejected():
+    settings = Settings()
+    settings.waves = WaveSpawner("levels/level1.csv")
+    with pytest.raises(ValueError):
+        AirShooterEnv(settings)
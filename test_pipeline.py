@@ -0,0 +1,126 @@
+import threading
+
+import pygame
+import pytest
+from air_shooter import Settings, run_game
+from assets import AssetManager, asset_manager
+from pipeline import Controls, DoubleBuffer, SimulationThread, take_frame
+from simulation import Inputs, Simulation
+from waves import WaveSpawner
+
+
+def script(ticks):
+    """Inputs that start the game, sweep the ship and keep firing."""
+    return [Inputs(up=(tick // 60) % 2 == 1, down=(tick // 60) % 2 == 0,
+                   fire=tick % 4 == 0, click=tick % 300 == 1)
+            for tick in range(ticks)]
+
+
+def test_pipelined_ticks_match_serial_ones():
+    inputs = script(900)
+
+    serial = Simulation(seed=11)
+    for tick_inputs in inputs:
+        serial.step(tick_inputs)
+
+    simulation = SimulationThread(Simulation(seed=11).world)
+    try:
+        # frames of uneven numbers of ticks, as the fixed timestep gives them
+        start = 0
+        for size in [1, 0, 3, 2, 5] * 100:
+            simulation.submit(inputs[start:start + size])
+            frame = simulation.finish()
+            start += size
+            if start >= len(inputs):
+                break
+    finally:
+        simulation.stop()
+
+    assert frame == take_frame(len(inputs), serial.world)
+    assert frame.score > 0
+
+
+def test_main_thread_draws_the_front_frame_until_swap():
+    buffer = DoubleBuffer("first")
+    buffer.publish("second")
+    assert buffer.front == "first"
+    assert buffer.swap() == "second"
+    # nothing new was published, so the same frame is drawn again
+    assert buffer.swap() == "second"
+
+
+def test_worker_errors_reach_the_main_thread():
+    simulation = SimulationThread(Simulation(seed=1).world)
+    try:
+        simulation.submit([Inputs(click=True), "not inputs"])
+        with pytest.raises(AttributeError):
+            simulation.finish()
+        # the thread keeps serving frames afterwards
+        simulation.submit([Inputs()])
+        assert simulation.finish().game_active
+    finally:
+        simulation.stop()
+
+
+def test_controls_hand_shots_and_clicks_to_one_tick(monkeypatch):
+    pygame.display.init()
+    screen = pygame.display.set_mode((100, 100))
+    button = pygame.sprite.Sprite()
+    button.rect = screen.get_rect()
+    monkeypatch.setattr(pygame.mouse, "get_pos", lambda: (50, 50))
+
+    controls = Controls()
+    pygame.event.clear()
+    pygame.event.post(pygame.event.Event(pygame.MOUSEBUTTONDOWN))
+    pygame.event.post(pygame.event.Event(pygame.KEYDOWN, key=pygame.K_UP))
+    pygame.event.post(pygame.event.Event(pygame.KEYDOWN, key=pygame.K_SPACE))
+    pygame.event.post(pygame.event.Event(pygame.KEYDOWN, key=pygame.K_SPACE))
+    controls.handle_events(button, game_active=False)
+
+    # a frame without ticks keeps them for the next one
+    assert controls.take(0) == []
+    assert controls.take(3) == [Inputs(up=True, fire=2, click=True),
+                                Inputs(up=True), Inputs(up=True)]
+    assert controls.take(1) == [Inputs(up=True)]
+    pygame.display.quit()
+
+
+def test_worker_never_touches_the_cursor(monkeypatch):
+    calls = []
+    monkeypatch.setattr(pygame.mouse, "set_visible", calls.append)
+    pygame.display.init()
+
+    simulation = SimulationThread(Simulation(seed=1).world)
+    try:
+        # without firing the obstacles eventually take every life
+        simulation.submit([Inputs(click=True)] + [Inputs()] * 20000)
+        assert not simulation.finish().game_active
+    finally:
+        simulation.stop()
+        pygame.display.quit()
+
+    assert calls == []
+
+
+def test_worker_only_reads_converted_images(monkeypatch):
+    converted = []
+    convert = AssetManager.convert
+
+    def record(self, image):
+        converted.append(threading.current_thread().name)
+        return convert(self, image)
+    monkeypatch.setattr(AssetManager, "convert", record)
+
+    settings = Settings()
+    settings.pipelined = True
+    settings.fps_limit = 0
+    # the level's first obstacles are built by the worker, not add_new_obstacles()
+    settings.waves = WaveSpawner("levels/level1.csv")
+    asset_manager.clear()
+    try:
+        run_game(settings, replay=[Inputs(click=True)] + [Inputs()] * 30)
+    finally:
+        asset_manager.clear()
+        pygame.display.quit()
+
+    assert converted and "simulation" not in converted
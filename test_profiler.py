@@ -0,0 +1,95 @@
+import csv
+import json
+import pygame
+from air_shooter import (Settings, Ship, BulletPool, Clouds, GameStats, Button, Scoreboard,
+                         World, add_new_obstacles, start_game)
+from assets import asset_manager
+from profiler import PHASES, BUCKETS, FrameProfiler, NullProfiler
+
+
+def play(profiler, frames):
+    """Play a few seeded frames on the display with the given profiler."""
+    pygame.display.init()
+    pygame.font.init()
+    settings = Settings()
+    settings.profiler = profiler
+    settings.rng.seed(3)
+    screen = pygame.display.set_mode((settings.screen_width, settings.screen_height))
+
+    ship = Ship(settings, screen)
+    stats = GameStats(settings)
+    sb = Scoreboard(settings, screen, stats)
+    bullets = BulletPool(settings, screen)
+    obstacles = pygame.sprite.Group()
+    add_new_obstacles(settings, screen, obstacles)
+    clouds = [Clouds(settings, screen, "cloud1.png"), Clouds(settings, screen, "cloud2.png")]
+    play_button = Button(screen, "Start")
+    start_game(settings, screen, ship, bullets, obstacles, stats, sb)
+
+    world = World(settings, screen, ship, bullets, obstacles, clouds, stats, sb, play_button)
+    for _ in range(frames):
+        bullets.fire(ship)
+        settings.systems.tick(world)
+        settings.systems.frame(world)
+        profiler.end_frame(bullets=len(bullets), obstacles=len(obstacles))
+    pixels = pygame.image.tostring(screen, "RGB")
+
+    pygame.display.quit()
+    return pixels
+
+
+def test_phases_are_timed_every_frame():
+    profiler = FrameProfiler(history=10)
+    play(profiler, 20)
+
+    assert len(profiler.frames) == 20
+    assert len(profiler.history["frame"]) == 10
+    for name in ["input", "ship", "bullets", "obstacles", "collisions", "clouds", "scoring",
+                 "render", "draw", "flip"]:
+        assert profiler.average(name) > 0
+    assert sum(profiler.histogram("render")) == 10
+    assert len(profiler.histogram("render")) == len(BUCKETS)
+    assert profiler.counts == {"bullets": 20, "obstacles": 4}
+    assert profiler.overlay_rect is not None
+
+
+def test_overlay_uses_the_shared_font():
+    pygame.font.init()
+    asset_manager.clear()
+    profiler = FrameProfiler()
+    profiler.end_frame()
+    profiler.draw_overlay(pygame.Surface((400, 400)))
+    assert 20 in asset_manager.fonts
+    asset_manager.clear()
+
+
+def test_overlay_only_drawn_when_profiling():
+    assert play(NullProfiler(), 5) != play(FrameProfiler(), 5)
+
+
+def test_dump_csv_and_json(tmp_path):
+    profiler = FrameProfiler()
+    play(profiler, 3)
+
+    profiler.dump(tmp_path / "frames.csv")
+    with open(tmp_path / "frames.csv") as file:
+        rows = list(csv.reader(file))
+    assert rows[0] == (["frame_ms"] + [f"{name}_ms" for name in PHASES] +
+                       ["bullets", "obstacles"])
+    assert len(rows) == 4
+
+    profiler.dump(tmp_path / "frames.json")
+    with open(tmp_path / "frames.json") as file:
+        frames = json.load(file)
+    assert [frame["bullets"] for frame in frames] == [1, 2, 3]
+
+
+def test_only_the_last_frames_are_kept(tmp_path):
+    profiler = FrameProfiler(max_frames=2)
+    play(profiler, 3)
+    assert len(profiler.frames) == 2
+
+    profiler.dump(tmp_path / "frames.json")
+    with open(tmp_path / "frames.json") as file:
+        frames = json.load(file)
+    assert [frame["bullets"] for frame in frames] == [2, 3]
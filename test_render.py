@@ -0,0 +1,76 @@
+import pygame
+from air_shooter import (Settings, Ship, BulletPool, Clouds, GameStats, Button, Scoreboard,
+                         add_new_obstacles, start_game, update_game, update_screen)
+from render import DirtyRenderer
+
+
+def frames(render_mode, ticks):
+    """Play a seeded game on the display and return every frame's pixels."""
+    pygame.display.init()
+    pygame.font.init()
+    settings = Settings()
+    settings.hit_pause = 0
+    settings.rng.seed(11)
+    screen = pygame.display.set_mode((settings.screen_width, settings.screen_height))
+
+    ship = Ship(settings, screen)
+    stats = GameStats(settings)
+    sb = Scoreboard(settings, screen, stats)
+    bullets = BulletPool(settings, screen)
+    obstacles = pygame.sprite.Group()
+    add_new_obstacles(settings, screen, obstacles)
+    clouds = [Clouds(settings, screen, "cloud1.png"), Clouds(settings, screen, "cloud2.png")]
+    play_button = Button(screen, "Start")
+    renderer = DirtyRenderer(settings, screen)
+
+    pixels = []
+    for tick in range(ticks):
+        if tick == 5:
+            start_game(settings, screen, ship, bullets, obstacles, stats, sb)
+        if tick % 4 == 0:
+            bullets.fire(ship)
+        ship.move_up = (tick // 50) % 2 == 0
+        ship.move_down = not ship.move_up
+
+        if render_mode == "dirty":
+            renderer.update_screen(ship, bullets, obstacles, clouds, stats, sb, play_button)
+        else:
+            update_screen(settings, screen, ship, bullets, obstacles, clouds, stats, sb,
+                          play_button)
+        pixels.append(pygame.image.tostring(screen, "RGB"))
+
+        if stats.game_active:
+            update_game(settings, screen, ship, bullets, obstacles, clouds, stats, sb)
+
+    pygame.display.quit()
+    return pixels, stats.score
+
+
+def test_dirty_frames_match_full_redraw():
+    full, score = frames("full", 600)
+    dirty, _ = frames("dirty", 600)
+
+    # the score changed along the way, so the score image was redrawn too
+    assert score > 0
+    assert full == dirty
+
+
+def test_idle_screen_does_no_work():
+    pygame.display.init()
+    pygame.font.init()
+    settings = Settings()
+    screen = pygame.display.set_mode((settings.screen_width, settings.screen_height))
+    ship = Ship(settings, screen)
+    stats = GameStats(settings)
+    sb = Scoreboard(settings, screen, stats)
+    renderer = DirtyRenderer(settings, screen)
+    play_button = Button(screen, "Start")
+    obstacles = pygame.sprite.Group()
+
+    renderer.update_screen(ship, pygame.sprite.Group(), obstacles, [], stats, sb, play_button)
+    # paint over the screen, a frame with nothing moving must leave it alone
+    screen.fill((0, 0, 0))
+    renderer.update_screen(ship, pygame.sprite.Group(), obstacles, [], stats, sb, play_button)
+
+    assert screen.get_at((0, 0))[:3] == (0, 0, 0)
+    pygame.display.quit()
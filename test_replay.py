@@ -0,0 +1,81 @@
+import pygame
+import pytest
+from air_shooter import (Settings, Ship, BulletPool, Clouds, GameStats, Button, Scoreboard,
+                         add_new_obstacles, key_mouse_events, update_game)
+from replay import Recorder, Replay, pack_inputs, play_fast, unpack_inputs
+from simulation import Inputs, Simulation, snapshot
+
+
+def play_live(path, seed, ticks, monkeypatch):
+    """Play through key_mouse_events with posted key presses while recording."""
+    pygame.display.init()
+    pygame.font.init()
+    settings = Settings()
+    settings.rng.seed(seed)
+    screen = pygame.display.set_mode((settings.screen_width, settings.screen_height))
+
+    ship = Ship(settings, screen)
+    stats = GameStats(settings)
+    sb = Scoreboard(settings, screen, stats)
+    bullets = BulletPool(settings, screen)
+    obstacles = pygame.sprite.Group()
+    add_new_obstacles(settings, screen, obstacles)
+    clouds = [Clouds(settings, screen, "cloud1.png"), Clouds(settings, screen, "cloud2.png")]
+    play_button = Button(screen, "Start")
+    monkeypatch.setattr(pygame.mouse, "get_pos", lambda: play_button.rect.center)
+
+    states = []
+    with Recorder(path, seed, settings) as recorder:
+        for tick in range(ticks):
+            if tick % 200 == 3:
+                pygame.event.post(pygame.event.Event(pygame.MOUSEBUTTONDOWN))
+            if tick % 3 == 0:
+                pygame.event.post(pygame.event.Event(pygame.KEYDOWN, key=pygame.K_SPACE))
+            if tick % 90 == 0:
+                key = pygame.K_UP if (tick // 90) % 2 else pygame.K_DOWN
+                pygame.event.post(pygame.event.Event(pygame.KEYUP, key=pygame.K_UP))
+                pygame.event.post(pygame.event.Event(pygame.KEYUP, key=pygame.K_DOWN))
+                pygame.event.post(pygame.event.Event(pygame.KEYDOWN, key=key))
+
+            # some frames see input without running a tick, like a fast display
+            key_mouse_events(settings, screen, ship, bullets, obstacles, stats, play_button, sb,
+                             recorder)
+            if tick % 7 == 0:
+                continue
+
+            recorder.tick(ship)
+            if stats.game_active:
+                update_game(settings, screen, ship, bullets, obstacles, clouds, stats, sb)
+            states.append(snapshot(recorder.ticks, stats, ship, bullets, obstacles, clouds))
+
+    pygame.display.quit()
+    return states
+
+
+def test_replay_matches_live_game(tmp_path, monkeypatch):
+    path = tmp_path / "game.replay"
+    live = play_live(path, 99, 1500, monkeypatch)
+
+    with Replay(path) as replay:
+        sim = Simulation(seed=replay.seed)
+        replayed = [sim.step(inputs) for inputs in replay]
+
+    # bit exact, tick for tick
+    assert replayed == live
+    assert live[-1].score > 0
+    assert play_fast(path) == live[-1]
+
+
+def test_inputs_pack_into_one_byte():
+    byte = pack_inputs(True, False, True, 40)
+
+    assert 0 <= byte < 256
+    assert unpack_inputs(byte) == Inputs(up=True, down=False, fire=31, click=True)
+
+
+def test_replay_rejects_other_files(tmp_path):
+    path = tmp_path / "not.replay"
+    path.write_bytes(b"PNG" + bytes(20))
+
+    with pytest.raises(ValueError):
+        Replay(path)
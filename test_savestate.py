@@ -0,0 +1,86 @@
+import random
+
+import pytest
+
+from air_shooter import GameRandom
+from savestate import StateRing
+from simulation import Inputs, Simulation
+
+
+def inputs(tick):
+    """Weave up and down through the obstacle lanes, firing every few ticks."""
+    return Inputs(up=tick % 80 < 40, down=tick % 80 >= 40, fire=tick % 4 == 0)
+
+
+def play(sim, ticks):
+    return [sim.step(inputs(sim.tick)) for _ in range(ticks)]
+
+
+def started(seed):
+    sim = Simulation(seed=seed)
+    sim.step(Inputs(click=True))
+    play(sim, 150)
+    return sim
+
+
+def test_load_replays_the_same_game():
+    sim = started(seed=2)
+    buffer = sim.save_state()
+
+    # long enough for obstacles to be shot, come round and respawn
+    first = play(sim, 600)
+    sim.load_state(buffer)
+    second = play(sim, 600)
+
+    assert second == first
+
+
+def test_fork_from_a_snapshot():
+    sim = started(seed=5)
+    fork = Simulation(seed=99)
+    fork.load_state(sim.save_state())
+
+    assert fork.state() == sim.state()
+    assert play(fork, 400) == play(sim, 400)
+
+
+def test_rewind_through_the_ring():
+    sim = started(seed=8)
+    ring = StateRing(size=50)
+    states = []
+    for _ in range(120):
+        ring.push(sim.save_state())
+        states.append(sim.step(inputs(sim.tick)))
+
+    # only the last 50 snapshots are kept, newest last
+    assert len(ring) == 50
+    with pytest.raises(IndexError):
+        ring.back(50)
+
+    # the snapshot pushed 30 before the newest is from before step 89
+    sim.load_state(ring.rewind(30))
+    assert len(ring) == 20
+    assert play(sim, 31) == states[89:]
+
+
+def test_snapshots_are_small():
+    sim = started(seed=3)
+
+    assert len(sim.save_state()) < 4096
+
+
+def test_load_rejects_other_data():
+    sim = started(seed=3)
+
+    with pytest.raises(ValueError):
+        sim.load_state(b"\0" * 4096)
+
+
+def test_game_random_draws_like_random():
+    ours, theirs = GameRandom(7), random.Random(7)
+
+    assert [ours.randint(0, 1000) for _ in range(50)] == \
+        [theirs.randint(0, 1000) for _ in range(50)]
+    changes = ours.changes
+    ours.random()
+    assert ours.changes == changes + 1
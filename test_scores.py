@@ -0,0 +1,80 @@
+import sqlite3
+import pygame
+import pytest
+from air_shooter import Settings, Ship, BulletPool, GameStats, Button, HighScores, lose_ship
+from scores import Leaderboard, ScoreWriter
+from simulation import NullScoreboard
+
+
+def test_top_scores_are_served_from_memory_and_kept(tmp_path):
+    path = tmp_path / "scores.db"
+    with Leaderboard(path, size=3) as leaderboard:
+        for score in [30, 10, 50, 20, 40]:
+            leaderboard.record(score)
+        # known at once, before anything reached the disk
+        assert leaderboard.top() == (50, 40, 30)
+        assert leaderboard.top(1) == (50,)
+        assert not leaderboard.qualifies(30)
+
+    # every game was written, and the next run starts from the file
+    rows = sqlite3.connect(path).execute("SELECT COUNT(*) FROM scores").fetchone()
+    assert rows == (5,)
+    with Leaderboard(path, size=3) as leaderboard:
+        assert leaderboard.top() == (50, 40, 30)
+
+
+def test_games_are_committed_in_batches(tmp_path):
+    leaderboard = Leaderboard(tmp_path / "scores.db", batch_size=100, flush_interval=60)
+    for score in range(250):
+        leaderboard.record(score)
+    leaderboard.close()
+
+    assert leaderboard.writer.written == 250
+    assert leaderboard.writer.batches == 3
+
+
+def test_a_file_that_cannot_be_opened_is_reported(tmp_path):
+    # a folder where the score file should be, so the writer cannot open it
+    writer = ScoreWriter(str(tmp_path))
+    writer.put(10, 0.0)
+    with pytest.raises(sqlite3.Error):
+        writer.close()
+    assert writer.written == 0
+
+
+def test_game_over_records_the_score(tmp_path):
+    settings = Settings()
+    screen = pygame.Surface((settings.screen_width, settings.screen_height))
+    stats = GameStats(settings)
+    stats.game_active = True
+    stats.ships_left = 0
+    stats.score = 120
+
+    with Leaderboard(tmp_path / "scores.db") as settings.leaderboard:
+        lose_ship(settings, screen, Ship(settings, screen), pygame.sprite.Group(),
+                  BulletPool(settings, screen), stats, NullScoreboard())
+        assert not stats.game_active
+        assert settings.leaderboard.top() == (120,)
+
+
+def test_high_scores_sit_right_of_the_button(tmp_path):
+    pygame.display.init()
+    pygame.font.init()
+    settings = Settings()
+    screen = pygame.display.set_mode((settings.screen_width, settings.screen_height))
+    button = Button(screen, "Start")
+
+    with Leaderboard(tmp_path / "scores.db") as leaderboard:
+        high_scores = HighScores(settings, screen, leaderboard, button)
+        high_scores.draw()
+        assert high_scores.lines == []
+
+        leaderboard.record(70)
+        leaderboard.record(90)
+        high_scores.draw()
+
+    # a title and one line per score, redrawn once the scores changed
+    assert high_scores.shown == (90, 70)
+    assert len(high_scores.lines) == 3
+    assert all(rect.left > button.rect.right for rect in high_scores.rects())
+    pygame.display.quit()
@@ -0,0 +1,140 @@
+import asyncio
+
+from server import GameClient, GameServer, TickMetrics, apply_delta, encode_delta, LENGTH
+from simulation import Inputs, Simulation
+
+
+def inputs(tick):
+    if tick == 0:
+        return Inputs(click=True)
+    return Inputs(up=tick % 60 < 30, down=tick % 60 >= 30, fire=tick % 5 == 0)
+
+
+def test_deltas_rebuild_every_state():
+    sim = Simulation(seed=4)
+    client_state = sent = None
+    for tick in range(300):
+        state = sim.step(inputs(tick))
+        frame = encode_delta(sent, state)
+        sent = state
+
+        (length,) = LENGTH.unpack_from(frame)
+        assert length == len(frame) - LENGTH.size
+        client_state = apply_delta(client_state, frame[LENGTH.size:])
+        assert client_state == state
+
+
+def test_unchanged_sections_are_not_sent():
+    sim = Simulation(seed=4)
+    state = sim.step()
+
+    # before the game starts nothing moves but the clouds
+    full = encode_delta(None, state)
+    delta = encode_delta(state, sim.step())
+    assert len(delta) < len(full) / 2
+
+
+def test_sessions_play_like_local_simulations():
+    async def scenario():
+        server = GameServer(seed=1)
+        listener = await server.listen_tcp()
+        port = listener.sockets[0].getsockname()[1]
+        clients = [await GameClient.open_tcp("127.0.0.1", port) for _ in range(3)]
+
+        sent = 50
+        for client in clients:
+            for tick in range(sent):
+                client.send(inputs(tick))
+        while any(len(session.inputs) < sent for session in server.sessions):
+            await asyncio.sleep(0.01)
+
+        ticks = 80
+        for _ in range(ticks):
+            server.tick()
+
+        for client in clients:
+            local = Simulation(seed=client.seed)
+            held = Inputs()
+            for tick in range(ticks):
+                if tick < sent:
+                    step = inputs(tick)
+                    held = Inputs(up=step.up, down=step.down)
+                else:
+                    # with no input left the keys stay held and nothing fires
+                    step = held
+                assert await client.receive() == local.step(step)
+
+        for client in clients:
+            await client.close()
+        server.close()
+        return server
+
+    server = asyncio.run(scenario())
+    assert server.metrics.ticks == 80
+
+
+def test_run_ticks_over_a_unix_socket(tmp_path):
+    async def scenario():
+        server = GameServer(seed=2, tick_rate=200)
+        path = str(tmp_path / "game.sock")
+        await server.listen_unix(path)
+        client = await GameClient.open_unix(path)
+        client.send(Inputs(click=True))
+
+        await server.run(ticks=10)
+        states = [await client.receive() for _ in range(10)]
+        await client.close()
+        server.close()
+        return server, states
+
+    server, states = asyncio.run(scenario())
+    assert server.metrics.ticks == 10
+    assert [state.tick for state in states] == list(range(1, 11))
+    assert states[-1].game_active
+
+
+def test_a_failing_session_is_dropped_alone(caplog):
+    async def scenario():
+        server = GameServer(seed=3)
+        listener = await server.listen_tcp()
+        port = listener.sockets[0].getsockname()[1]
+        clients = [await GameClient.open_tcp("127.0.0.1", port) for _ in range(3)]
+        while len(server.sessions) < 3:
+            await asyncio.sleep(0.01)
+
+        broken = list(server.sessions)[1]
+
+        def fail(inputs):
+            raise RuntimeError("broken game")
+        broken.simulation.step = fail
+
+        for _ in range(5):
+            server.tick()
+        remaining = set(server.sessions)
+        states = [[await client.receive() for _ in range(5)]
+                  for client in clients if client.seed != broken.seed]
+
+        for client in clients:
+            await client.close()
+        server.close()
+        return server, broken, remaining, states
+
+    server, broken, remaining, states = asyncio.run(scenario())
+    assert broken not in remaining and len(remaining) == 2
+    assert [[state.tick for state in client] for client in states] == [list(range(1, 6))] * 2
+    assert server.metrics.ticks == 5
+    assert "broken game" in caplog.text
+
+
+def test_metrics_count_overruns():
+    metrics = TickMetrics(budget_ms=10)
+
+    metrics.record(4)
+    metrics.record(12, late_ms=15)
+    metrics.record(6, late_ms=2)
+
+    assert metrics.ticks == 3
+    assert metrics.overruns == 1
+    assert metrics.late == 1
+    assert metrics.max_ms == 12
+    assert metrics.average_ms == 22 / 3
@@ -0,0 +1,50 @@
+import pygame
+import pytest
+from air_shooter import Settings, Obstacles, Clouds, display_flags
+
+
+def test_sprites_are_placed_from_settings():
+    settings = Settings()
+    settings.obstacle_lanes = (300, 300)
+    settings.obstacle_spawn = (100, 100)
+    settings.cloud_heights = (5, 5)
+    settings.cloud_spawn = (50, 50)
+    screen = pygame.Surface((settings.screen_width, settings.screen_height))
+
+    obstacle = Obstacles(settings, screen, "bird.png")
+    cloud = Clouds(settings, screen, "cloud1.png")
+
+    assert (obstacle.x, obstacle.y) == (settings.screen_width + 100, 300)
+    assert (cloud.x, cloud.y) == (settings.screen_width + 50, 5)
+
+
+def test_render_scale_scales_the_layout():
+    settings = Settings()
+    settings.set_render_scale(0.5)
+
+    assert (settings.screen_width, settings.screen_height) == (550, 300)
+    assert settings.obstacle_lanes == (125, 225)
+    assert settings.cloud_spawn == (500, 1000)
+    assert settings.obs_speed == 3
+    assert settings.broadphase.cell_size == 50
+
+    # scaling is relative to the current scale
+    settings.set_render_scale(1.0)
+    assert (settings.screen_width, settings.obstacle_lanes) == (1100, (250, 450))
+
+
+def test_display_flags():
+    settings = Settings()
+    assert display_flags(settings) == 0
+
+    # vsync needs SDL's renderer, which SCALED brings in
+    settings.vsync = True
+    settings.display_buffer = "double"
+    assert display_flags(settings) == pygame.SCALED | pygame.DOUBLEBUF
+
+    settings.display_buffer = "hardware"
+    assert display_flags(settings) == pygame.SCALED | pygame.HWSURFACE | pygame.DOUBLEBUF
+
+    settings.display_buffer = "triple"
+    with pytest.raises(ValueError):
+        display_flags(settings)
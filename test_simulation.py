@@ -0,0 +1,72 @@
+import pygame
+from simulation import Inputs, Simulation, render_state
+
+
+def play(sim, ticks):
+    """Start a game and hold fire while weaving up and down."""
+    states = [sim.step(Inputs(click=True))]
+    for tick in range(ticks):
+        up = (tick // 40) % 2 == 0
+        states.append(sim.step(Inputs(up=up, down=not up, fire=tick % 5 == 0)))
+    return states
+
+
+def test_step_starts_game_and_advances_tick():
+    sim = Simulation(seed=1)
+
+    state = sim.step(Inputs(click=True))
+
+    assert state.game_active
+    assert state.tick == 1
+    assert state.ships_left == sim.settings.ship_lives
+    assert len(state.obstacles) == 4
+
+
+def test_same_seed_gives_same_game():
+    first = play(Simulation(seed=42), 2000)
+    second = play(Simulation(seed=42), 2000)
+
+    assert first == second
+
+
+def test_different_seeds_place_obstacles_differently():
+    first = Simulation(seed=1).state()
+    second = Simulation(seed=2).state()
+
+    assert first.obstacles != second.obstacles
+
+
+def test_game_runs_until_game_over_without_sleeping():
+    sim = Simulation(seed=1)
+    sim.step(Inputs(click=True))
+
+    # without firing the obstacles eventually take every life
+    state = sim.run(20000)
+
+    assert not state.game_active
+    assert state.ships_left == 0
+
+
+def test_render_state_draws_snapshot():
+    sim = Simulation(seed=5)
+    state = play(sim, 50)[-1]
+    screen = pygame.Surface((sim.settings.screen_width, sim.settings.screen_height))
+
+    render_state(sim.settings, screen, state)
+
+    assert screen.get_at((0, screen.get_height() - 1))[:3] == sim.settings.bg_color
+
+
+def test_world_holds_still_after_a_hit():
+    sim = Simulation(seed=1)
+    state = sim.step(Inputs(click=True))
+    while state.ships_left == sim.settings.ship_lives:
+        state = sim.step()
+
+    pause = round(sim.settings.hit_pause * sim.settings.tick_rate)
+    assert sim.stats.respawn_ticks == pause
+    held = [sim.step(Inputs(down=True)) for _ in range(pause)]
+
+    # nothing moves during the pause, then the game carries on
+    assert all(frozen[1:] == state[1:] for frozen in held)
+    assert sim.step(Inputs(down=True)).ship != state.ship
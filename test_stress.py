@@ -0,0 +1,33 @@
+from stress import REPORT_PHASES, Level, ramp, run_stress, sustainable
+
+
+def test_ramp_grows_every_count():
+    levels = list(ramp(bullets=60, obstacles=10, growth=2, steps=3))
+
+    # enough shots a tick to keep the pool in the air for a second
+    assert levels == [Level(60, 10, 1), Level(120, 20, 2), Level(240, 40, 4)]
+
+
+def test_stress_stops_at_the_first_slow_step():
+    levels = [Level(10, 4, 1), Level(20, 8, 1), Level(40, 12, 1)]
+
+    # nothing can run in no time, so the first step is already over
+    steps = run_stress(target_ms=0, levels=levels, frames=5, warmup=2)
+
+    assert len(steps) == 1
+    assert sustainable(steps, 0) is None
+
+
+def test_stress_reports_every_step_under_target():
+    levels = [Level(10, 4, 1), Level(20, 8, 1)]
+
+    steps = run_stress(target_ms=10000, levels=levels, frames=10, warmup=30)
+
+    assert [step["level"] for step in steps] == levels
+    assert sustainable(steps, 10000) is steps[-1]
+    for step in steps:
+        assert set(step["phases_ms"]) == set(REPORT_PHASES)
+        assert step["frame_ms"] > 0
+        # the bot keeps bullets flying and the obstacles are topped up
+        assert 0 < step["bullets"] <= step["level"].bullets
+        assert 0 < step["obstacles"] <= step["level"].obstacles
@@ -0,0 +1,92 @@
+import pytest
+
+from profiler import NullProfiler
+from simulation import Inputs, Simulation
+from systems import System, SystemScheduler
+
+
+class SettingsMock:
+    def __init__(self):
+        self.profiler = NullProfiler()
+
+
+class WorldMock:
+    def __init__(self, moving=True):
+        self.settings = SettingsMock()
+        self.moving = moving
+        self.ran = []
+
+    def begin_tick(self):
+        self.ran.append("begin")
+        return self.moving
+
+
+def recording(name, **options):
+    return System(name, lambda world: world.ran.append(name), **options)
+
+
+def scheduler():
+    return SystemScheduler([recording("input", always=True), recording("ship"),
+                            recording("bullets"), recording("render", every_tick=False)])
+
+
+def test_systems_run_once_in_order():
+    systems = scheduler()
+    world = WorldMock()
+
+    systems.tick(world)
+    systems.tick(world)
+    systems.frame(world)
+
+    assert world.ran == ["input", "begin", "ship", "bullets",
+                         "input", "begin", "ship", "bullets", "render"]
+
+
+def test_only_always_systems_run_while_the_world_holds_still():
+    world = WorldMock(moving=False)
+
+    scheduler().tick(world)
+
+    assert world.ran == ["input", "begin"]
+
+
+def test_disabled_systems_are_skipped():
+    systems = scheduler()
+    world = WorldMock()
+
+    systems.disable("ship", "render")
+    systems.tick(world)
+    systems.frame(world)
+    assert world.ran == ["input", "begin", "bullets"]
+
+    with pytest.raises(KeyError):
+        systems.disable("sound")
+
+
+def test_sprites_move_at_their_settings_speed():
+    sim = Simulation(seed=1)
+    settings = sim.settings
+    sim.step(Inputs(click=True))
+    sim.step(Inputs(fire=True))
+
+    bullet = sim.bullets.sprites()[0]
+    obstacles = {obstacle: obstacle.x for obstacle in sim.obstacles}
+    bullet_x = bullet.x
+    sim.step()
+
+    # one tick moves everything once
+    assert bullet.x - bullet_x == settings.bullet_speed
+    for obstacle, x in obstacles.items():
+        assert x - obstacle.x == settings.obs_speed
+
+
+def test_headless_runs_can_turn_systems_off():
+    sim = Simulation(seed=1)
+    sim.settings.systems.disable("clouds")
+    sim.step(Inputs(click=True))
+    clouds = [cloud.x for cloud in sim.clouds]
+
+    sim.run(30, Inputs(down=True))
+
+    assert [cloud.x for cloud in sim.clouds] == clouds
+    assert sim.ship.rect.centery > sim.ship.screen_rect.centery
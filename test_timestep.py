@@ -0,0 +1,55 @@
+import pygame
+from air_shooter import Settings, Ship, Bullet, Obstacles, FixedTimestep
+
+
+def make_settings(tick_rate=50, max_ticks_per_frame=5):
+    settings = Settings()
+    settings.tick_rate = tick_rate
+    settings.max_ticks_per_frame = max_ticks_per_frame
+    return settings
+
+
+def test_fixed_timestep_runs_whole_ticks():
+    timestep = FixedTimestep(make_settings())
+
+    # 50 ticks per second is one tick every 20 ms
+    assert timestep.advance(10) == 0
+    assert timestep.alpha == 0.5
+    assert timestep.advance(35) == 2
+    assert timestep.alpha == 0.25
+
+
+def test_fixed_timestep_limits_catch_up():
+    settings = make_settings()
+    timestep = FixedTimestep(settings)
+
+    # a one second stall only runs the catch-up limit, the rest is dropped
+    assert timestep.advance(1005) == settings.max_ticks_per_frame
+    assert timestep.alpha == 0.25
+    assert timestep.advance(20) == 1
+
+
+def test_bullet_is_drawn_between_ticks():
+    settings = make_settings()
+    screen = pygame.Surface((settings.screen_width, settings.screen_height))
+    bullet = Bullet(settings, screen, Ship(settings, screen))
+
+    bullet.save_position()
+    bullet.update()
+
+    assert bullet.rect_at(0.0).x == bullet.prev_x
+    assert bullet.rect_at(0.5).x == bullet.prev_x + settings.bullet_speed / 2
+    assert bullet.rect_at(1.0) == bullet.rect
+
+
+def test_obstacle_is_drawn_between_ticks():
+    settings = make_settings()
+    screen = pygame.Surface((settings.screen_width, settings.screen_height))
+    obstacle = Obstacles(settings, screen, "box.png", x=500, y=300)
+
+    obstacle.save_position()
+    obstacle.update()
+
+    assert obstacle.rect_at(0.0).x == 500
+    assert obstacle.rect_at(0.5).x == 500 - settings.obs_speed / 2
+    assert obstacle.rect_at(1.0).topleft == (500 - settings.obs_speed, 300)
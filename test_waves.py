@@ -0,0 +1,94 @@
+import pygame
+import pytest
+from air_shooter import Settings
+from simulation import Inputs, Simulation
+from waves import Wave, WaveSpawner, read_waves, schedule
+
+
+def write_level(path, lines):
+    path.write_text("at,image,count,lanes,speed,spacing\n" + "\n".join(lines) + "\n")
+    return str(path)
+
+
+def test_read_waves_skips_comments():
+    lines = ["# a comment", "at,image,count,lanes,speed,spacing", "",
+             "10,bird.png,2,250 450,6,5"]
+
+    assert list(read_waves(lines)) == [Wave(10, "bird.png", 2, [250, 450], 6, 5)]
+
+
+def test_schedule_merges_overlapping_waves_lazily():
+    read = []
+
+    def waves():
+        for wave in [Wave(0, "bird.png", 3, [250], 6, 10),
+                     Wave(5, "box.png", 2, [300, 400], 6, 10),
+                     Wave(100, "emerald.png", 1, [350], 6, 0)]:
+            read.append(wave.at)
+            yield wave
+
+    spawns = schedule(waves())
+    assert [next(spawns).at for _ in range(5)] == [0, 5, 10, 15, 20]
+    # the last wave is not read until everything before it is out
+    assert read == [0, 5, 100]
+    assert [(spawn.image, spawn.lane) for spawn in spawns] == [("emerald.png", 350)]
+
+
+def test_schedule_rejects_unsorted_waves():
+    waves = [Wave(50, "bird.png", 1, [250], 6, 0), Wave(10, "bird.png", 1, [250], 6, 0)]
+
+    with pytest.raises(ValueError):
+        list(schedule(waves))
+
+
+def test_only_obstacles_near_the_screen_are_live(tmp_path):
+    # ten thousand obstacles, one every other tick
+    path = write_level(tmp_path / "long.csv",
+                       [f"{tick * 20},bird.png,10,250 350 450,6,2" for tick in range(1000)])
+    settings = Settings()
+    screen = pygame.Surface((settings.screen_width, settings.screen_height))
+    spawner = WaveSpawner(path, lookahead=30)
+    obstacles = pygame.sprite.Group()
+
+    most = 0
+    for _ in range(3000):
+        spawner.update(settings, screen, obstacles)
+        obstacles.update()
+        most = max(most, len(obstacles))
+
+    # the look-ahead window plus the width of the screen, not the whole level
+    assert most < 150
+    assert spawner.tick == 3000
+    spawner.close()
+
+
+def test_obstacle_reaches_the_screen_edge_on_its_tick(tmp_path):
+    path = write_level(tmp_path / "one.csv", ["40,box.png,1,300,5,0"])
+    settings = Settings()
+    screen = pygame.Surface((settings.screen_width, settings.screen_height))
+    spawner = WaveSpawner(path, lookahead=10)
+    obstacles = pygame.sprite.Group()
+
+    for _ in range(41):
+        spawner.update(settings, screen, obstacles)
+        if obstacles:
+            obstacle, = obstacles
+            obstacle.x -= obstacle.speed
+    assert obstacle.x == settings.screen_width - obstacle.speed
+    assert obstacle.y == 300
+    spawner.close()
+
+
+def test_game_plays_a_level(tmp_path):
+    path = write_level(tmp_path / "level.csv", ["0,bird.png,200,300,6,10"])
+    settings = Settings()
+    settings.waves = WaveSpawner(path)
+    sim = Simulation(seed=1, settings=settings)
+
+    states = [sim.step(Inputs(click=True))]
+    states += [sim.step(Inputs(fire=tick % 4 == 0)) for tick in range(600)]
+
+    assert max(len(state.obstacles) for state in states) < 20
+    assert all(y == 300 for state in states for _, y, _ in state.obstacles)
+    assert states[-1].score > 0
+    settings.waves.close()
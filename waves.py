@@ -0,0 +1,140 @@
+"""Obstacle waves streamed from a level file.
+
+A level file is CSV with one wave per line, sorted by the tick it starts
+on. Blank lines and lines starting with "#" are skipped:
+
+    at,image,count,lanes,speed,spacing
+    0,bird.png,3,300,6,20
+    90,box.png,4,260 360 460,5,30
+
+at       tick the wave's first obstacle reaches the right edge of the screen
+image    obstacle image in images/obstacles
+count    number of obstacles in the wave
+lanes    y positions, taken in turn by the wave's obstacles
+speed    pixels an obstacle moves each time it updates
+spacing  ticks between one obstacle of the wave and the next
+
+WaveSpawner reads the file lazily, one line at a time, and only turns an
+entry into a sprite once it is due within the look-ahead window, so a level
+with tens of thousands of obstacles costs no more than the few that are on
+or near the screen. Scheduled obstacles leave the game once they pass the
+left edge instead of coming round again.
+"""
+import csv
+import heapq
+from collections import namedtuple
+
+from air_shooter import Obstacles
+
+
+Wave = namedtuple("Wave", ["at", "image", "count", "lanes", "speed", "spacing"])
+Spawn = namedtuple("Spawn", ["at", "image", "lane", "speed"])
+
+
+def read_waves(lines):
+    """Parse level file lines into Waves, one at a time."""
+    rows = csv.DictReader(line for line in lines
+                          if line.strip() and not line.lstrip().startswith("#"))
+    for row in rows:
+        yield Wave(
+            at=int(row["at"]),
+            image=row["image"].strip(),
+            count=int(row["count"]),
+            lanes=[int(lane) for lane in row["lanes"].split()],
+            speed=int(row["speed"]),
+            spacing=int(row["spacing"]),
+        )
+
+
+def wave_spawns(wave):
+    """Yield the obstacles of one wave in the order they are due."""
+    for index in range(wave.count):
+        yield Spawn(at=wave.at + index * wave.spacing, image=wave.image,
+                    lane=wave.lanes[index % len(wave.lanes)], speed=wave.speed)
+
+
+def schedule(waves):
+    """Yield the obstacles of every wave in the order they are due.
+
+    Waves can overlap, so the ones that have started are merged on a heap.
+    The next wave is only read once everything queued is due after it.
+    """
+    waves = iter(waves)
+    heap = []
+    order = 0
+    last_at = None
+    upcoming = next(waves, None)
+
+    while heap or upcoming is not None:
+        while upcoming is not None and (not heap or upcoming.at <= heap[0][0]):
+            if last_at is not None and upcoming.at < last_at:
+                raise ValueError(f"wave at tick {upcoming.at} comes after one at {last_at}")
+            last_at = upcoming.at
+
+            spawns = wave_spawns(upcoming)
+            first = next(spawns, None)
+            if first is not None:
+                heapq.heappush(heap, (first.at, order, first, spawns))
+                order += 1
+            upcoming = next(waves, None)
+
+        if not heap:
+            return
+        _, _, spawn, spawns = heapq.heappop(heap)
+        yield spawn
+
+        following = next(spawns, None)
+        if following is not None:
+            heapq.heappush(heap, (following.at, order, following, spawns))
+            order += 1
+
+
+class ScheduledObstacle(Obstacles):
+    """An obstacle from a level file, removed once it leaves the screen."""
+    def __init__(self, settings, screen, spawn, x):
+        super().__init__(settings, screen, spawn.image, x=x, y=spawn.lane, speed=spawn.speed)
+
+    def update(self):
+        self.x -= self.speed
+        self.rect.x = self.x
+        if self.x < -self.width:
+            self.kill()
+
+
+class WaveSpawner:
+    """Add the obstacles of a level file to the game as they come due.
+
+    An obstacle is added lookahead ticks before it reaches the right edge of
+    the screen. When the file runs out and the last obstacle is gone, the
+    level starts over.
+    """
+    def __init__(self, path, lookahead=60):
+        self.path = path
+        self.lookahead = lookahead
+        self.file = None
+        self.restart()
+
+    def restart(self):
+        """Go back to the start of the level."""
+        self.close()
+        self.file = open(self.path, newline="")
+        self.spawns = schedule(read_waves(self.file))
+        self.upcoming = next(self.spawns, None)
+        self.tick = 0
+
+    def update(self, settings, screen, obstacles):
+        """Add every obstacle due within the look-ahead window and advance a tick."""
+        while self.upcoming is not None and self.upcoming.at <= self.tick + self.lookahead:
+            spawn = self.upcoming
+            x = settings.screen_width + (spawn.at - self.tick) * spawn.speed
+            obstacles.add(ScheduledObstacle(settings, screen, spawn, x))
+            self.upcoming = next(self.spawns, None)
+        self.tick += 1
+
+        if self.upcoming is None and not obstacles:
+            self.restart()
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None